@@ -0,0 +1,279 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# author: Matteo Romanello, matteo.romanello@gmail.com
+
+"""
+Matching of abbreviated author names and work titles (e.g. ``Hom. Il.``).
+
+The :py:class:`AbbreviationMatcher` is built once from the abbreviations
+in a ``KnowledgeBase`` (see
+:py:meth:`hucitlib.KnowledgeBase.get_abbreviation_matcher`) and combines:
+
+- normalized keys, which ignore case, diacritics, punctuation and spacing
+  (``Hom.Il.``, ``hom il`` and ``HOM. IL.`` have the same key);
+- a trie of the keys, to find the longest abbreviation at the beginning of a
+  string (e.g. in ``Hom. Il. 1.1``);
+- an index of the variants of each key with up to `max_distance` deleted
+  characters, to find abbreviations that contain typos (e.g. ``Hom. Ill.``)
+  without comparing the string with all the keys.
+
+.. code-block:: python
+
+    >>> matcher = kb.get_abbreviation_matcher()
+    >>> matcher.match("Hom. Il. 1.1")[0]
+    AbbreviationMatch(urn='urn:cts:greekLit:tlg0012.tlg001', abbreviation='Hom. Il.', distance=0, prefix=True)
+
+"""
+
+import re
+import json
+import logging
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from hucitlib.search import fold
+
+logger = logging.getLogger(__name__)
+
+ABBREVIATIONS_FORMAT_VERSION = 1
+
+# max number of typos (edit distance) tolerated by default
+DEFAULT_MAX_DISTANCE = 1
+
+NON_WORD_PATTERN = re.compile(r"[\W_]+")
+
+# marks the end of a key in the trie
+_KEY = "\0"
+
+AbbreviationMatch = namedtuple(
+    "AbbreviationMatch", ["urn", "abbreviation", "distance", "prefix"]
+)
+
+
+def normalize(abbreviation: str) -> str:
+    """Returns the key of an abbreviation.
+
+    :param str abbreviation: An abbreviation (e.g. ``Hom. Il.``).
+    :return: The abbreviation, folded and with punctuation removed (e.g. ``hom il``).
+    :rtype: str
+
+    """
+    return NON_WORD_PATTERN.sub(" ", fold(abbreviation)).strip()
+
+
+def _deletes(key: str, max_distance: int) -> Set[str]:
+    """Returns the variants of `key` with up to `max_distance` deleted characters."""
+    variants = {key}
+    edits = {key}
+    for _ in range(max_distance):
+        edits = {edit[:i] + edit[i + 1 :] for edit in edits for i in range(len(edit))}
+        variants |= edits
+    return variants
+
+
+def edit_distance(a: str, b: str, max_distance: int = None) -> Optional[int]:
+    """Returns the edit distance (with transpositions) between two strings.
+
+    :param str a: First string.
+    :param str b: Second string.
+    :param int max_distance: If specified, ``None`` is returned as soon as the
+        distance is known to be greater than this value.
+    :rtype: Optional[int]
+
+    """
+    if max_distance is not None and abs(len(a) - len(b)) > max_distance:
+        return None
+
+    previous_row = None
+    row = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        previous_row, prior_row = row, previous_row
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            row[j] = min(
+                previous_row[j] + 1, row[j - 1] + 1, previous_row[j - 1] + cost
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], prior_row[j - 2] + 1)
+        if max_distance is not None and min(row) > max_distance:
+            return None
+
+    distance = row[len(b)]
+    if max_distance is not None and distance > max_distance:
+        return None
+    return distance
+
+
+class AbbreviationMatcher(object):
+    """Matches strings against the abbreviations of authors and works.
+
+    :param Iterable[Tuple[str, str]] abbreviations: (abbreviation, CTS URN)
+        tuples.
+    :param int max_distance: Max number of typos tolerated by
+        :py:meth:`match`.
+    :param str fingerprint: Fingerprint of the KB the abbreviations come from.
+    """
+
+    def __init__(
+        self,
+        abbreviations: Iterable[Tuple[str, str]],
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+        fingerprint: str = None,
+    ) -> None:
+        self.max_distance = max_distance
+        self.fingerprint = fingerprint
+        self._abbreviations = []
+        # key => [(abbreviation, URN)]
+        self._keys = {}
+        for abbreviation, urn in abbreviations:
+            key = normalize(abbreviation)
+            if not key or (abbreviation, urn) in self._keys.get(key, []):
+                continue
+            self._abbreviations.append((abbreviation, urn))
+            self._keys.setdefault(key, []).append((abbreviation, urn))
+
+        self._trie = {}
+        for key in self._keys:
+            node = self._trie
+            for char in key:
+                node = node.setdefault(char, {})
+            node[_KEY] = key
+
+        # variant (with deleted characters) => keys
+        self._variants = {}
+        for key in self._keys:
+            for variant in _deletes(key, max_distance):
+                self._variants.setdefault(variant, []).append(key)
+
+    def __len__(self) -> int:
+        return len(self._abbreviations)
+
+    def __repr__(self) -> str:
+        return f"<AbbreviationMatcher: {len(self._abbreviations)} abbreviations>"
+
+    @classmethod
+    def from_dictionaries(
+        cls, *dictionaries: Dict[str, str], **kwargs
+    ) -> "AbbreviationMatcher":
+        """Builds a matcher from legacy dictionaries.
+
+        :param dictionaries: Dictionaries like
+            :py:attr:`hucitlib.KnowledgeBase.author_abbreviations`, whose keys
+            have the form ``<urn>$$n<i>``.
+        :rtype: AbbreviationMatcher
+
+        """
+        return cls(
+            (
+                (abbreviation, key.split("$$")[0])
+                for dictionary in dictionaries
+                for key, abbreviation in dictionary.items()
+            ),
+            **kwargs,
+        )
+
+    def longest_prefix(self, string: str) -> Optional[str]:
+        """Returns the key of the longest abbreviation `string` starts with.
+
+        Only abbreviations ending at a word boundary are considered (e.g.
+        ``Hom.`` is not a prefix of ``Homer``).
+
+        :param str string: The string to match.
+        :rtype: Optional[str]
+
+        """
+        normalized = normalize(string)
+        node, longest = self._trie, None
+        for i, char in enumerate(normalized):
+            node = node.get(char)
+            if node is None:
+                break
+            if _KEY in node and (i + 1 == len(normalized) or normalized[i + 1] == " "):
+                longest = node[_KEY]
+        return longest
+
+    def _fuzzy_keys(self, key: str) -> Dict[str, int]:
+        """Returns the keys within `max_distance` from `key`, with their distance."""
+        candidates = {}
+        for variant in _deletes(key, self.max_distance):
+            for candidate in self._variants.get(variant, []):
+                if candidate in candidates:
+                    continue
+                distance = edit_distance(key, candidate, self.max_distance)
+                if distance is not None:
+                    candidates[candidate] = distance
+        return candidates
+
+    def match(self, string: str) -> List[AbbreviationMatch]:
+        """Returns the URNs whose abbreviations match a string, best first.
+
+        Matches are ranked as follows: exact matches (up to normalization),
+        then abbreviations within `max_distance` typos from the string
+        (closest first), then the longest abbreviation found at the beginning
+        of the string (e.g. ``Hom. Il.`` in ``Hom. Il. 1.1``).
+
+        :param str string: The string to match (e.g. ``Hom. Il.``).
+        :return: At most one match per URN.
+        :rtype: List[AbbreviationMatch]
+
+        """
+        key = normalize(string)
+        if not key:
+            return []
+
+        # (rank, abbreviation, URN, distance, is prefix match) tuples
+        candidates = []
+        for candidate_key, distance in self._fuzzy_keys(key).items():
+            for abbreviation, urn in self._keys[candidate_key]:
+                rank = (0, distance, -len(candidate_key))
+                candidates.append((rank, abbreviation, urn, distance, False))
+        prefix_key = self.longest_prefix(string)
+        if prefix_key is not None and prefix_key != key:
+            for abbreviation, urn in self._keys[prefix_key]:
+                rank = (1, 0, -len(prefix_key))
+                candidates.append((rank, abbreviation, urn, 0, True))
+
+        matches, seen_urns = [], set()
+        for rank, abbreviation, urn, distance, prefix in sorted(
+            candidates, key=lambda candidate: candidate[0]
+        ):
+            if urn not in seen_urns:
+                seen_urns.add(urn)
+                matches.append(AbbreviationMatch(urn, abbreviation, distance, prefix))
+        return matches
+
+    def save(self, path: str) -> None:
+        """Writes the abbreviations of the matcher to a (JSON) file.
+
+        :param str path: Path to the output file.
+        :rtype: None
+
+        """
+        with open(path, "w", encoding="utf-8") as ofile:
+            json.dump(
+                {
+                    "format_version": ABBREVIATIONS_FORMAT_VERSION,
+                    "fingerprint": self.fingerprint,
+                    "max_distance": self.max_distance,
+                    "abbreviations": self._abbreviations,
+                },
+                ofile,
+            )
+        logger.info(f"Saved {self} to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> "AbbreviationMatcher":
+        """Loads a matcher from a file written by :py:meth:`save`.
+
+        :param str path: Path to the file.
+        :rtype: AbbreviationMatcher
+        :raises ValueError: If the file was written in a different format.
+
+        """
+        with open(path, "r", encoding="utf-8") as ifile:
+            data = json.load(ifile)
+        if data.get("format_version") != ABBREVIATIONS_FORMAT_VERSION:
+            raise ValueError(f"Unsupported abbreviations format in {path}")
+        matcher = cls(data["abbreviations"], data["max_distance"], data["fingerprint"])
+        logger.info(f"Loaded {matcher} from {path}")
+        return matcher
@@ -0,0 +1,217 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# author: Matteo Romanello, matteo.romanello@gmail.com
+
+"""
+Batch writing of triples to a ``KnowledgeBase``.
+
+Creating entries by means of ``surf.resource.Resource.save()`` and
+``update()`` costs several SPARQL requests per entry. The
+:py:class:`BulkWriter` accumulates triples in memory instead, and writes them
+to the KB with a few large ``INSERT DATA`` requests.
+"""
+
+import logging
+import surf
+from typing import Dict, Iterable, Optional, Tuple
+from pyCTS import CTS_URN
+from rdflib import Graph, Literal, URIRef
+from surf.resource import Resource
+from hucitlib.surfext import BASE_URI_TYPES, get_text_element_uri
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+class BulkWriter(object):
+    """Accumulates triples and flushes them to the KB in batches.
+
+    :param KnowledgeBase kb: The knowledge base to write to.
+    :param int batch_size: Number of triples written by each ``INSERT DATA``
+        request.
+
+    .. code-block:: python
+
+        >>> iliad = kb.get_resource_by_urn("urn:cts:greekLit:tlg0012.tlg001")
+        >>> etype_book = kb.get_textelement_type("book")
+        >>> with BulkWriter(kb, batch_size=10000) as writer:
+        ...     writer.add_text_element(
+        ...         iliad, "urn:cts:greekLit:tlg0012.tlg001:1", etype_book
+        ...     )
+
+    """
+
+    def __init__(self, kb: "KnowledgeBase", batch_size: int = DEFAULT_BATCH_SIZE):
+        self.kb = kb
+        self.batch_size = batch_size
+        self.triples_written = 0
+        self._graph = Graph()
+        self._labels = {}
+        self._element_uris = {}
+
+    def __len__(self) -> int:
+        """Returns the number of triples not flushed yet."""
+        return len(self._graph)
+
+    def __enter__(self) -> "BulkWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.flush()
+
+    def add(self, triple: Tuple) -> None:
+        """Adds a triple, flushing the buffer when `batch_size` is reached."""
+        self._graph.add(triple)
+        if len(self._graph) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes all buffered triples to the KB."""
+        if len(self._graph) == 0:
+            return
+        self.kb.insert_triples(self._graph)
+        self.triples_written += len(self._graph)
+        logger.info(f"Written {len(self._graph)} triples to the KB")
+        self._graph = Graph()
+
+    def _get_label(self, resource: Resource) -> str:
+        """Returns the label of a resource (fetched only once per resource)."""
+        if resource.subject not in self._labels:
+            self._labels[resource.subject] = str(resource.rdfs_label.one)
+        return self._labels[resource.subject]
+
+    def _get_element_uri(self, work: Resource, urn_string: str) -> URIRef:
+        """Returns the URI of a text element.
+
+        Existing elements keep their URI (as found by :py:meth:`resolve_elements`
+        or in the KB's URN index); otherwise, the URI is minted from the URN.
+        """
+        element_uri = self._element_uris.get(urn_string)
+        if element_uri is None and self.kb.urn_index is not None:
+            element_uri = self.kb.urn_index.get(urn_string)
+        if element_uri is None:
+            element_uri = get_text_element_uri(work.subject, CTS_URN(urn_string))
+        return URIRef(element_uri)
+
+    def resolve_elements(self, urns: Iterable[str]) -> Dict[str, Optional[Resource]]:
+        """Looks up text elements in the KB by their CTS URNs.
+
+        The URIs of the elements found are then used by :py:meth:`add_relations`
+        instead of minting them. Only the elements of the last call are kept,
+        so that memory does not grow with the number of elements written.
+
+        :param Iterable[str] urns: CTS URNs of the text elements.
+        :return: See :py:meth:`hucitlib.KnowledgeBase.get_resources_by_urns`.
+        :rtype: Dict[str, Optional[Resource]]
+
+        """
+        resources = self.kb.get_resources_by_urns(urns)
+        self._element_uris = {
+            urn: str(resource.subject)
+            for urn, resource in resources.items()
+            if resource is not None
+        }
+        return resources
+
+    def add_text_element(
+        self,
+        work: Resource,
+        urn_string: str,
+        element_type: Resource,
+        source_uri: str = None,
+        text_structure: Resource = None,
+    ) -> URIRef:
+        """Adds the triples describing a new text element.
+
+        This is the batch counterpart of
+        :py:meth:`hucitlib.KnowledgeBase.create_text_element`: it produces the
+        same triples (element, type, label and CTS URN identifier), plus
+        the ``hucit:has_element`` link when a (top-level) `text_structure` is given.
+
+        :param Resource work: The work the element belongs to.
+        :param str urn_string: Text element's CTS URN.
+        :param Resource element_type: Text element type.
+        :param str source_uri: URI where the element's text can be retrieved.
+        :param Resource text_structure: Text structure to which the element is
+            added as a top-level element.
+        :return: The URI of the new text element.
+        :rtype: URIRef
+
+        """
+        urn = CTS_URN(urn_string)
+        work_label = self._get_label(work).split(" :: ")[0]
+        type_label = self._get_label(element_type)
+        element_uri = self._get_element_uri(work, urn_string)
+        id_uri = URIRef(f"{element_uri}/cts_urn")
+
+        self.add((element_uri, surf.ns.RDF["type"], surf.ns.HUCIT["TextElement"]))
+        self.add((element_uri, surf.ns.ECRM["P2_has_type"], element_type.subject))
+        self.add(
+            (
+                element_uri,
+                surf.ns.RDFS["label"],
+                Literal(f"{work_label} {type_label} {urn.passage_component}"),
+            )
+        )
+        if source_uri:
+            self.add((element_uri, surf.ns.HUCIT["resolves_to"], URIRef(source_uri)))
+
+        self.add((id_uri, surf.ns.RDF["type"], surf.ns.ECRM["E42_Identifier"]))
+        self.add((id_uri, surf.ns.RDFS["label"], Literal(urn_string)))
+        self.add(
+            (id_uri, surf.ns.ECRM["P2_has_type"], URIRef(BASE_URI_TYPES % "CTS_URN"))
+        )
+        self.add((element_uri, surf.ns.ECRM["P1_is_identified_by"], id_uri))
+
+        if text_structure is not None:
+            self.add(
+                (text_structure.subject, surf.ns.HUCIT["has_element"], element_uri)
+            )
+
+        if self.kb.urn_index is not None:
+            self.kb.urn_index.add(urn_string, str(element_uri))
+
+        logger.debug(f"Added text element {element_uri} ({urn_string})")
+        return element_uri
+
+    def add_relations(
+        self,
+        work: Resource,
+        urn_string: str,
+        parent_urn: str = None,
+        previous_urn: str = None,
+        following_urn: str = None,
+    ) -> None:
+        """Adds the triples linking a text element to its related elements.
+
+        This is the batch counterpart of
+        :py:meth:`hucitlib.surfext.HucitTextElement.add_relations`: instead of
+        fetching related elements from the KB one by one, the URIs of existing
+        elements are taken from :py:meth:`resolve_elements` or from the KB's URN
+        index, and the others are derived from their CTS URNs (see
+        :py:func:`hucitlib.surfext.get_text_element_uri`).
+
+        :param Resource work: The work the elements belong to.
+        :param str urn_string: CTS URN of the text element.
+        :param str parent_urn: CTS URN of the parent element (if any).
+        :param str previous_urn: CTS URN of the preceding element (if any).
+        :param str following_urn: CTS URN of the following element (if any).
+        :rtype: None
+
+        """
+        element_uri = self._get_element_uri(work, urn_string)
+
+        if following_urn:
+            following_uri = self._get_element_uri(work, following_urn)
+            self.add((element_uri, surf.ns.HUCIT["precedes"], following_uri))
+
+        if previous_urn:
+            previous_uri = self._get_element_uri(work, previous_urn)
+            self.add((element_uri, surf.ns.HUCIT["follows"], previous_uri))
+
+        if parent_urn:
+            parent_uri = self._get_element_uri(work, parent_urn)
+            self.add((element_uri, surf.ns.HUCIT["is_part_of"], parent_uri))
+            self.add((parent_uri, surf.ns.HUCIT["has_part"], element_uri))
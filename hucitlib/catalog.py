@@ -0,0 +1,300 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# author: Matteo Romanello, matteo.romanello@gmail.com
+
+"""
+A compact, read-only catalog of the authors and works in a ``KnowledgeBase``.
+
+The catalog is built from the KB with a handful of aggregated SPARQL queries
+(see :py:meth:`hucitlib.KnowledgeBase.get_catalog`) and stored column by
+column: all strings (URIs, URNs, names, titles, abbreviations) are interned in
+a single string pool, and each column is an array of integer references to it.
+Multi-valued columns (e.g. the names of an author) are stored as a flat array
+of values plus an array of offsets.
+
+.. code-block:: python
+
+    >>> catalog = kb.get_catalog()
+    >>> homer = catalog.get_author("urn:cts:greekLit:tlg0012")
+    >>> homer.names
+    ['Homer', 'Homère', 'Omero', 'Homerus']
+    >>> [work.urn for work in catalog.get_works(author_urn=homer.urn)]
+    ['urn:cts:greekLit:tlg0012.tlg001', 'urn:cts:greekLit:tlg0012.tlg002']
+
+"""
+
+import sys
+import json
+import logging
+from array import array
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FORMAT_VERSION = 1
+
+# reference to a missing value (e.g. an author without URN)
+NULL = 0xFFFFFFFF
+
+# typecode of the columns (unsigned int, 4 bytes)
+COLUMN_TYPECODE = "I"
+
+CatalogAuthor = namedtuple("CatalogAuthor", ["uri", "urn", "names", "abbreviations"])
+
+CatalogWork = namedtuple(
+    "CatalogWork", ["uri", "urn", "author_urn", "titles", "abbreviations"]
+)
+
+AUTHOR_COLUMNS = ["uri", "urn"]
+AUTHOR_LIST_COLUMNS = ["names", "abbreviations"]
+WORK_COLUMNS = ["uri", "urn", "author"]
+WORK_LIST_COLUMNS = ["titles", "abbreviations"]
+
+
+class _StringPool(object):
+    """Interns strings, so that each of them is stored only once."""
+
+    def __init__(self, strings: List[str] = None) -> None:
+        self.strings = strings or []
+        self._ids = {string: i for i, string in enumerate(self.strings)}
+
+    def add(self, string: Optional[str]) -> int:
+        if string is None:
+            return NULL
+        string_id = self._ids.get(string)
+        if string_id is None:
+            string_id = self._ids[string] = len(self.strings)
+            self.strings.append(string)
+        return string_id
+
+    def get(self, string_id: int) -> Optional[str]:
+        return None if string_id == NULL else self.strings[string_id]
+
+
+class Catalog(object):
+    """Column-oriented table of the authors and works of a KB.
+
+    Instances are not meant to be created directly, but either built from a
+    KB (:py:meth:`from_records`, via
+    :py:meth:`hucitlib.KnowledgeBase.get_catalog`) or loaded from a file
+    (:py:meth:`load`).
+
+    :param List[str] strings: The string pool.
+    :param Dict[str, array] columns: The columns, as arrays of references to
+        the string pool (or to rows of the authors' table, for ``work_author``).
+    :param str fingerprint: Fingerprint of the KB the catalog was built from.
+    """
+
+    def __init__(
+        self, strings: List[str], columns: Dict[str, array], fingerprint: str = None
+    ) -> None:
+        self._pool = _StringPool(strings)
+        self._columns = columns
+        self.fingerprint = fingerprint
+        self._author_rows = None
+        self._work_rows = None
+
+    def __repr__(self) -> str:
+        return (
+            f"<Catalog: {self.count_authors()} authors, {self.count_works()} works, "
+            f"{len(self._pool.strings)} strings>"
+        )
+
+    @classmethod
+    def from_records(
+        cls,
+        authors: Iterable[Tuple[str, str, List[str], List[str]]],
+        works: Iterable[Tuple[str, str, str, List[str], List[str]]],
+        fingerprint: str = None,
+    ) -> "Catalog":
+        """Builds a catalog from (ordered) author and work records.
+
+        :param authors: (URI, URN, names, abbreviations) tuples.
+        :param works: (URI, URN, author URI, titles, abbreviations) tuples.
+        :param str fingerprint: Fingerprint of the KB the records come from.
+        :rtype: Catalog
+
+        """
+        pool = _StringPool()
+        columns = {}
+        for table, names, list_names in [
+            ("author", AUTHOR_COLUMNS, AUTHOR_LIST_COLUMNS),
+            ("work", WORK_COLUMNS, WORK_LIST_COLUMNS),
+        ]:
+            for name in names:
+                columns[f"{table}_{name}"] = array(COLUMN_TYPECODE)
+            for name in list_names:
+                columns[f"{table}_{name}"] = array(COLUMN_TYPECODE)
+                columns[f"{table}_{name}_offsets"] = array(COLUMN_TYPECODE, [0])
+
+        def add_list(column: str, values: List[str]) -> None:
+            columns[column].extend(pool.add(value) for value in values)
+            columns[f"{column}_offsets"].append(len(columns[column]))
+
+        author_rows = {}
+        for uri, urn, names, abbreviations in authors:
+            author_rows[uri] = len(columns["author_uri"])
+            columns["author_uri"].append(pool.add(uri))
+            columns["author_urn"].append(pool.add(urn))
+            add_list("author_names", names)
+            add_list("author_abbreviations", abbreviations)
+
+        for uri, urn, author_uri, titles, abbreviations in works:
+            columns["work_uri"].append(pool.add(uri))
+            columns["work_urn"].append(pool.add(urn))
+            columns["work_author"].append(author_rows.get(author_uri, NULL))
+            add_list("work_titles", titles)
+            add_list("work_abbreviations", abbreviations)
+
+        return cls(pool.strings, columns, fingerprint)
+
+    def save(self, path: str) -> None:
+        """Writes the catalog to a file.
+
+        The file consists of a JSON header (one line, containing the string
+        pool and the size of each column), followed by the raw columns.
+
+        :param str path: Path to the output file.
+        :rtype: None
+
+        """
+        header = {
+            "format_version": CATALOG_FORMAT_VERSION,
+            "fingerprint": self.fingerprint,
+            "byteorder": sys.byteorder,
+            "itemsize": array(COLUMN_TYPECODE).itemsize,
+            "columns": [[name, len(column)] for name, column in self._columns.items()],
+            "strings": self._pool.strings,
+        }
+        with open(path, "wb") as ofile:
+            ofile.write(json.dumps(header).encode("utf-8") + b"\n")
+            for column in self._columns.values():
+                column.tofile(ofile)
+        logger.info(f"Saved {self} to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> "Catalog":
+        """Loads a catalog from a file written by :py:meth:`save`.
+
+        :param str path: Path to the catalog file.
+        :rtype: Catalog
+        :raises ValueError: If the file was written in a different format.
+
+        """
+        with open(path, "rb") as ifile:
+            header = json.loads(ifile.readline().decode("utf-8"))
+            if header.get("format_version") != CATALOG_FORMAT_VERSION:
+                raise ValueError(f"Unsupported catalog format in {path}")
+            if header["itemsize"] != array(COLUMN_TYPECODE).itemsize:
+                raise ValueError(f"Incompatible column size in {path}")
+            columns = {}
+            for name, length in header["columns"]:
+                columns[name] = array(COLUMN_TYPECODE)
+                columns[name].fromfile(ifile, length)
+                if header["byteorder"] != sys.byteorder:
+                    columns[name].byteswap()
+        catalog = cls(header["strings"], columns, header["fingerprint"])
+        logger.info(f"Loaded {catalog} from {path}")
+        return catalog
+
+    def _get_list(self, column: str, row: int) -> List[str]:
+        offsets = self._columns[f"{column}_offsets"]
+        values = self._columns[column][offsets[row] : offsets[row + 1]]
+        return [self._pool.get(value) for value in values]
+
+    def _get_author(self, row: int) -> CatalogAuthor:
+        return CatalogAuthor(
+            self._pool.get(self._columns["author_uri"][row]),
+            self._pool.get(self._columns["author_urn"][row]),
+            self._get_list("author_names", row),
+            self._get_list("author_abbreviations", row),
+        )
+
+    def _get_work(self, row: int) -> CatalogWork:
+        author_row = self._columns["work_author"][row]
+        author_urn = (
+            None
+            if author_row == NULL
+            else self._pool.get(self._columns["author_urn"][author_row])
+        )
+        return CatalogWork(
+            self._pool.get(self._columns["work_uri"][row]),
+            self._pool.get(self._columns["work_urn"][row]),
+            author_urn,
+            self._get_list("work_titles", row),
+            self._get_list("work_abbreviations", row),
+        )
+
+    def _get_row(self, table: str, urn: str) -> Optional[int]:
+        # URN => row lookups are built lazily, on first use
+        if table == "author":
+            if self._author_rows is None:
+                self._author_rows = self._index_rows("author_urn")
+            return self._author_rows.get(urn)
+        if self._work_rows is None:
+            self._work_rows = self._index_rows("work_urn")
+        return self._work_rows.get(urn)
+
+    def _index_rows(self, column: str) -> Dict[str, int]:
+        return {
+            self._pool.get(string_id): row
+            for row, string_id in enumerate(self._columns[column])
+            if string_id != NULL
+        }
+
+    def count_authors(self) -> int:
+        """Returns the number of authors in the catalog."""
+        return len(self._columns["author_uri"])
+
+    def count_works(self) -> int:
+        """Returns the number of works in the catalog."""
+        return len(self._columns["work_uri"])
+
+    def get_authors(self) -> List[CatalogAuthor]:
+        """Returns all the authors in the catalog.
+
+        :rtype: List[CatalogAuthor]
+
+        """
+        return [self._get_author(row) for row in range(self.count_authors())]
+
+    def get_author(self, urn: str) -> Optional[CatalogAuthor]:
+        """Returns the author with a given CTS URN (``None`` if not found).
+
+        :param str urn: The author's CTS URN (e.g. ``urn:cts:greekLit:tlg0012``).
+        :rtype: Optional[CatalogAuthor]
+
+        """
+        row = self._get_row("author", urn)
+        return None if row is None else self._get_author(row)
+
+    def get_works(self, author_urn: str = None) -> List[CatalogWork]:
+        """Returns all the works in the catalog, or those of a given author.
+
+        :param str author_urn: If specified, only the works of the author with
+            this CTS URN are returned.
+        :rtype: List[CatalogWork]
+
+        """
+        if author_urn is None:
+            return [self._get_work(row) for row in range(self.count_works())]
+
+        author_row = self._get_row("author", author_urn)
+        if author_row is None:
+            return []
+        return [
+            self._get_work(row)
+            for row, work_author in enumerate(self._columns["work_author"])
+            if work_author == author_row
+        ]
+
+    def get_work(self, urn: str) -> Optional[CatalogWork]:
+        """Returns the work with a given CTS URN (``None`` if not found).
+
+        :param str urn: The work's CTS URN (e.g. ``urn:cts:greekLit:tlg0012.tlg001``).
+        :rtype: Optional[CatalogWork]
+
+        """
+        row = self._get_row("work", urn)
+        return None if row is None else self._get_work(row)
@@ -5,13 +5,16 @@
 """Command line interface for a HuCit knowledge base.
 
 Usage:
-    hucit find <search_string> [--config-file=<path>]
+    hucit find <search_string> [--config-file=<path>] [--index=<path>]
     hucit add (name|abbr|title|sameas) --to=<cts_urn> <string_to_add> [--config-file=<path>]
+    hucit export <output_file> [--json] [--config-file=<path>]
     hucit (-h | --help)
 
 Options:
     --to=<cts_urn> CTS URN of the author/work to edit.
     --config-file=<path> Path to the configuration file (overwrites default configuration).
+    --index=<path> Search a local index of labels, stored in this file (built if missing).
+    --json  Export a single JSON object instead of JSON Lines (one author per line).
 
 """
 
@@ -133,6 +136,8 @@ def main():
             print("\nNo records with this CTS URN!\n")
             return
         try:
+            if arguments["--index"] is not None:
+                kb.get_label_index(arguments["--index"])
             matches = kb.search(search_string)
             print(
                 '\nSearching for "%s" yielded %s results'
@@ -163,6 +168,11 @@ def main():
         print(arguments)
         # if arguments[""]
         pass
+    # the user has issued an `export` command
+    elif arguments["export"]:
+        output_file = arguments["<output_file>"]
+        count = kb.export_json(output_file, lines=not arguments["--json"])
+        print(f"\nExported {count} authors to {output_file}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,177 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# author: Matteo Romanello, matteo.romanello@gmail.com
+
+"""
+Pre-compiled local copies of the KB's sources.
+
+When using an in-memory store (e.g. ``config/inmemory.ini``), the Turtle
+sources of the KB are parsed with ``rdflib`` each time a ``KnowledgeBase`` is
+created (or unpickled). Setting ``compiled_store_dir`` in the configuration
+file makes the KB parse them only once, into a persistent, indexed
+``rdflib`` store (BerkeleyDB) that later instances and worker processes
+simply open (see ``config/inmemory_compiled.ini``).
+
+The compiled store is tied to the paths, sizes and modification times of
+the sources, so that it is compiled again as soon as they change. For the
+same reason, it is opened read-only: writing to a KB that uses a compiled
+store raises an ``IOError`` (use a non-compiled in-memory configuration to
+modify the KB).
+
+.. note::
+    This requires the optional ``berkeleydb`` package
+    (``pip install hucitlib[compiled]``).
+"""
+
+import os
+import shutil
+import hashlib
+import logging
+import rdflib
+from typing import Iterator, List, Optional, Tuple
+from rdflib import ConjunctiveGraph, plugin
+from rdflib.store import Store, VALID_STORE
+from hucitlib.snapshot import DEFAULT_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+COMPILED_STORE_PLUGIN = "BerkeleyDB"
+
+
+def get_compiled_store_path(
+    compiled_store_dir: str, sources: List[str], source_format: str
+) -> str:
+    """Returns the path of the compiled store for a given set of sources.
+
+    :param str compiled_store_dir: Directory where compiled stores are kept.
+    :param List[str] sources: Paths to the KB's source files.
+    :param str source_format: Format of the source files (e.g. ``turtle``).
+    :return: Path to the compiled store (a directory).
+    :rtype: str
+
+    """
+    key_parts = [source_format, rdflib.__version__]
+    for source_path in sources:
+        stat = os.stat(source_path)
+        key_parts.append(
+            f"{os.path.abspath(source_path)}:{stat.st_size}:{stat.st_mtime}"
+        )
+    digest = hashlib.sha1("|".join(key_parts).encode("utf-8")).hexdigest()
+    compiled_store_dir = os.path.expanduser(compiled_store_dir or DEFAULT_CACHE_DIR)
+    return os.path.join(compiled_store_dir, f"kb-compiled-{digest}")
+
+
+def compile_store(path: str, sources: List[str], source_format: str) -> None:
+    """Parses the KB's sources into a new compiled store.
+
+    The store is first written to a temporary directory, which is then
+    renamed, so that concurrent processes never open a partially compiled
+    store.
+
+    :param str path: Path to the compiled store (see
+        :py:func:`get_compiled_store_path`).
+    :param List[str] sources: Paths to the KB's source files.
+    :param str source_format: Format of the source files (e.g. ``turtle``).
+    :rtype: None
+
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    graph = ConjunctiveGraph(store=COMPILED_STORE_PLUGIN)
+    graph.open(tmp_path, create=True)
+    try:
+        for source_path in sources:
+            graph.parse(source=source_path, format=source_format)
+            logger.info(f"Compiled {source_path} into {path}")
+        logger.info(f"The compiled store contains {len(graph)} triples")
+    finally:
+        graph.close()
+
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # another process has compiled the same store in the meantime
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+class ReadOnlyStore(Store):
+    """Read-only view of an ``rdflib`` store.
+
+    Triples can be read and queried, but not added or removed. Namespace
+    bindings are kept in memory, without modifying the underlying store.
+
+    :param rdflib.store.Store store: The underlying store (already open).
+    :param str path: Path to the underlying store (used in error messages).
+    """
+
+    def __init__(self, store: Store, path: str = None) -> None:
+        super().__init__()
+        self._store = store
+        self._path = path
+        self._bindings = {}
+        self.context_aware = store.context_aware
+        self.formula_aware = store.formula_aware
+        self.graph_aware = store.graph_aware
+
+    def _read_only(self, *args, **kwargs) -> None:
+        raise IOError(f"The compiled store {self._path} is read-only")
+
+    add = addN = remove = add_graph = remove_graph = update = _read_only
+
+    def triples(self, triple_pattern: Tuple, context=None) -> Iterator:
+        return self._store.triples(triple_pattern, context)
+
+    def __len__(self, context=None) -> int:
+        return self._store.__len__(context)
+
+    def contexts(self, triple: Tuple = None) -> Iterator:
+        return self._store.contexts(triple)
+
+    def bind(self, prefix: str, namespace, override: bool = True) -> None:
+        self._bindings[prefix] = namespace
+
+    def namespace(self, prefix: str) -> Optional[rdflib.URIRef]:
+        if prefix in self._bindings:
+            return rdflib.URIRef(self._bindings[prefix])
+        return self._store.namespace(prefix)
+
+    def prefix(self, namespace) -> Optional[str]:
+        for prefix, bound_namespace in self._bindings.items():
+            if str(bound_namespace) == str(namespace):
+                return prefix
+        return self._store.prefix(namespace)
+
+    def namespaces(self) -> Iterator[Tuple[str, rdflib.URIRef]]:
+        for prefix, namespace in self._bindings.items():
+            yield prefix, rdflib.URIRef(namespace)
+        for prefix, namespace in self._store.namespaces():
+            if prefix not in self._bindings:
+                yield prefix, namespace
+
+    def close(self, commit_pending_transaction: bool = False) -> None:
+        self._store.close()
+
+
+def open_compiled_store(
+    path: str, sources: List[str] = None, source_format: str = None
+) -> Store:
+    """Opens a compiled store, compiling it first if it does not exist yet.
+
+    :param str path: Path to the compiled store (see
+        :py:func:`get_compiled_store_path`).
+    :param List[str] sources: Paths to the KB's source files (needed only
+        if the store has to be compiled).
+    :param str source_format: Format of the source files.
+    :return: An open, read-only ``rdflib`` store, that can be passed to
+        ``surf.Store`` as ``rdflib_store``.
+    :rtype: ReadOnlyStore
+
+    """
+    if not os.path.exists(path):
+        compile_store(path, sources, source_format)
+
+    store = plugin.get(COMPILED_STORE_PLUGIN, Store)()
+    if store.open(path, create=False) != VALID_STORE:
+        raise IOError(f"Could not open the compiled store at {path}")
+    logger.info(f"Opened compiled store {path}")
+    return ReadOnlyStore(store, path)
@@ -0,0 +1,77 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# author: Matteo Romanello, matteo.romanello@gmail.com
+
+"""
+In-process index of the CTS URNs contained in a ``KnowledgeBase``.
+"""
+
+from collections import OrderedDict
+from typing import Optional
+
+
+class UrnIndex(object):
+    """Maps CTS URNs (as strings) to the URIs of the resources they identify.
+
+    The index works in two modes:
+
+    - *complete* (``max_size=None``): the index is populated with all URNs
+      in the KB, thus a lookup miss means that the URN is not in the KB;
+    - *LRU* (``max_size=N``): at most N entries are kept, and the least
+      recently used ones are evicted first. Useful when the KB contains a large
+      number of ``HucitTextElement`` entries.
+
+    .. code-block:: python
+
+        >>> index = UrnIndex(max_size=2)
+        >>> index.add("urn:cts:greekLit:tlg0012", "http://purl.org/hucit/kb/authors/927")
+        >>> index.get("urn:cts:greekLit:tlg0012")
+        'http://purl.org/hucit/kb/authors/927'
+
+    """
+
+    def __init__(self, max_size: int = None) -> None:
+        self.max_size = max_size
+        self._uris = OrderedDict()
+        self._urns = {}
+
+    def __len__(self) -> int:
+        return len(self._uris)
+
+    def __contains__(self, urn: str) -> bool:
+        return urn in self._uris
+
+    @property
+    def is_complete(self) -> bool:
+        """Whether a lookup miss means that the URN is not in the KB."""
+        return self.max_size is None
+
+    def get(self, urn: str) -> Optional[str]:
+        """Returns the URI of the resource identified by `urn` (``None`` if unknown)."""
+        uri = self._uris.get(urn)
+        if uri is not None and self.max_size is not None:
+            self._uris.move_to_end(urn)
+        return uri
+
+    def add(self, urn: str, uri: str) -> None:
+        """Adds a new URN => URI entry to the index."""
+        self._uris[urn] = uri
+        self._uris.move_to_end(urn)
+        self._urns[uri] = urn
+        if self.max_size is not None and len(self._uris) > self.max_size:
+            evicted_urn, evicted_uri = self._uris.popitem(last=False)
+            if self._urns.get(evicted_uri) == evicted_urn:
+                del self._urns[evicted_uri]
+
+    def replace(self, urn: str, uri: str) -> None:
+        """Changes the URN of a resource (e.g. after ``set_urn()``)."""
+        previous_urn = self._urns.get(uri)
+        if previous_urn is not None and previous_urn != urn:
+            self.remove(previous_urn)
+        self.add(urn, uri)
+
+    def remove(self, urn: str) -> None:
+        """Removes a URN from the index (if present)."""
+        uri = self._uris.pop(urn, None)
+        if uri is not None and self._urns.get(uri) == urn:
+            del self._urns[uri]
@@ -3,6 +3,7 @@
 # author: Matteo Romanello, matteo.romanello@gmail.com
 
 import os
+import itertools
 
 # import ipdb
 
@@ -16,12 +17,25 @@ import logging
 from surf.resource import Resource
 from hucitlib.surfext import *
 from pyCTS import CTS_URN
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, Iterable, Iterator, List, Tuple
 import pkg_resources
 import hucitlib.__version__
 from hucitlib.exceptions import ResourceNotFound
+from hucitlib.index import UrnIndex
+from hucitlib.catalog import Catalog
+from hucitlib.search import LabelIndex, AUTHOR, WORK
+from hucitlib.abbreviations import AbbreviationMatcher
+from hucitlib.recognition import NameRecognizer
+from hucitlib.compiled import get_compiled_store_path, open_compiled_store
+from hucitlib.snapshot import (
+    get_snapshot_path,
+    load_snapshot,
+    save_snapshot,
+    remove_snapshot,
+)
 from retrying import retry
 from rdflib import Literal, URIRef
+from SPARQLWrapper import SPARQLWrapper, POST
 from tqdm import tqdm
 
 # from multiprocessing import Pool
@@ -31,6 +45,29 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_CONFIG_FILENAME = "druid.ini"
 
+SPARQL_PREFIXES = """
+    PREFIX frbroo: <http://erlangen-crm.org/efrbroo/>
+    PREFIX crm: <http://erlangen-crm.org/current/>
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    PREFIX hucit: <http://purl.org/net/hucit#>
+"""
+
+# max number of CTS URNs in the VALUES clause of a single SPARQL query
+SPARQL_VALUES_CHUNK_SIZE = 500
+
+# lookup tables that can be persisted in a snapshot (see `hucitlib.snapshot`)
+LOOKUP_TABLES = [
+    "author_names",
+    "author_abbreviations",
+    "work_titles",
+    "work_abbreviations",
+    "urn_uris",
+]
+
+# parsed in-memory stores shared by the KBs of this process (and of the processes
+# forked from it), keyed by the KB's sources (see `KnowledgeBase(share_store=True)`)
+_shared_stores = {}
+
 
 def get_abbreviations(kb):
     """
@@ -65,11 +102,33 @@ class KnowledgeBase(object):
         surf.ns.register(hucit="http://purl.org/net/hucit#")
         return
 
-    def __init__(self, config_file: str = None) -> None:
+    def __init__(
+        self,
+        config_file: str = None,
+        bulk_fetch: bool = False,
+        cache_dir: str = None,
+        share_store: bool = False,
+    ) -> None:
         """
         :param str config_file: Path to the configuration file containing the
             parameters to connect to the triple store whose data will be accessible
             via the ``KnowledgeBase`` object.
+        :param bool bulk_fetch: If ``True``, the legacy dictionaries (e.g.
+            :py:attr:`author_names`) are built by means of a few aggregated SPARQL
+            queries instead of walking through every single author and work.
+        :param str cache_dir: If specified, the lookup tables (legacy dictionaries
+            and URN => URI map) are persisted as a snapshot in this directory and
+            reloaded at startup, as long as the content of the KB does not change
+            (see :py:mod:`hucitlib.snapshot`).
+        :param bool share_store: If ``True`` (and the KB is loaded in memory), the
+            parsed triples are shared by all the KBs with the same sources in this
+            process, including the copies of the KB unpickled in processes forked
+            from it (e.g. ``multiprocessing`` workers), thus unpickling it does not
+            require to parse the sources again. Note that changes made through one
+            of these KBs are visible from all the others. Sharing only works
+            within a process, or with processes started with ``fork``: those
+            started otherwise (e.g. ``spawn``, the default on macOS and
+            Windows) parse the sources again when unpickling the KB.
         :return: Description of returned object.
         :rtype: None
 
@@ -94,6 +153,18 @@ class KnowledgeBase(object):
         self._work_titles = None
         self._author_abbreviations = None
         self._work_abbreviations = None
+        self._urn_uris = None
+        self._urn_index = None
+        self._author_work_map = None
+        self._author_work_map_enabled = False
+        self._bulk_fetch = bulk_fetch
+        self._snapshot_path = None
+        self._fingerprint = None
+        self._share_store = share_store
+        self._catalog = None
+        self._label_index = None
+        self._abbreviation_matcher = None
+        self._name_recognizer = None
 
         if config_file is None:
             config_file = pkg_resources.resource_filename(
@@ -108,24 +179,9 @@ class KnowledgeBase(object):
                 self._store_params["port"] = int(
                     self._store_params["port"]
                 )  # force the `port` to be an integer
-            self._store = surf.Store(**self._store_params)
-            self._session = surf.Session(self._store, {})
-            if "rdflib_store" in self._store_params:
-                basedir = pkg_resources.resource_filename("knowledge_base", "data/kb/")
-                sources = [
-                    "%s%s" % (basedir, file)
-                    for file in self._store_params["knowledge_base_sources"].split(",")
-                ]
-                source_format = self._store_params["sources_format"]
-                for source_path in sources:
-                    self._store.writer._graph.parse(
-                        source=source_path, format=source_format
-                    )
-                    logger.info(
-                        "The KnowledgeBase contains %i triples" % self._store.size()
-                    )
-            self._register_namespaces()
-            self._register_mappings()
+            self._init_store()
+            if cache_dir is not None:
+                self._load_snapshot(cache_dir)
         except Exception as e:
             raise e
 
@@ -141,30 +197,86 @@ class KnowledgeBase(object):
 
     def __setstate__(self, dict):
         self.__dict__.update(dict)
-        self._store = surf.Store(**self._store_params)
-        self._session = surf.Session(self._store, {})
         # don't forget to reload the triples if it's an in-memory store!
-        if "rdflib_store" in self._store_params:
-            basedir = pkg_resources.resource_filename("knowledge_base", "data/kb/")
-            sources = [
-                "%s%s" % (basedir, file)
-                for file in self._store_params["knowledge_base_sources"].split(",")
-            ]
-            source_format = self._store_params["sources_format"]
-            for source_path in sources:
+        self._init_store()
+
+    def _get_sources(self) -> List[str]:
+        """Returns the paths to the source files of an in-memory store.
+
+        Relative paths are resolved against the KB's data directory
+        (``hucitlib/data/kb/``).
+        """
+        basedir = pkg_resources.resource_filename("hucitlib", "data/kb/")
+        sources = [
+            os.path.join(basedir, file.strip())
+            for file in self._store_params["knowledge_base_sources"].split(",")
+        ]
+        for source_path in sources:
+            if not os.path.exists(source_path):
+                raise IOError(f"The source of the KB {source_path} does not exist")
+        return sources
+
+    def _init_store(self) -> None:
+        """Connects to the triple store and registers the SuRF mappings.
+
+        In-memory stores are populated with the KB's sources, which are parsed
+        unless a compiled store is configured (see :py:mod:`hucitlib.compiled`),
+        or the KB shares a store that was already parsed in this process.
+        Compiled stores are opened read-only, as they are shared by all the
+        KBs created from the same sources.
+        """
+        store_params = dict(self._store_params)
+        compiled = "compiled_store_dir" in store_params
+        if compiled:
+            sources = self._get_sources()
+            source_format = store_params["sources_format"]
+            compiled_store_path = get_compiled_store_path(
+                store_params["compiled_store_dir"], sources, source_format
+            )
+            store_params["rdflib_store"] = open_compiled_store(
+                compiled_store_path, sources, source_format
+            )
+
+        in_memory = "rdflib_store" in store_params and not compiled
+        shared_store = None
+        if in_memory and self._share_store:
+            shared_key = (tuple(self._get_sources()), store_params["sources_format"])
+            shared_store = _shared_stores.get(shared_key)
+            if shared_store is not None:
+                store_params["rdflib_store"] = shared_store
+                logger.info("Re-using the in-memory store shared by this process")
+
+        self._store = surf.Store(**store_params)
+        self._session = surf.Session(self._store, {})
+        if in_memory and shared_store is None:
+            source_format = store_params["sources_format"]
+            for source_path in self._get_sources():
                 self._store.writer._graph.parse(
                     source=source_path, format=source_format
                 )
                 logger.info(
                     "The KnowledgeBase contains %i triples" % self._store.size()
                 )
+            if self._share_store:
+                _shared_stores[shared_key] = self._store.writer._graph.store
         self._register_namespaces()
         self._register_mappings()
+        self._session.urn_index = self._urn_index
+        self._session.on_urn_change = self._on_urn_change
+        self._session.author_work_map = (
+            self._author_work_map if self._author_work_map_enabled else None
+        )
+        self._session.type_registry = TypeRegistry(self._session)
 
     @property
     def settings(self) -> Dict[str, str]:
         return self._store_params
 
+    @property
+    def urn_index(self) -> Optional[UrnIndex]:
+        """The in-process index of CTS URNs (``None`` unless enabled)."""
+        return self._urn_index
+
     # some legacy methods
     @property
     def author_names(self) -> Dict[str, str]:
@@ -187,58 +299,620 @@ class KnowledgeBase(object):
             }
 
         if self._author_names is None:
-            authors = self.get_authors()
-            author_names = [
-                fetch_names(author)
-                for author in tqdm(authors)
-                if author.get_urn() is not None
-            ]
-            self._author_names = dict(ChainMap(*author_names))
+            if self._bulk_fetch:
+                self._author_names = self._fetch_author_names()
+            else:
+                authors = self.get_authors()
+                author_names = [
+                    fetch_names(author)
+                    for author in tqdm(authors)
+                    if author.get_urn() is not None
+                ]
+                self._author_names = dict(ChainMap(*author_names))
+            self._update_snapshot()
 
         return self._author_names
 
     @property
-    def author_abbreviations(self):
+    def author_abbreviations(self) -> Dict[str, str]:
+        if self._author_abbreviations is None:
+            if self._bulk_fetch:
+                self._author_abbreviations = self._fetch_author_abbreviations()
+            else:
+                self._author_abbreviations = {
+                    "%s$$n%i" % (author.get_urn(), i): abbrev
+                    for author in self.get_authors()
+                    for i, abbrev in enumerate(author.get_abbreviations())
+                    if author.get_urn() is not None
+                }
+            self._update_snapshot()
+        return self._author_abbreviations
+
+    @property
+    def work_titles(self) -> Dict[str, str]:
+        if self._work_titles is None:
+            if self._bulk_fetch:
+                self._work_titles = self._fetch_work_titles()
+            else:
+                self._work_titles = {
+                    "%s$$n%i" % (work.get_urn(), i): title[1]
+                    for author in self.get_authors()
+                    for work in author.get_works()
+                    for i, title in enumerate(work.get_titles())
+                    if work.get_urn() is not None
+                }
+            self._update_snapshot()
+        return self._work_titles
+
+    @property
+    def work_abbreviations(self) -> Dict[str, str]:
+        if self._work_abbreviations is None:
+            if self._bulk_fetch:
+                self._work_abbreviations = self._fetch_work_abbreviations()
+            else:
+                self._work_abbreviations = {
+                    "%s$$n%i" % (work.get_urn(), i): abbrev
+                    for author in self.get_authors()
+                    for work in author.get_works()
+                    for i, abbrev in enumerate(
+                        work.get_abbreviations(combine=False)
+                        + work.get_abbreviations(combine=True)
+                    )
+                }
+            self._update_snapshot()
+        return self._work_abbreviations
+
+    def get_fingerprint(self) -> str:
+        """Returns a fingerprint of the current content of the knowledge base.
+
+        .. note::
+            The fingerprint is the number of triples in the store, thus it
+            won't change when a triple is replaced by another one (e.g. when
+            changing the label of an entry).
+
+        :return: The fingerprint.
+        :rtype: str
+
+        """
+        rows = self._execute_select("SELECT (COUNT(*) AS ?triples) WHERE { ?s ?p ?o }")
+        return rows[0]["triples"]
+
+    def _load_snapshot(self, cache_dir: str) -> None:
+        """Loads the lookup tables from a snapshot in `cache_dir` (if valid)."""
+        self._snapshot_path = get_snapshot_path(cache_dir, self.settings)
+        self._fingerprint = self.get_fingerprint()
+        tables = load_snapshot(self._snapshot_path, self._fingerprint)
+        if tables is not None:
+            for name in LOOKUP_TABLES:
+                setattr(self, f"_{name}", tables.get(name))
+
+    def _update_snapshot(self) -> None:
+        """Persists the lookup tables computed so far (if snapshots are enabled)."""
+        if self._snapshot_path is None:
+            return
+        if self._urn_uris is None:
+            self._urn_uris = self._fetch_urn_uris()
+        tables = {
+            name: getattr(self, f"_{name}")
+            for name in LOOKUP_TABLES
+            if getattr(self, f"_{name}") is not None
+        }
+        save_snapshot(self._snapshot_path, self._fingerprint, tables)
+
+    def invalidate_snapshot(self) -> None:
+        """Drops the lookup tables, both in memory and on disk.
+
+        To be called after modifying the KB in ways that don't affect
+        its fingerprint (see :py:meth:`get_fingerprint`), which is done
+        automatically when a CTS URN is set. The author → works
+        map is dropped as well (and disabled, see
+        :py:meth:`enable_author_work_map`).
+        """
+        for name in LOOKUP_TABLES:
+            setattr(self, f"_{name}", None)
+        self.disable_author_work_map()
+        self._author_work_map = None
+        if self._snapshot_path is not None:
+            remove_snapshot(self._snapshot_path)
+            self._fingerprint = self.get_fingerprint()
+
+    def _on_urn_change(self, urn: str, uri: str) -> None:
+        """Called when the CTS URN of an author or work is set (see
+        :py:meth:`~hucitlib.surfext.HucitAuthor.set_urn`).
+
+        The lookup tables are keyed by CTS URN, and replacing a URN does not
+        change the fingerprint of the KB, thus the tables and their snapshot
+        are dropped (see :py:meth:`invalidate_snapshot`).
+        """
+        logger.info(f"CTS URN of {uri} set to {urn}: dropping the lookup tables")
+        self.invalidate_snapshot()
+
+    def _execute_select(self, query: str) -> List[Dict[str, str]]:
+        """Executes a SPARQL SELECT query against the underlying store.
+
+        :param str query: The SPARQL query (prefixes are prepended automatically).
+        :return: One dictionary per result row, mapping variable names to values.
+        :rtype: List[Dict[str, str]]
+
+        """
+        response = self._store.execute_sparql(SPARQL_PREFIXES + query)
+        return [
+            {variable: binding[variable]["value"] for variable in binding}
+            for binding in response["results"]["bindings"]
+        ]
+
+    def _execute_update(self, query: str) -> None:
+        """Executes a SPARQL UPDATE query against the underlying store."""
+        if "rdflib_store" in self._store_params:
+            self._store.writer._graph.update(SPARQL_PREFIXES + query)
+        else:
+            endpoint = self._store_params.get(
+                "update_endpoint", self._store_params["endpoint"]
+            )
+            sparql = SPARQLWrapper(endpoint)
+            sparql.setMethod(POST)
+            sparql.setQuery(SPARQL_PREFIXES + query)
+            sparql.query()
+
+    def _execute_paged_select(
+        self, query: str, page_size: int = SPARQL_PAGE_SIZE
+    ) -> List[Dict[str, str]]:
+        """Executes a SPARQL SELECT query in pages of `page_size` rows.
+
+        Some triple stores (e.g. Virtuoso) silently truncate large result
+        sets, thus `query` should contain an ``ORDER BY`` clause so that
+        pages are stable.
+        """
+        rows = []
+        offset = 0
+        while True:
+            page = self._execute_select(
+                "%s LIMIT %i OFFSET %i" % (query, page_size, offset)
+            )
+            rows += page
+            if len(page) < page_size:
+                return rows
+            offset += page_size
+
+    def _fetch_author_urns(self) -> Dict[str, str]:
+        """Returns a dictionary mapping author URIs to their CTS URNs."""
+        rows = self._execute_select(
+            """
+            SELECT ?author ?urn
+            WHERE {
+                ?author a frbroo:F10_Person ;
+                    crm:P1_is_identified_by ?id .
+                ?id a crm:E42_Identifier ;
+                    crm:P2_has_type <%s> ;
+                    rdfs:label ?urn .
+            }
+        """
+            % (BASE_URI_TYPES % "CTS_URN")
+        )
+        urns = {}
+        for row in rows:
+            urns.setdefault(row["author"], row["urn"])
+        return urns
+
+    def _fetch_work_urns(self) -> Dict[str, Tuple[str, str]]:
+        """Returns a dictionary mapping work URIs to (author URI, work CTS URN).
+
+        Only works that are attributed to an author (and have a URN) are
+        considered, like in the legacy dictionaries.
+        """
+        urns = {}
+        for author, works in self.get_author_work_map().items():
+            for work, urn in works:
+                if urn is not None:
+                    urns.setdefault(work, (author, urn))
+        return urns
+
+    def _fetch_urn_uris(self) -> Dict[str, str]:
+        """Returns a dictionary mapping the CTS URNs of authors and works to their URIs."""
+        rows = self._execute_select(
+            """
+            SELECT ?resource ?urn
+            WHERE {
+                { ?resource a frbroo:F10_Person } UNION { ?resource a frbroo:F1_Work }
+                ?resource crm:P1_is_identified_by ?id .
+                ?id a crm:E42_Identifier ;
+                    crm:P2_has_type <%s> ;
+                    rdfs:label ?urn .
+            }
+        """
+            % (BASE_URI_TYPES % "CTS_URN")
+        )
+        return {row["urn"]: row["resource"] for row in rows}
+
+    def _fetch_labels(
+        self, query: str, languages: bool = False, first_of: str = None
+    ) -> Dict[str, List]:
+        """Runs a query returning (?resource, ?label) rows and groups the labels.
+
+        :param str query: A SPARQL query binding ``?resource`` and ``?label``
+            (and ``?lang``, if `languages` is ``True``).
+        :param bool languages: If ``True``, labels are returned as (language,
+            label) tuples, where language is ``None`` for plain literals.
+        :param str first_of: If specified, a variable bound by the query (e.g.
+            ``title``): only the labels of its first value are kept for each
+            resource, like SuRF's ``.first``.
+        :return: A dictionary mapping resource URIs to their (unique) labels, in
+            the order they were returned by the triple store.
+        :rtype: Dict[str, List]
+
+        """
+        labels = {}
+        first_values = {}
+        for row in self._execute_select(query):
+            if first_of is not None:
+                first_value = first_values.setdefault(row["resource"], row[first_of])
+                if row[first_of] != first_value:
+                    continue
+            resource_labels = labels.setdefault(row["resource"], [])
+            label = row["label"]
+            if languages:
+                label = (row.get("lang") or None, label)
+            if label not in resource_labels:
+                resource_labels.append(label)
+        return labels
+
+    def _fetch_author_name_lists(self, languages: bool = False) -> Dict[str, List]:
+        """Returns a dictionary mapping author URIs to their names.
+
+        :param bool languages: If ``True``, names are (language, name) tuples.
+        """
+        return self._fetch_labels(
+            """
+            SELECT ?resource ?label ?lang
+            WHERE {
+                ?resource a frbroo:F10_Person ;
+                    crm:P1_is_identified_by ?name .
+                ?name a frbroo:F12_Name ;
+                    rdfs:label ?label .
+                BIND (LANG(?label) AS ?lang)
+            }
+        """,
+            languages,
+        )
+
+    def _fetch_author_names(self) -> Dict[str, str]:
+        """Bulk version of :py:attr:`author_names`."""
+        urns = self._fetch_author_urns()
+        names = self._fetch_author_name_lists()
         return {
-            "%s$$n%i" % (author.get_urn(), i): abbrev
-            for author in self.get_authors()
-            for i, abbrev in enumerate(author.get_abbreviations())
-            if author.get_urn() is not None
+            "%s$$n%i" % (urns[author], i): name.title()
+            for author, author_names in names.items()
+            if author in urns
+            for i, name in enumerate(author_names)
         }
 
-    @property
-    def work_titles(self):
+    def _fetch_author_abbreviation_lists(self) -> Dict[str, List[str]]:
+        """Returns a dictionary mapping author URIs to their name abbreviations."""
+        return self._fetch_labels(
+            """
+            SELECT ?resource ?label
+            WHERE {
+                ?resource a frbroo:F10_Person ;
+                    crm:P1_is_identified_by ?name .
+                ?name a frbroo:F12_Name ;
+                    crm:P139_has_alternative_form ?abbreviation .
+                ?abbreviation crm:P2_has_type <%s> ;
+                    rdfs:label ?label .
+            }
+        """
+            % (BASE_URI_TYPES % "abbreviation")
+        )
+
+    def _fetch_author_abbreviations(self) -> Dict[str, str]:
+        """Bulk version of :py:attr:`author_abbreviations`."""
+        urns = self._fetch_author_urns()
+        abbreviations = self._fetch_author_abbreviation_lists()
         return {
-            "%s$$n%i" % (work.get_urn(), i): title[1]
-            for author in self.get_authors()
-            for work in author.get_works()
-            for i, title in enumerate(work.get_titles())
-            if work.get_urn() is not None
+            "%s$$n%i" % (urns[author], i): abbreviation
+            for author, author_abbreviations in abbreviations.items()
+            if author in urns
+            for i, abbreviation in enumerate(author_abbreviations)
         }
 
-    @property
-    def work_abbreviations(self):
+    def _fetch_work_title_lists(
+        self, languages: bool = False, first_title: bool = False
+    ) -> Dict[str, List]:
+        """Returns a dictionary mapping work URIs to their titles.
+
+        :param bool languages: If ``True``, titles are (language, title) tuples.
+        :param bool first_title: If ``True``, only the labels of the first title
+            of each work are returned, as in
+            :py:meth:`~hucitlib.surfext.HucitWork.get_titles`.
+        """
+        return self._fetch_labels(
+            """
+            SELECT ?resource ?title ?label ?lang
+            WHERE {
+                ?resource a frbroo:F1_Work ;
+                    frbroo:P102_has_title ?title .
+                ?title rdfs:label ?label .
+                BIND (LANG(?label) AS ?lang)
+            }
+        """,
+            languages,
+            first_of="title" if first_title else None,
+        )
+
+    def _fetch_work_titles(self) -> Dict[str, str]:
+        """Bulk version of :py:attr:`work_titles` (the labels of the first title
+        of each work with a CTS URN)."""
+        urns = self._fetch_work_urns()
+        titles = self._fetch_work_title_lists(first_title=True)
         return {
-            "%s$$n%i" % (work.get_urn(), i): abbrev
-            for author in self.get_authors()
-            for work in author.get_works()
-            for i, abbrev in enumerate(
-                work.get_abbreviations(combine=False)
-                + work.get_abbreviations(combine=True)
-            )
+            "%s$$n%i" % (urns[work][1], i): title
+            for work, work_titles in titles.items()
+            if work in urns
+            for i, title in enumerate(work_titles)
         }
 
-    @retry(stop_max_attempt_number=5, wait_fixed=5000)
-    def get_resource_by_urn(self, urn):
+    def _fetch_work_abbreviation_lists(self) -> Dict[str, List[str]]:
+        """Returns a dictionary mapping work URIs to their title abbreviations."""
+        return self._fetch_labels(
+            """
+            SELECT ?resource ?label
+            WHERE {
+                ?resource a frbroo:F1_Work ;
+                    frbroo:P102_has_title ?title .
+                ?title a frbroo:E35_Title ;
+                    crm:P139_has_alternative_form ?abbreviation .
+                ?abbreviation crm:P2_has_type <%s> ;
+                    rdfs:label ?label .
+            }
+        """
+            % (BASE_URI_TYPES % "abbreviation")
+        )
+
+    def _fetch_work_abbreviations(self) -> Dict[str, str]:
+        """Bulk version of :py:attr:`work_abbreviations`.
+
+        As in :py:meth:`~hucitlib.surfext.HucitWork.get_abbreviations`, the
+        combined forms are the cartesian product of author and work abbreviations
+        (e.g. "Hom. Il."), and fall back to the plain work abbreviations when the
+        author has none. Unlike the legacy dictionary, works without a CTS URN
+        are skipped (instead of being keyed as ``None$$n<i>``).
+        """
+        urns = self._fetch_work_urns()
+        author_abbreviations = self._fetch_author_abbreviation_lists()
+        abbreviations = self._fetch_work_abbreviation_lists()
+        work_abbreviations = {}
+        for work, abbrevs in abbreviations.items():
+            if work not in urns:
+                continue
+            author, urn = urns[work]
+            combined = [
+                "%s %s" % (author_abbrev, work_abbrev)
+                for author_abbrev, work_abbrev in itertools.product(
+                    author_abbreviations.get(author, []), abbrevs
+                )
+            ]
+            for i, abbreviation in enumerate(abbrevs + (combined or abbrevs)):
+                work_abbreviations["%s$$n%i" % (urn, i)] = abbreviation
+        return work_abbreviations
+
+    def _fetch_author_rows(self) -> Dict[str, Optional[str]]:
+        """Returns a dictionary mapping all author URIs to their CTS URNs (if any).
+
+        Authors are sorted by URI, and only the first URN of each author is kept.
+        """
+        rows = self._execute_select(
+            """
+            SELECT ?author ?urn
+            WHERE {
+                ?author a frbroo:F10_Person .
+                OPTIONAL {
+                    ?author crm:P1_is_identified_by ?id .
+                    ?id a crm:E42_Identifier ;
+                        crm:P2_has_type <%s> ;
+                        rdfs:label ?urn .
+                }
+            }
+            ORDER BY ?author
+        """
+            % (BASE_URI_TYPES % "CTS_URN")
+        )
+        authors = {}
+        for row in rows:
+            authors.setdefault(row["author"], row.get("urn"))
+        return authors
+
+    def _fetch_work_rows(self) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """Returns a dictionary mapping all work URIs to (CTS URN, author URI).
+
+        Works are sorted by URI, and only the first URN and author of each work
+        are kept (both may be ``None``).
+        """
+        rows = self._execute_select(
+            """
+            SELECT ?work ?urn ?author
+            WHERE {
+                ?work a frbroo:F1_Work .
+                OPTIONAL {
+                    ?work crm:P1_is_identified_by ?id .
+                    ?id a crm:E42_Identifier ;
+                        crm:P2_has_type <%s> ;
+                        rdfs:label ?urn .
+                }
+                OPTIONAL {
+                    ?author frbroo:P14i_performed ?creation .
+                    ?creation frbroo:R16_initiated ?work .
+                }
+            }
+            ORDER BY ?work
+        """
+            % (BASE_URI_TYPES % "CTS_URN")
+        )
+        works = {}
+        for row in rows:
+            works.setdefault(row["work"], (row.get("urn"), row.get("author")))
+        return works
+
+    def _build_catalog(self) -> Catalog:
+        """Builds the catalog of authors and works (see :py:meth:`get_catalog`)."""
+        authors = self._fetch_author_rows()
+        works = self._fetch_work_rows()
+        names = self._fetch_author_name_lists()
+        author_abbreviations = self._fetch_author_abbreviation_lists()
+        titles = self._fetch_work_title_lists()
+        work_abbreviations = self._fetch_work_abbreviation_lists()
+
+        return Catalog.from_records(
+            (
+                (uri, urn, names.get(uri, []), author_abbreviations.get(uri, []))
+                for uri, urn in authors.items()
+            ),
+            (
+                (
+                    uri,
+                    urn,
+                    author,
+                    titles.get(uri, []),
+                    work_abbreviations.get(uri, []),
+                )
+                for uri, (urn, author) in works.items()
+            ),
+            fingerprint=self.get_fingerprint(),
+        )
+
+    def get_catalog(self, path: str = None, refresh: bool = False) -> Catalog:
+        """Returns a compact catalog of all authors and works in the KB.
+
+        The catalog is built with a few aggregated queries the first time this
+        method is called, and then kept in memory, so that listing authors and
+        works (with their URNs, names, titles and abbreviations) does not
+        require further requests to the triple store (see
+        :py:mod:`hucitlib.catalog`).
+
+        :param str path: If specified, the catalog is loaded from this file, as
+            long as the KB has not changed since it was written; otherwise it is
+            built and saved to this file.
+        :param bool refresh: If ``True``, the catalog is built again.
+        :return: The catalog.
+        :rtype: Catalog
+
+        .. code-block:: python
+
+            >>> catalog = kb.get_catalog("hucit-catalog.bin")
+            >>> [author.urn for author in catalog.get_authors()][:2]
+            ['urn:cts:greekLit:tlg0012', 'urn:cts:latinLit:phi0690']
+
+        """
+        return self._get_derived_index(
+            "_catalog", Catalog, self._build_catalog, path, refresh
+        )
+
+    def _get_derived_index(self, attribute: str, index_class, build, path, refresh):
+        """Returns an index derived from the KB's data (e.g. the catalog).
+
+        The index is kept in `attribute` once built. If `path` is specified,
+        the index is loaded from there (as long as the KB has not changed since
+        it was written), or built and saved there.
+        """
+        if getattr(self, attribute) is not None and not refresh:
+            return getattr(self, attribute)
+
+        if path is not None and os.path.exists(path) and not refresh:
+            index = index_class.load(path)
+            if index.fingerprint == self.get_fingerprint():
+                setattr(self, attribute, index)
+                return index
+            logger.info(f"Discarding {path} (the KB has changed)")
+
+        index = build()
+        if path is not None:
+            index.save(path)
+        setattr(self, attribute, index)
+        return index
+
+    def enable_urn_index(self, max_size: int = None) -> UrnIndex:
+        """Enables an in-process index of CTS URNs used by :py:meth:`get_resource_by_urn`.
+
+        :param int max_size: If ``None``, the index is built straight away from
+            all the identifiers in the KB (and a lookup miss means the URN does not
+            exist). Otherwise, an LRU index holding at most `max_size` entries is
+            populated as URNs are looked up.
+        :return: The newly created index.
+        :rtype: UrnIndex
+
+        .. note::
+            The index is kept up to date when CTS URNs are added or changed via
+            this ``KnowledgeBase`` (e.g. :py:meth:`create_cts_urn`), but not
+            when the triple store is modified by other processes.
+
+        """
+        index = UrnIndex(max_size)
+        if max_size is None:
+            rows = self._execute_paged_select(
+                """
+                SELECT ?resource ?urn
+                WHERE {
+                    ?resource crm:P1_is_identified_by ?id .
+                    ?id a crm:E42_Identifier ;
+                        rdfs:label ?urn .
+                }
+                ORDER BY ?id
+            """
+            )
+            for row in rows:
+                index.add(row["urn"], row["resource"])
+            logger.info(f"Built an index of {len(index)} CTS URNs")
+        self._urn_index = index
+        self._session.urn_index = index
+        return index
+
+    def disable_urn_index(self) -> None:
+        """Disables the in-process index of CTS URNs."""
+        self._urn_index = None
+        self._session.urn_index = None
+
+    def _get_resource_type(self, urn: CTS_URN):
+        """Determines the type of a resource based on CTS URN semantics.
+
+        :param CTS_URN urn: The resource's CTS URN.
+        :return: The mapped class (e.g. ``HucitWork``) of resources identified
+            by this kind of URN.
+
+        """
+        if urn.passage_component is not None:
+            return self._session.get_class(surf.ns.HUCIT["TextElement"])
+        elif urn.work is not None:
+            return self._session.get_class(surf.ns.EFRBROO["F1_Work"])
+        elif (
+            urn.work is None
+            and urn.textgroup is not None
+            and urn.passage_component is None
+        ):
+            return self._session.get_class(surf.ns.EFRBROO["F10_Person"])
+
+    @retry(
+        stop_max_attempt_number=5,
+        wait_fixed=5000,
+        retry_on_exception=lambda e: not isinstance(e, ResourceNotFound),
+    )
+    def get_resource_by_urn(self, urn, prefetch: bool = False):
         """Fetch the resource corresponding to the input CTS URN.
 
         Currently supports
         only HucitAuthor and HucitWork.
 
         :param urn: the CTS URN of the resource to fetch
+        :param bool prefetch: If ``True``, the data needed by the getters of
+            authors and works (names, titles, abbreviations, URN, etc.) is
+            fetched with a single query (see
+            :py:meth:`hucitlib.surfext.PrefetchMixin.load_deep`).
         :return: either an instance of `HucitAuthor` or of `HucitWork`
 
         """
+        resource = self._get_resource_by_urn(urn)
+        if prefetch and isinstance(resource, PrefetchMixin):
+            resource.load_deep()
+        return resource
+
+    def _get_resource_by_urn(self, urn):
         search_query = (
             """
             PREFIX frbroo: <http://erlangen-crm.org/efrbroo/>
@@ -263,17 +937,19 @@ class KnowledgeBase(object):
             urn = CTS_URN(urn)
             logger.debug("Converted the input urn from string to %s" % type(CTS_URN))
 
-        # determine the type of returned resource based on CTS URN semantics
-        if urn.passage_component is not None:
-            resource_type = self._session.get_class(surf.ns.HUCIT["TextElement"])
-        elif urn.work is not None:
-            resource_type = self._session.get_class(surf.ns.EFRBROO["F1_Work"])
-        elif (
-            urn.work is None
-            and urn.textgroup is not None
-            and urn.passage_component is None
-        ):
-            resource_type = self._session.get_class(surf.ns.EFRBROO["F10_Person"])
+        resource_type = self._get_resource_type(urn)
+
+        if self._urn_index is not None:
+            resource_uri = self._urn_index.get(str(urn))
+            if resource_uri is not None:
+                return self._session.get_resource(resource_uri, resource_type)
+            elif self._urn_index.is_complete:
+                raise ResourceNotFound
+
+        # the URN => URI map is available when loaded from a snapshot (it is
+        # dropped when a URN changes, see `_on_urn_change`)
+        if self._urn_uris is not None and str(urn) in self._urn_uris:
+            return self._session.get_resource(self._urn_uris[str(urn)], resource_type)
 
         # execute the sparql query and return the result
         result = self._store.execute_sparql(search_query)
@@ -282,67 +958,313 @@ class KnowledgeBase(object):
         else:
             tmp = result["results"]["bindings"][0]
             resource_uri = tmp["resource_URI"]["value"]
+            if self._urn_index is not None:
+                self._urn_index.add(str(urn), resource_uri)
             return self._session.get_resource(resource_uri, resource_type)
 
-    # TODO: if the underlying store is not Virtuoso it should fail
-    # and say something useful ;-)
-    def search(self, search_string: str) -> List[Tuple[str, Resource]]:
+    @retry(stop_max_attempt_number=5, wait_fixed=5000)
+    def _fetch_uris_by_urns(self, urns: List[str]) -> Dict[str, str]:
+        """Resolves a chunk of CTS URNs to resource URIs with a single query."""
+        rows = self._execute_select(
+            """
+            SELECT ?resource ?urn
+            WHERE {
+                VALUES ?urn { %s }
+                ?id a crm:E42_Identifier ;
+                    rdfs:label ?urn .
+                ?resource crm:P1_is_identified_by ?id .
+            }
+        """
+            % " ".join(Literal(urn).n3() for urn in urns)
+        )
+        return {row["urn"]: row["resource"] for row in rows}
+
+    def get_resources_by_urns(
+        self, urns: Iterable[str], chunk_size: int = SPARQL_VALUES_CHUNK_SIZE
+    ) -> Dict[str, Optional[Resource]]:
+        """Fetch the resources corresponding to the input CTS URNs.
+
+        This is the batch version of :py:meth:`get_resource_by_urn`: URNs are
+        resolved by means of one SPARQL query per chunk of `chunk_size` URNs.
+
+        :param Iterable[str] urns: The CTS URNs of the resources to fetch.
+        :param int chunk_size: Max number of URNs resolved by a single query.
+        :return: A dictionary mapping each input URN to an instance of
+            ``HucitAuthor``, ``HucitWork`` or ``HucitTextElement``; the value is
+            ``None`` when the URN is invalid or not found in the KB.
+        :rtype: Dict[str, Optional[Resource]]
+
+        .. code-block:: python
+
+            >>> resources = kb.get_resources_by_urns([
+                "urn:cts:greekLit:tlg0012",
+                "urn:cts:greekLit:tlg0012.tlg001"
+            ])
+            >>> missing = [urn for urn, res in resources.items() if res is None]
+
+        """
+        resources = {}
+        resource_types = {}
+        to_fetch = []
+
+        for urn in urns:
+            urn = str(urn)
+            if urn in resources:
+                continue
+            # keeps the output in the same order as the input
+            resources[urn] = None
+            try:
+                resource_types[urn] = self._get_resource_type(CTS_URN(urn))
+            except Exception as e:
+                logger.warning(f"Invalid CTS URN {urn}: {e}")
+                continue
+
+            resource_uri = (
+                self._urn_index.get(urn) if self._urn_index is not None else None
+            )
+            if resource_uri is not None:
+                resources[urn] = self._session.get_resource(
+                    resource_uri, resource_types[urn]
+                )
+            elif self._urn_index is None or not self._urn_index.is_complete:
+                to_fetch.append(urn)
+
+        for start in range(0, len(to_fetch), chunk_size):
+            chunk = to_fetch[start : start + chunk_size]
+            resource_uris = self._fetch_uris_by_urns(chunk)
+            for urn in chunk:
+                resource_uri = resource_uris.get(urn)
+                if resource_uri is None:
+                    continue
+                if self._urn_index is not None:
+                    self._urn_index.add(urn, resource_uri)
+                resources[urn] = self._session.get_resource(
+                    resource_uri, resource_types[urn]
+                )
+
+        missing = [urn for urn, resource in resources.items() if resource is None]
+        if missing:
+            logger.warning(f"{len(missing)} CTS URNs could not be resolved")
+            logger.debug(f"Unresolved CTS URNs: {missing}")
+        return resources
+
+    def _build_label_index(self) -> LabelIndex:
+        """Builds the index of author and work labels (see :py:meth:`get_label_index`)."""
+        labels = [
+            (self._fetch_author_name_lists(), AUTHOR),
+            (self._fetch_author_abbreviation_lists(), AUTHOR),
+            (self._fetch_work_title_lists(), WORK),
+            (self._fetch_work_abbreviation_lists(), WORK),
+        ]
+        return LabelIndex(
+            (
+                (label, uri, resource_type)
+                for resource_labels, resource_type in labels
+                for uri, uri_labels in resource_labels.items()
+                for label in uri_labels
+            ),
+            fingerprint=self.get_fingerprint(),
+        )
+
+    def get_label_index(self, path: str = None, refresh: bool = False) -> LabelIndex:
+        """Returns a local full-text index of the labels of authors and works.
+
+        The index is built the first time this method is called, and then used
+        by :py:meth:`search` instead of querying the triple store (see
+        :py:mod:`hucitlib.search`).
+
+        :param str path: If specified, the index is loaded from this file, as
+            long as the KB has not changed since it was written; otherwise it is
+            built and saved to this file.
+        :param bool refresh: If ``True``, the index is built again.
+        :return: The label index.
+        :rtype: LabelIndex
+
+        """
+        return self._get_derived_index(
+            "_label_index", LabelIndex, self._build_label_index, path, refresh
+        )
+
+    def get_abbreviation_matcher(
+        self, path: str = None, refresh: bool = False
+    ) -> AbbreviationMatcher:
+        """Returns a matcher of author and work abbreviations (e.g. "Hom. Il.").
+
+        The matcher is built from :py:attr:`author_abbreviations` and
+        :py:attr:`work_abbreviations` the first time this method is called
+        (see :py:mod:`hucitlib.abbreviations`).
+
+        :param str path: If specified, the matcher is loaded from this file, as
+            long as the KB has not changed since it was written; otherwise it is
+            built and saved to this file.
+        :param bool refresh: If ``True``, the matcher is built again.
+        :return: The abbreviation matcher.
+        :rtype: AbbreviationMatcher
+
+        .. code-block:: python
+
+            >>> matcher = kb.get_abbreviation_matcher()
+            >>> [match.urn for match in matcher.match("Hom. Il.")]
+            ['urn:cts:greekLit:tlg0012.tlg001']
+
+        """
+        return self._get_derived_index(
+            "_abbreviation_matcher",
+            AbbreviationMatcher,
+            lambda: AbbreviationMatcher.from_dictionaries(
+                self.author_abbreviations,
+                self.work_abbreviations,
+                fingerprint=self.get_fingerprint(),
+            ),
+            path,
+            refresh,
+        )
+
+    def get_name_recognizer(
+        self, path: str = None, refresh: bool = False
+    ) -> NameRecognizer:
+        """Returns a recognizer of author names and work titles in running text.
+
+        The recognizer is built from :py:attr:`author_names`,
+        :py:attr:`author_abbreviations`, :py:attr:`work_titles` and
+        :py:attr:`work_abbreviations` the first time this method is called
+        (see :py:mod:`hucitlib.recognition`).
+
+        :param str path: If specified, the recognizer is loaded from this file,
+            as long as the KB has not changed since it was written; otherwise it
+            is built and saved to this file.
+        :param bool refresh: If ``True``, the recognizer is built again.
+        :return: The name recognizer.
+        :rtype: NameRecognizer
+
+        .. code-block:: python
+
+            >>> recognizer = kb.get_name_recognizer()
+            >>> [match.urn for match in recognizer.find("Homer, Iliad 1.1")]
+            ['urn:cts:greekLit:tlg0012', 'urn:cts:greekLit:tlg0012.tlg001']
+
+        """
+        return self._get_derived_index(
+            "_name_recognizer",
+            NameRecognizer,
+            lambda: NameRecognizer.from_dictionaries(
+                authors=[self.author_names, self.author_abbreviations],
+                works=[self.work_titles, self.work_abbreviations],
+                fingerprint=self.get_fingerprint(),
+            ),
+            path,
+            refresh,
+        )
+
+    def search(
+        self, search_string: str, local: bool = None
+    ) -> List[Tuple[str, Resource]]:
         """Searches for a given string through the resources' labels.
 
         :param str search_string: Description of parameter `search_string`.
+        :param bool local: If ``True``, the search is performed on the local
+            label index (see :py:meth:`get_label_index`), which works with any
+            triple store; if ``False``, by means of Virtuoso's ``bif:contains``.
+            By default, the local index is used if it was already loaded, or if
+            the KB is stored in memory.
         :return: Description of returned object.
         :rtype: List[Tuple[str, Resource]]
 
         """
-        query = (
-            """
-        SELECT ?s ?label ?type
+        return [
+            (label, resource)
+            for label, resource, resource_type in self.search_resources(
+                search_string, local
+            )
+        ]
+
+    def search_resources(
+        self, search_string: str, local: bool = None
+    ) -> List[Tuple[str, Resource, URIRef]]:
+        """Searches for a given string through the labels of authors and works.
+
+        Unlike :py:meth:`search`, the type of each matching resource is returned
+        as well. When searching the triple store, the labels (names, titles and
+        their abbreviations) are resolved to the authors and works they belong to
+        within the same SPARQL query, thus the number of requests does not depend
+        on the number of hits.
+
+        :param str search_string: The search string.
+        :param bool local: See :py:meth:`search`.
+        :return: A list of (matching label, author or work, type) tuples, where
+            type is either ``efrbroo:F10_Person`` or ``efrbroo:F1_Work``.
+        :rtype: List[Tuple[str, Resource, URIRef]]
+
+        .. code-block:: python
+
+            >>> kb.search_resources("Omero")
+            [('Omero', <HucitAuthor http://purl.org/hucit/kb/authors/927>, rdflib.term.URIRef('http://erlangen-crm.org/efrbroo/F10_Person'))]
+
+        """
+        if local is None:
+            local = (
+                self._label_index is not None
+                or self._store_params.get("reader") == "rdflib"
+            )
+        if local:
+            return self._search_label_index(search_string)
+
+        # TODO: if the underlying store is not Virtuoso it should fail
+        # and say something useful ;-)
+        # names and titles, or their abbreviations (E41_Appellation)
+        query = """
+        SELECT DISTINCT ?label ?owner ?type
         WHERE {
-            ?s a ?type .
             ?s rdfs:label ?label .
             ?label bif:contains "'%s'" .
+            {
+                ?owner a frbroo:F10_Person ;
+                    crm:P1_is_identified_by/crm:P139_has_alternative_form? ?s .
+                ?s a ?label_type .
+                FILTER(?label_type IN (frbroo:F12_Name, crm:E41_Appellation))
+                BIND(frbroo:F10_Person AS ?type)
+            }
+            UNION
+            {
+                ?owner a frbroo:F1_Work ;
+                    frbroo:P102_has_title/crm:P139_has_alternative_form? ?s .
+                ?s a ?label_type .
+                FILTER(?label_type IN (frbroo:E35_Title, crm:E41_Appellation))
+                BIND(frbroo:F1_Work AS ?type)
+            }
         }
-        """
-            % search_string
-        )
-        response = self._session.default_store.execute_sparql(query)
-        results = [
-            (result["s"]["value"], result["label"]["value"], result["type"]["value"])
-            for result in response["results"]["bindings"]
-        ]
-        resources = [
-            (label, self._session.get_resource(subject, self._session.get_class(type)))
-            for subject, label, type in results
+        """ % search_string
+        classes = {}
+        results = []
+        for row in self._execute_select(query):
+            resource_type = URIRef(row["type"])
+            if resource_type not in classes:
+                classes[resource_type] = self._session.get_class(resource_type)
+            resource = self._session.get_resource(row["owner"], classes[resource_type])
+            results.append((row["label"], resource, resource_type))
+        return results
+
+    def _search_label_index(
+        self, search_string: str
+    ) -> List[Tuple[str, Resource, URIRef]]:
+        """Searches the local label index (see :py:meth:`search_resources`)."""
+        types = {
+            AUTHOR: surf.ns.EFRBROO["F10_Person"],
+            WORK: surf.ns.EFRBROO["F1_Work"],
+        }
+        classes = {
+            resource_type: self._session.get_class(types[resource_type])
+            for resource_type in types
+        }
+        return [
+            (
+                match.label,
+                self._session.get_resource(match.uri, classes[match.type]),
+                types[match.type],
+            )
+            for match in self.get_label_index().search(search_string)
         ]
 
-        Name = self._session.get_class(surf.ns.EFRBROO["F12_Name"])
-        Title = self._session.get_class(surf.ns.EFRBROO["E35_Title"])
-        Work = self._session.get_class(surf.ns.EFRBROO["F1_Work"])
-        Person = self._session.get_class(surf.ns.EFRBROO["F10_Person"])
-
-        result = []
-        for label, resource in resources:
-            if resource.uri == surf.ns.EFRBROO["E35_Title"]:
-                work = Work.get_by(efrbroo_P102_has_title=resource).first()
-                result.append((label, work))
-            elif resource.uri == surf.ns.EFRBROO["F12_Name"]:
-                author = Person.get_by(ecrm_P1_is_identified_by=resource).first()
-                result.append((label, author))
-            elif resource.uri == surf.ns.ECRM["E41_Appellation"]:
-                try:
-                    name = Name.get_by(ecrm_P139_has_alternative_form=resource).first()
-                    assert name is not None
-                    author = Person.get_by(ecrm_P1_is_identified_by=name).first()
-                    result.append((label, author))
-                except Exception as e:
-                    title = Title.get_by(
-                        ecrm_P139_has_alternative_form=resource
-                    ).first()
-                    assert title is not None
-                    work = Work.get_by(efrbroo_P102_has_title=title).first()
-                    result.append((label, work))
-        return result
-
     def get_authors(self) -> List[HucitAuthor]:
         """Lists all authors contained in the knowledge base.
 
@@ -353,6 +1275,93 @@ class KnowledgeBase(object):
         Person = self._session.get_class(surf.ns.EFRBROO["F10_Person"])
         return list(Person.all())
 
+    def get_author_work_map(
+        self, refresh: bool = False
+    ) -> Dict[str, List[Tuple[str, Optional[str]]]]:
+        """Returns the works of all the authors in the KB, fetched with a single query.
+
+        Once built, the map is kept in memory (until :py:meth:`invalidate_snapshot`
+        is called). It is used by :py:meth:`~hucitlib.surfext.HucitAuthor.get_works`
+        only if enabled (see :py:meth:`enable_author_work_map`).
+
+        :param bool refresh: If ``True``, the map is fetched again (e.g. after
+            works have been added to the KB).
+        :return: A dictionary mapping author URIs to lists of (work URI, work
+            CTS URN) tuples, sorted by work URI. Only the first URN of each work
+            is kept, and it is ``None`` for works without URN.
+        :rtype: Dict[str, List[Tuple[str, Optional[str]]]]
+
+        .. code-block:: python
+
+            >>> work_map = kb.get_author_work_map()
+            >>> homer_works = work_map["http://purl.org/hucit/kb/authors/927"]
+            >>> [urn for work, urn in homer_works]
+            ['urn:cts:greekLit:tlg0012.tlg001', 'urn:cts:greekLit:tlg0012.tlg002']
+
+        """
+        if self._author_work_map is not None and not refresh:
+            return self._author_work_map
+
+        rows = self._execute_select(
+            """
+            SELECT ?author ?work ?urn
+            WHERE {
+                ?author a frbroo:F10_Person ;
+                    frbroo:P14i_performed ?creation .
+                ?creation frbroo:R16_initiated ?work .
+                ?work a frbroo:F1_Work .
+                OPTIONAL {
+                    ?work crm:P1_is_identified_by ?id .
+                    ?id a crm:E42_Identifier ;
+                        crm:P2_has_type <%s> ;
+                        rdfs:label ?urn .
+                }
+            }
+            ORDER BY ?author ?work
+        """
+            % (BASE_URI_TYPES % "CTS_URN")
+        )
+        work_map = {}
+        for row in rows:
+            works = work_map.setdefault(row["author"], [])
+            # rows are sorted by work, so further URNs of a work are skipped here
+            if not works or works[-1][0] != row["work"]:
+                works.append((row["work"], row.get("urn")))
+        self._author_work_map = work_map
+        if self._author_work_map_enabled:
+            self._session.author_work_map = work_map
+        logger.info(f"Fetched the works of {len(work_map)} authors")
+        return work_map
+
+    def enable_author_work_map(
+        self, refresh: bool = False
+    ) -> Dict[str, List[Tuple[str, Optional[str]]]]:
+        """Makes :py:meth:`~hucitlib.surfext.HucitAuthor.get_works` read from the
+        author → works map (see :py:meth:`get_author_work_map`).
+
+        Authors that are not in the map (e.g. added after it was built) are
+        looked up in the KB as usual.
+
+        :param bool refresh: If ``True``, the map is fetched again.
+        :return: The map.
+        :rtype: Dict[str, List[Tuple[str, Optional[str]]]]
+
+        .. note::
+            The map is not updated when works are added to the KB: call
+            this method again with ``refresh=True``, or
+            :py:meth:`disable_author_work_map`.
+
+        """
+        self._author_work_map_enabled = True
+        work_map = self.get_author_work_map(refresh)
+        self._session.author_work_map = work_map
+        return work_map
+
+    def disable_author_work_map(self) -> None:
+        """Disables the author → works map (see :py:meth:`enable_author_work_map`)."""
+        self._author_work_map_enabled = False
+        self._session.author_work_map = None
+
     def get_works(self):
         """Return the author's works.
 
@@ -423,46 +1432,128 @@ class KnowledgeBase(object):
                 except Exception as e:
                     return None
 
-    # TODO: re-implement
+    def _count(self, query: str) -> int:
+        """Runs a query binding ``?count`` (e.g. ``COUNT(*)``) and returns its value."""
+        rows = self._execute_select(query)
+        return int(rows[0]["count"]) if rows else 0
+
+    def _count_authors_with_opus_maximum(self) -> int:
+        """Counts the authors (with a CTS URN) whose opus maximum is known.
+
+        As in :py:meth:`get_opus_maximum_of`, that is the case when the author
+        has only one work, or when one of their works is typed as opus maximum.
+        """
+        rows = self._execute_select(
+            """
+            SELECT ?author (COUNT(DISTINCT ?work) AS ?works)
+                (COUNT(DISTINCT ?opmax_work) AS ?opmax_works)
+            WHERE {
+                ?author a frbroo:F10_Person ;
+                    frbroo:P14i_performed ?creation .
+                ?creation frbroo:R16_initiated ?work .
+                FILTER EXISTS {
+                    ?author crm:P1_is_identified_by ?id .
+                    ?id a crm:E42_Identifier ;
+                        crm:P2_has_type <%s> .
+                }
+                OPTIONAL {
+                    ?work crm:P2_has_type <%s> .
+                    BIND (?work AS ?opmax_work)
+                }
+            }
+            GROUP BY ?author
+        """
+            % (BASE_URI_TYPES % "CTS_URN", BASE_URI_TYPES % "opmax")
+        )
+        return sum(
+            1 for row in rows if int(row["works"]) == 1 or int(row["opmax_works"]) > 0
+        )
+
     def get_statistics(self) -> Dict[str, int]:
         """
         Gather basic stats about the Knowledge Base and its contents.
 
-        .. note::
-
-            This method currently has some performances issues.
+        The counters are computed by means of aggregate (``COUNT``) SPARQL
+        queries, one per counter, and the KB is not modified.
 
         :return: a dictionary
 
         """
-        statistics = {
-            "number_authors": 0,
-            "number_author_names": 0,
-            "number_author_abbreviations": 0,
-            "number_works": 0,
-            "number_work_titles": 0,
-            "number_title_abbreviations": 0,
-            "number_opus_maximum": 0,
+        works = """
+            ?author a frbroo:F10_Person ;
+                frbroo:P14i_performed ?creation .
+            ?creation frbroo:R16_initiated ?work .
+        """
+        abbreviations = """
+                crm:P139_has_alternative_form ?abbreviation .
+            ?abbreviation crm:P2_has_type <%s> ;
+                rdfs:label ?label .
+        """ % (BASE_URI_TYPES % "abbreviation")
+        return {
+            "number_authors": self._count(
+                """
+                SELECT (COUNT(DISTINCT ?author) AS ?count)
+                WHERE { ?author a frbroo:F10_Person . }
+            """
+            ),
+            "number_author_names": self._count(
+                """
+                SELECT (COUNT(*) AS ?count)
+                WHERE {
+                    ?author a frbroo:F10_Person ;
+                        crm:P1_is_identified_by ?name .
+                    ?name a frbroo:F12_Name ;
+                        rdfs:label ?label .
+                }
+            """
+            ),
+            "number_author_abbreviations": self._count(
+                """
+                SELECT (COUNT(*) AS ?count)
+                WHERE {
+                    ?author a frbroo:F10_Person ;
+                        crm:P1_is_identified_by ?name .
+                    ?name a frbroo:F12_Name ;
+                    %s
+                }
+            """
+                % abbreviations
+            ),
+            "number_works": self._count(
+                "SELECT (COUNT(*) AS ?count) WHERE { %s }" % works
+            ),
+            # as in `HucitWork.get_titles`, only the first title of each work
+            "number_work_titles": self._count(
+                """
+                SELECT (COUNT(*) AS ?count)
+                WHERE {
+                    {
+                        SELECT ?author ?work (SAMPLE(?work_title) AS ?title)
+                        WHERE {
+                            %s
+                            ?work frbroo:P102_has_title ?work_title .
+                        }
+                        GROUP BY ?author ?work
+                    }
+                    ?title rdfs:label ?label .
+                }
+            """
+                % works
+            ),
+            "number_title_abbreviations": self._count(
+                """
+                SELECT (COUNT(*) AS ?count)
+                WHERE {
+                    %s
+                    ?work frbroo:P102_has_title ?title .
+                    ?title a frbroo:E35_Title ;
+                    %s
+                }
+            """
+                % (works, abbreviations)
+            ),
+            "number_opus_maximum": self._count_authors_with_opus_maximum(),
         }
-        for author in self.get_authors():
-            if author.get_urn() is not None:
-                opmax = (
-                    True
-                    if self.get_opus_maximum_of(author.get_urn()) is not None
-                    else False
-                )
-                if opmax:
-                    statistics["number_opus_maximum"] += 1
-            statistics["number_authors"] += 1
-            statistics["number_author_names"] += len(author.get_names())
-            statistics["number_author_abbreviations"] += len(author.get_abbreviations())
-            for work in author.get_works():
-                statistics["number_works"] += 1
-                statistics["number_work_titles"] += len(work.get_titles())
-                statistics["number_title_abbreviations"] += len(
-                    work.get_abbreviations()
-                )
-        return statistics
 
     def get_opus_maximum_of(self, author_cts_urn):
         """Return the author's opux maximum (None otherwise).
@@ -510,16 +1601,8 @@ class KnowledgeBase(object):
         :rtype: surf.resource.Resource
 
         """
-        E55_Type = self._session.get_class(surf.ns.ECRM["E55_Type"])
-
-        # URI of expected text element type
-        textelement_type = E55_Type(
-            os.path.join("http://purl.org/hucit/kb/types/", label.lower())
-        )
-        if textelement_type.is_present():
-            return textelement_type
-        else:
-            return None
+        # URI of expected text element type: kb:types/{label}
+        return get_type_registry(self._session).get_if_present(label.lower())
 
     def add_textelement_type(
         self, label: str, lang: str = "en"
@@ -550,6 +1633,7 @@ class KnowledgeBase(object):
             )
             new_E55_type.rdfs_label.append(Literal(label, lang))
             new_E55_type.save()
+            get_type_registry(self._session).mark_present(label)
             return new_E55_type
         else:
             return None
@@ -599,10 +1683,110 @@ class KnowledgeBase(object):
             indent=2,
         )
 
+    def iter_json_records(self) -> Iterator[Dict]:
+        """Yields one JSON-serialisable record per author, with their works.
+
+        Records have the same structure as those produced by
+        :py:meth:`hucitlib.surfext.HucitAuthor.to_json` (except that a missing
+        ``urn`` is ``null``), but are built from data fetched in bulk, with a
+        handful of queries for the whole KB.
+
+        :return: An iterator over dictionaries, sorted by author URI.
+        :rtype: Iterator[Dict]
+
+        """
+        authors = self._fetch_author_rows()
+        works = self._fetch_work_rows()
+        names = self._fetch_author_name_lists(languages=True)
+        author_abbreviations = self._fetch_author_abbreviation_lists()
+        titles = self._fetch_work_title_lists(languages=True)
+        work_abbreviations = self._fetch_work_abbreviation_lists()
+
+        author_works = {}
+        for work, (urn, author) in works.items():
+            author_works.setdefault(author, []).append(work)
+
+        for author, urn in authors.items():
+            yield {
+                "uri": author,
+                "urn": urn,
+                "names": [
+                    {"language": lang, "label": label.title()}
+                    for lang, label in names.get(author, [])
+                ],
+                "name_abbreviations": author_abbreviations.get(author, []),
+                "works": [
+                    {
+                        "uri": work,
+                        "urn": works[work][0],
+                        "titles": [
+                            {"language": lang, "label": label}
+                            for lang, label in titles.get(work, [])
+                        ],
+                        "title_abbreviations": work_abbreviations.get(work, []),
+                    }
+                    for work in author_works.get(author, [])
+                ],
+            }
+
+    def export_json(self, path: str, lines: bool = True) -> int:
+        """Exports the whole KB to a JSON file, one author at a time.
+
+        Unlike :py:meth:`to_json`, records (see :py:meth:`iter_json_records`)
+        are written to the file as they are produced, so that the whole export
+        is never held in memory.
+
+        :param str path: Path to the output file.
+        :param bool lines: If ``True``, the file is in JSON Lines format (one
+            author per line); otherwise it contains a JSON object like the one
+            returned by :py:meth:`to_json` (statistics and list of authors).
+        :return: The number of exported authors.
+        :rtype: int
+
+        .. code-block:: python
+
+            >>> kb.export_json("hucit.jsonl")
+            1557
+
+        """
+        count = 0
+        with open(path, "w", encoding="utf-8") as ofile:
+            if not lines:
+                statistics = json.dumps(self.get_statistics())
+                ofile.write('{"statistics": %s, "authors": [\n' % statistics)
+            for record in self.iter_json_records():
+                if not lines and count > 0:
+                    ofile.write(",\n")
+                ofile.write(json.dumps(record, ensure_ascii=False))
+                if lines:
+                    ofile.write("\n")
+                count += 1
+            if not lines:
+                ofile.write("\n]}\n")
+        logger.info(f"Exported {count} authors to {path}")
+        return count
+
     #####################
     # Factory methods   #
     #####################
 
+    @retry(stop_max_attempt_number=5, wait_fixed=5000)
+    def insert_triples(self, triples: Iterable[Tuple]) -> None:
+        """Writes triples to the KB with a single ``INSERT DATA`` request.
+
+        Triples are written into the store's default context (if any), like
+        those added by saving a ``surf.resource.Resource``.
+
+        :param Iterable[Tuple] triples: (subject, predicate, object) tuples of
+            ``rdflib`` terms.
+        :rtype: None
+
+        """
+        data = "\n".join(f"{s.n3()} {p.n3()} {o.n3()} ." for s, p, o in triples)
+        if "default_context" in self._store_params:
+            data = "GRAPH <%s> { %s }" % (self._store_params["default_context"], data)
+        self._execute_update("INSERT DATA { %s }" % data)
+
     @retry(stop_max_attempt_number=5, wait_fixed=5000)
     def create_text_element(
         self,
@@ -635,7 +1819,7 @@ class KnowledgeBase(object):
         element_label = f"{work_label} {type_label} {urn.passage_component}"
 
         # mint the URI
-        element_uri = os.path.join(work.subject, urn.passage_component)
+        element_uri = get_text_element_uri(work.subject, urn)
         TextElement = self._session.get_class(surf.ns.HUCIT["TextElement"])
         new_element = TextElement(element_uri)
         new_element.ecrm_P2_has_type = element_type
@@ -668,19 +1852,23 @@ class KnowledgeBase(object):
         :rtype: Optional[surf.resource.Resource]
 
         """
-        Type = self._session.get_class(surf.ns.ECRM["E55_Type"])
         Identifier = self._session.get_class(surf.ns.ECRM["E42_Identifier"])
         id_uri = os.path.join(resource.subject, "cts_urn")
         id = Identifier(id_uri)
-        if id.is_present():
+        created = not id.is_present()
+        if not created:
             logger.info(
                 "Identifier not created!"
                 f"{resource.subject} already has a CTS URN identifier: {id.subject}"
             )
         else:
             id.rdfs_label = Literal(urn_string)
-            id.ecrm_P2_has_type = Type(BASE_URI_TYPES % "CTS_URN")
+            id.ecrm_P2_has_type = get_type_registry(self._session).get("CTS_URN")
             id.save()
+            if self._urn_index is not None:
+                self._urn_index.add(urn_string, str(resource.subject))
         resource.ecrm_P1_is_identified_by = id
         resource.update()
+        if created and CTS_URN(urn_string).passage_component is None:
+            self._on_urn_change(urn_string, str(resource.subject))
         return id
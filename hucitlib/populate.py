@@ -5,30 +5,49 @@
 """Command line interface for populating the HuCit knowledge base.
 
 Usage:
-    hucitlib/populate.py --work=<cts_urn> --log-file=<path> --kb-config-file=<path> [--verbose]
+    hucitlib/populate.py (--work=<cts_urn> | --works-file=<path>) --log-file=<path> --kb-config-file=<path> [--processes=<n>] [--batch-size=<n>] [--workers=<n>] [--max-rps=<n>] [--fetch-nodes] [--verbose]
 
 Options:
     --work=<cts_urn>    CTS URN of the work whose citation structure should be populated
+    --works-file=<path> Path to a file with one work CTS URN per line (e.g. hucitlib/data/misc/perseus_works.txt)
+    --processes=<n> Number of works populated in parallel [default: 1]
     --kb-config-file=<path> Path to the configuration file (overwrites default configuration).
     --log-file=<path>   Path to the log file
+    --batch-size=<n>    Write text elements in batches of <n> triples
+    --workers=<n>   Number of text elements fetched concurrently from the CTS endpoint [default: 1]
+    --max-rps=<n>   Max number of requests per second sent to the CTS endpoint (by all processes)
+    --fetch-nodes   Fetch each text element from the CTS endpoint to get its previous/next elements
     --verbose   Turn on verbose logging
 
 Example:
     python hucitlib/populate.py --work=urn:cts:greekLit:tlg0011.tlg004
      --log-file=hucitlib/data/tests/populate-tlg0011.tlg004.log
      --kb-config-file=hucitlib/config/virtuoso_local.ini
+
+    python hucitlib/populate.py --works-file=hucitlib/data/misc/perseus_works.txt
+     --processes=4 --batch-size=10000 --log-file=populate.log
+     --kb-config-file=hucitlib/config/virtuoso_local.ini
 """
 
 
 import pkg_resources
 import os
 import json
+import time
+import shutil
 import logging
+import itertools
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from functools import partial
+from urllib.parse import urlparse
 from docopt import docopt
 from hucitlib import init_logger
 from hucitlib import KnowledgeBase
+from hucitlib.bulk import BulkWriter
 from hucitlib.exceptions import ResourceNotFound
-from typing import Dict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from tqdm import tqdm
 from retrying import retry
 from surf.resource import Resource
@@ -41,23 +60,283 @@ TEXT_STRUCTURES_BASEDIR = pkg_resources.resource_filename(
     "hucitlib", f"data/text_structures/"
 )
 
+# max number of CTS URNs kept in the KB's LRU index while populating
+URN_INDEX_MAX_SIZE = 100000
+
+# number of text elements checked against the KB at once (in batch mode)
+ELEMENTS_CHUNK_SIZE = 5000
+
+# outcome of populating the text structure of a work (see `populate_works`)
+PopulationResult = namedtuple(
+    "PopulationResult", ["work_urn", "elements", "seconds", "error"]
+)
+
+
+class RateLimiter(object):
+    """Spaces out requests so that at most `max_requests_per_second` are sent.
+
+    Instances are thread-safe, thus a single limiter can be shared by all
+    the threads sending requests to the same host.
+    """
+
+    def __init__(self, max_requests_per_second: float) -> None:
+        self.interval = 1.0 / max_requests_per_second
+        self._lock = threading.Lock()
+        self._next_request = 0.0
+
+    def wait(self) -> None:
+        """Blocks until the next request can be sent."""
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_request - now
+            self._next_request = max(now, self._next_request) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+# one rate limiter per (host, rate), shared by concurrent harvests
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def split_rate(
+    max_requests_per_second: Optional[float], processes: int
+) -> Optional[float]:
+    """Returns the rate each of `processes` processes can send requests at, so
+    that together they send at most `max_requests_per_second` requests.
+
+    Rate limiters are not shared across processes (see
+    :py:func:`get_rate_limiter`), thus the overall rate is split among them.
+    """
+    if not max_requests_per_second:
+        return max_requests_per_second
+    return max_requests_per_second / max(processes, 1)
+
+
+def get_rate_limiter(endpoint: str, max_requests_per_second: float) -> RateLimiter:
+    """Returns the rate limiter for the host of a given endpoint.
+
+    Harvests of the same host with the same rate share one limiter; a harvest
+    asking for a different rate gets a limiter of its own.
+    """
+    key = (urlparse(endpoint).netloc, max_requests_per_second)
+    with _rate_limiters_lock:
+        if key not in _rate_limiters:
+            _rate_limiters[key] = RateLimiter(max_requests_per_second)
+        return _rate_limiters[key]
+
 
 @retry(stop_max_attempt_number=5, wait_fixed=5000)
-def fetch_textual_node(urn: str, ref: str, resolver: HttpCtsResolver):
+def fetch_textual_node(
+    urn: str, ref: str, resolver: HttpCtsResolver, rate_limiter: RateLimiter = None
+):
+    if rate_limiter is not None:
+        rate_limiter.wait()
     return resolver.getTextualNode(textId=urn, subreference=ref, prevnext=True)
 
 
+def _init_text_element(urn: str, ref: str, level_n: int) -> Dict[str, str]:
+    """Returns a text element with its CTS URN and the URN of its parent (if any)."""
+    element = {
+        "current": "{}:{}".format(urn, ref),
+    }
+    if "." in ref:
+        element["parent"] = "{}:{}".format(urn, ".".join(ref.split(".")[: level_n - 1]))
+    return element
+
+
+def _get_passage_link(endpoint: str, element_urn: str) -> str:
+    """Returns the CTS request to retrieve the text of an element."""
+    cts_request = f"?request=GetPassage&urn={element_urn}"
+    return f"{os.path.join(endpoint, cts_request)}"
+
+
+def fetch_text_element(
+    urn: str,
+    ref: str,
+    level_n: int,
+    resolver: HttpCtsResolver,
+    endpoint: str,
+    rate_limiter: RateLimiter = None,
+) -> Dict[str, str]:
+    """Fetches information about a single text element from a CTS endpoint.
+
+    :return: a dict with keys "current", "link" and (if any) "parent",
+        "following", "previous"
+    :rtype: dict
+    """
+    element = _init_text_element(urn, ref, level_n)
+    try:
+        textual_node = fetch_textual_node(urn, ref, resolver, rate_limiter)
+        logging.info(f"Retrieved info about {element['current']} from {endpoint}")
+
+        if textual_node.nextId is not None:
+            element["following"] = "{}:{}".format(urn, textual_node.nextId)
+        if textual_node.prevId is not None:
+            element["previous"] = "{}:{}".format(urn, textual_node.prevId)
+
+        element["link"] = _get_passage_link(endpoint, element["current"])
+        return element
+    except Exception as e:
+        logger.error(
+            f"Failed retrieving info about {element['current']} from {endpoint} with following exception: {e}"
+        )
+        raise (e)
+
+
+def build_text_elements(
+    urn: str, reffs: List[str], level_n: int, endpoint: str
+) -> List[Dict[str, str]]:
+    """Builds the text elements of a citation level from its ordered references.
+
+    As `reffs` are ordered, the previous and following elements of each
+    element can be derived without fetching it from the CTS endpoint.
+
+    :param urn: the work's CTS URN
+    :param reffs: all references of the citation level, in document order
+        (as returned by ``resolver.getReffs``)
+    :param level_n: the citation level (1-based)
+    :param endpoint: the URL of the CTS endpoint
+    :return: a list of dicts with keys "current", "link" and (if any) "parent",
+        "following", "previous"
+    :rtype: list
+    """
+    elements = []
+    for i, ref in enumerate(reffs):
+        element = _init_text_element(urn, ref, level_n)
+        if i + 1 < len(reffs):
+            element["following"] = "{}:{}".format(urn, reffs[i + 1])
+        if i > 0:
+            element["previous"] = "{}:{}".format(urn, reffs[i - 1])
+        element["link"] = _get_passage_link(endpoint, element["current"])
+        elements.append(element)
+    return elements
+
+
+class TextStructureCheckpoint(object):
+    """Stores the text elements harvested so far, so that downloads can be resumed.
+
+    Elements are appended to one JSON Lines file per citation level
+    (``level-<n>.jsonl``) as soon as they are harvested; a ``level-<n>.done``
+    file marks the levels that were harvested completely.
+
+    :param str path: Directory where the checkpoint files are stored.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _level_path(self, level_n: int) -> str:
+        return os.path.join(self.path, f"level-{level_n}.jsonl")
+
+    def _done_path(self, level_n: int) -> str:
+        return os.path.join(self.path, f"level-{level_n}.done")
+
+    def is_complete(self, level_n: int) -> bool:
+        """Whether all text elements of a citation level were harvested."""
+        return os.path.exists(self._done_path(level_n))
+
+    def load(self, level_n: int) -> List[Dict]:
+        """Returns the text elements of a level harvested so far.
+
+        A truncated last line (e.g. if the process was killed while writing
+        it) is discarded.
+        """
+        if not os.path.exists(self._level_path(level_n)):
+            return []
+
+        elements = []
+        with open(self._level_path(level_n), "r") as ifile:
+            lines = ifile.readlines()
+        for line in lines:
+            try:
+                elements.append(json.loads(line))
+            except ValueError:
+                logger.warning(
+                    f"Discarding a truncated line in {self._level_path(level_n)}"
+                )
+                self.save(level_n, elements, complete=False)
+                break
+        return elements
+
+    def append(self, level_n: int, element: Dict) -> None:
+        """Appends a harvested text element to the level's file."""
+        with open(self._level_path(level_n), "a") as ofile:
+            ofile.write(json.dumps(element) + "\n")
+
+    def save(self, level_n: int, elements: List[Dict], complete: bool = True) -> None:
+        """Writes all the text elements of a level (replacing existing ones)."""
+        with open(self._level_path(level_n), "w") as ofile:
+            for element in elements:
+                ofile.write(json.dumps(element) + "\n")
+        if complete:
+            self.mark_complete(level_n)
+
+    def mark_complete(self, level_n: int) -> None:
+        """Marks a citation level as completely harvested."""
+        open(self._done_path(level_n), "w").close()
+
+    def remove(self) -> None:
+        """Deletes the checkpoint."""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def _fetch_in_order(
+    executor: ThreadPoolExecutor, fetch, reffs: List[str], on_result=None
+) -> List:
+    """Runs `fetch` on all `reffs` and returns the results in the same order.
+
+    If given, `on_result` is called on each result, in order, as soon as it
+    is available. If one of the calls fails, pending calls are cancelled and
+    the exception is raised.
+    """
+    futures = [executor.submit(fetch, ref) for ref in reffs]
+    results = []
+    try:
+        for future in tqdm(futures):
+            results.append(future.result())
+            if on_result is not None:
+                on_result(results[-1])
+        return results
+    except Exception:
+        for future in futures:
+            future.cancel()
+        raise
+
+
 def fetch_text_structure(
-    urn: str, endpoint: str = "http://cts.perseids.org/api/cts", stop_at: int = -1
+    urn: str,
+    endpoint: str = "http://cts.perseids.org/api/cts",
+    stop_at: int = -1,
+    max_workers: int = 1,
+    max_requests_per_second: float = None,
+    fetch_nodes: bool = False,
+    checkpoint: TextStructureCheckpoint = None,
 ) -> Dict[str, object]:
     """
     Fetches the text structure of a given work from a CTS endpoint.
 
+    By default, only one request per citation level is sent to the endpoint,
+    as the relations between text elements are derived from the ordered list
+    of references (see :py:func:`build_text_elements`).
+
     :param urn: the work's CTS URN (at the work-level!,
         e.g."urn:cts:greekLit:tlg0012.tlg001")
     :type urn: string
     :param endpoint: the URL of the CTS endpoint to use (defaults to Perseids')
     :type endpoint: string
+    :param max_workers: number of text elements fetched concurrently
+    :type max_workers: int
+    :param max_requests_per_second: max number of requests per second sent to
+        the endpoint's host (no limit by default)
+    :type max_requests_per_second: float
+    :param fetch_nodes: if True, fetch each text element from the endpoint
+        (``GetPassagePlus``) to know its previous and following elements
+    :type fetch_nodes: bool
+    :param checkpoint: if given, harvested elements are stored in it as they
+        are fetched, and elements already stored are not fetched again
+    :type checkpoint: TextStructureCheckpoint
     :return: a dict with keys "urn", "provenance", "valid_reffs", "levels"
     :rtype: dict
     """
@@ -69,6 +348,11 @@ def fetch_text_structure(
     orig_edition = None
     suffix = "grc" if "greekLit" in urn else "lat"
     resolver = HttpCtsResolver(HttpCtsRetriever(endpoint))
+    rate_limiter = (
+        get_rate_limiter(endpoint, max_requests_per_second)
+        if max_requests_per_second
+        else None
+    )
     work_metadata = resolver.getMetadata(urn)
 
     # among all editions for this work, pick the one in Greek or Latin
@@ -93,49 +377,69 @@ def fetch_text_structure(
 
     # for each hierarchical level of the text
     # fetch all citable text elements
-    for level_n, level_label in structure["levels"]:
-        print(f"Fetching text elements of level {level_n}")
-        structure["valid_reffs"][level_n] = []
-
-        for ref in tqdm(resolver.getReffs(urn, level=level_n)):
-            element = {
-                "current": "{}:{}".format(urn, ref),
-            }
-            if "." in ref:
-                element["parent"] = "{}:{}".format(
-                    urn, ".".join(ref.split(".")[: level_n - 1])
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for level_n, level_label in structure["levels"]:
+            print(f"Fetching text elements of level {level_n}")
+
+            if checkpoint is not None and checkpoint.is_complete(level_n):
+                print(f"Level {level_n} was already harvested (see {checkpoint.path})")
+                elements = checkpoint.load(level_n)
+                if stop_at > 0:
+                    elements = elements[: stop_at - counter]
+                structure["valid_reffs"][level_n] = elements
+                counter += len(elements)
+                if stop_at > 0 and counter >= stop_at:
+                    print(f"Stopping as max value was reached ({stop_at})")
+                    break
+                continue
+
+            if rate_limiter is not None:
+                rate_limiter.wait()
+            reffs = list(resolver.getReffs(urn, level=level_n))
+
+            if fetch_nodes:
+                # resume from the elements harvested before (if any)
+                elements = checkpoint.load(level_n) if checkpoint is not None else []
+                if elements:
+                    print(f"Resuming after {len(elements)} already harvested elements")
+                harvested = {element["current"] for element in elements}
+                reffs_todo = [
+                    ref for ref in reffs if "{}:{}".format(urn, ref) not in harvested
+                ]
+                if stop_at > 0:
+                    reffs_todo = reffs_todo[: max(stop_at - counter - len(elements), 0)]
+
+                fetch = partial(
+                    fetch_text_element,
+                    urn,
+                    level_n=level_n,
+                    resolver=resolver,
+                    endpoint=endpoint,
+                    rate_limiter=rate_limiter,
                 )
-            try:
-                textual_node = fetch_textual_node(urn, ref, resolver)
-                logging.info(
-                    f"Retrieved info about {element['current']} from {endpoint}"
+                elements += _fetch_in_order(
+                    executor,
+                    fetch,
+                    reffs_todo,
+                    partial(checkpoint.append, level_n) if checkpoint else None,
                 )
+                if checkpoint is not None and len(elements) == len(reffs):
+                    checkpoint.mark_complete(level_n)
+            else:
+                elements = build_text_elements(urn, reffs, level_n, endpoint)
+                if checkpoint is not None:
+                    checkpoint.save(level_n, elements)
 
-                cts_request = f"?request=GetPassage&urn={element['current']}"
-                cts_uri = f"{os.path.join(endpoint, cts_request)}"
-                counter += 1
+            if stop_at > 0:
+                elements = elements[: stop_at - counter]
 
-                if textual_node.nextId is not None:
-                    element["following"] = "{}:{}".format(urn, textual_node.nextId)
-                if textual_node.prevId is not None:
-                    element["previous"] = "{}:{}".format(urn, textual_node.prevId)
-
-                element["link"] = cts_uri
-                structure["valid_reffs"][level_n].append(element)
-            except Exception as e:
-                logger.error(
-                    f"Failed retrieving info about {element['current']} from {endpoint} with following exception: {e}"
-                )
-                raise (e)
+            structure["valid_reffs"][level_n] = elements
+            counter += len(elements)
 
             if stop_at > 0 and counter >= stop_at:
                 print(f"Stopping as max value was reached ({stop_at})")
                 break
 
-        if stop_at > 0 and counter >= stop_at:
-            print(f"Stopping as max value was reached ({stop_at})")
-            break
-
     return structure
 
 
@@ -146,33 +450,260 @@ def load_text_structure_JSON(work_urn: str, basedir: str) -> Dict:
     return text_structure
 
 
+class TextStructureJSONL(object):
+    """A text structure stored in JSON Lines format, read lazily from disk.
+
+    The first line of the file contains the work's URN and its citation
+    levels; each following line contains one text element (with its
+    citation ``level``), ordered by level. Iterating over an instance streams
+    the text elements from disk, so that memory usage does not depend on the
+    size of the work.
+
+    :param str path: Path to the JSON Lines file.
+
+    .. code-block:: python
+
+        >>> ts = load_text_structure_JSONL("urn:cts:greekLit:tlg0012.tlg001", basedir)
+        >>> ts["levels"]
+        [[1, 'book'], [2, 'line']]
+        >>> for level_n, element in ts:
+        ...     print(level_n, element["current"])
+
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "r") as ifile:
+            header = json.loads(ifile.readline())
+        self.urn = header["urn"]
+        self.levels = header["levels"]
+
+    def __getitem__(self, key: str):
+        # same keys as the dictionaries returned by `fetch_text_structure`
+        if key == "urn":
+            return self.urn
+        elif key == "levels":
+            return self.levels
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[Tuple[int, Dict]]:
+        with open(self.path, "r") as ifile:
+            next(ifile)
+            for line in ifile:
+                element = json.loads(line)
+                yield element["level"], element
+
+
+def iter_text_elements(
+    ts: Union[Dict, TextStructureJSONL],
+) -> Iterator[Tuple[int, Dict]]:
+    """Iterates over the text elements of a text structure, level by level.
+
+    :param ts: A text structure, as returned either by
+        :py:func:`fetch_text_structure` (or :py:func:`load_text_structure_JSON`)
+        or by :py:func:`load_text_structure_JSONL`.
+    :return: An iterator of (level number, text element) tuples.
+    :rtype: Iterator[Tuple[int, Dict]]
+
+    """
+    if isinstance(ts, TextStructureJSONL):
+        yield from ts
+        return
+
+    for level_n, level_label in ts["levels"]:
+        # keys are strings once the structure is serialized to JSON
+        valid_reffs = ts["valid_reffs"]
+        elements = valid_reffs.get(str(level_n), valid_reffs.get(level_n, []))
+        for element in elements:
+            yield level_n, element
+
+
+def write_text_structure_JSONL(ts: Dict, path: str) -> None:
+    """Writes a text structure to disk in JSON Lines format.
+
+    :param Dict ts: A text structure, as returned by :py:func:`fetch_text_structure`.
+    :param str path: Path to the output file.
+    :rtype: None
+
+    """
+    with open(path, "w") as ofile:
+        ofile.write(json.dumps({"urn": ts["urn"], "levels": ts["levels"]}) + "\n")
+        for level_n, element in iter_text_elements(ts):
+            ofile.write(json.dumps(dict(element, level=level_n)) + "\n")
+
+
+def load_text_structure_JSONL(work_urn: str, basedir: str) -> TextStructureJSONL:
+    """Opens a text structure stored in JSON Lines format (without loading it).
+
+    :param str work_urn: CTS URN of the work.
+    :param str basedir: Directory where text structures are stored.
+    :rtype: TextStructureJSONL
+
+    """
+    ts_path = os.path.join(basedir, f'{work_urn.replace(":", "-")}.jsonl')
+    return TextStructureJSONL(ts_path)
+
+
 def download_text_structure(
-    urn: str, basedir: str = TEXT_STRUCTURES_BASEDIR, sample_size: int = None
+    urn: str,
+    basedir: str = TEXT_STRUCTURES_BASEDIR,
+    sample_size: int = None,
+    resume: bool = True,
+    jsonl: bool = False,
+    **kwargs,
 ) -> None:
     """
 
+    While downloading, harvested text elements are stored in a checkpoint
+    directory (``<basedir>/<urn>.checkpoint``), which is removed once the
+    text structure is written to disk. If a download fails, calling this
+    function again resumes it from the checkpoint (unless `resume` is False).
+
+    If `jsonl` is True, the text structure is written in JSON Lines format
+    (see :py:class:`TextStructureJSONL`), which can be streamed when
+    populating the KB.
+
+    Keyword arguments (e.g. `endpoint`, `max_workers`) are passed on to
+    :py:func:`fetch_text_structure`. A ``ValueError`` is raised (and nothing
+    is written) if the work has no Greek or Latin edition.
+
     Example:
 
-    >>> download_text_structure('urn:cts:greekLit:tlg0012.tlg001')
+    >>> download_text_structure('urn:cts:greekLit:tlg0012.tlg001', max_workers=8)
     """
+    filename = urn.replace(":", "-")
+    checkpoint_path = os.path.join(basedir, f"{filename}.checkpoint")
+    if not resume:
+        shutil.rmtree(checkpoint_path, ignore_errors=True)
+    checkpoint = TextStructureCheckpoint(checkpoint_path)
+
     if sample_size:
-        text_structure = fetch_text_structure(urn, stop_at=sample_size)
+        text_structure = fetch_text_structure(
+            urn, stop_at=sample_size, checkpoint=checkpoint, **kwargs
+        )
     else:
-        text_structure = fetch_text_structure(urn)
+        text_structure = fetch_text_structure(urn, checkpoint=checkpoint, **kwargs)
 
-    path = os.path.join(basedir, "{}.json".format(urn.replace(":", "-")))
-    with open(path, "w") as ofile:
-        json.dump(text_structure, ofile)
+    if text_structure is None:
+        # the checkpoint is kept, as for any other failed download
+        raise ValueError(f"No Greek or Latin edition of {urn} could be found")
 
+    if jsonl:
+        path = os.path.join(basedir, "{}.jsonl".format(filename))
+        write_text_structure_JSONL(text_structure, path)
+    else:
+        path = os.path.join(basedir, "{}.json".format(filename))
+        with open(path, "w") as ofile:
+            json.dump(text_structure, ofile)
+    checkpoint.remove()
+
+
+def _create_text_elements(
+    kb: KnowledgeBase,
+    work: Resource,
+    ts_obj: Resource,
+    elements: Iterable[Dict],
+    element_type_obj: Resource,
+    top_level: bool,
+) -> int:
+    """Creates text elements one by one (one resource at a time)."""
+    counter = 0
+    for text_element_dict in tqdm(elements):
+
+        text_element_urn = text_element_dict["current"]
+        try:
+            element_obj = kb.get_resource_by_urn(text_element_urn)
+            logger.info(
+                f"Skipping, as an element for {text_element_urn} already exists = {element_obj.subject}"
+            )
+            continue
+        except ResourceNotFound:
+            pass
+
+        text_element = kb.create_text_element(
+            work,
+            text_element_urn,
+            element_type_obj,
+            text_element_dict["link"] if "link" in text_element_dict else None,
+        )
+        ts_obj.add_element(text_element, top_level=top_level)
+        counter += 1
+    return counter
+
+
+def _write_text_elements(
+    writer: BulkWriter,
+    work: Resource,
+    ts_obj: Resource,
+    elements: Iterable[Dict],
+    element_type_obj: Resource,
+    top_level: bool,
+) -> int:
+    """Creates text elements in batch (see :py:class:`hucitlib.bulk.BulkWriter`).
+
+    Relations between text elements are added in the same pass, as the URIs
+    of related elements are either resolved along with the chunk's elements or
+    derived from their CTS URNs.
+    """
+    counter = 0
+    elements = iter(tqdm(elements))
+    # elements are processed in chunks, so that they can be streamed
+    for chunk in iter(
+        lambda: list(itertools.islice(elements, ELEMENTS_CHUNK_SIZE)), []
+    ):
+        # related elements are resolved too, as they may exist with another URI
+        existing_elements = writer.resolve_elements(
+            urn
+            for text_element_dict in chunk
+            for key in ["current", "parent", "previous", "following"]
+            for urn in [text_element_dict.get(key)]
+            if urn
+        )
+        for text_element_dict in chunk:
 
-def populate_text_structure(kb: KnowledgeBase, work: Resource, ts: Dict) -> None:
+            text_element_urn = text_element_dict["current"]
+            element_obj = existing_elements[text_element_urn]
+            if element_obj is not None:
+                logger.info(
+                    f"Skipping, as an element for {text_element_urn} already exists = {element_obj.subject}"
+                )
+            else:
+                writer.add_text_element(
+                    work,
+                    text_element_urn,
+                    element_type_obj,
+                    text_element_dict["link"] if "link" in text_element_dict else None,
+                    text_structure=ts_obj if top_level else None,
+                )
+                counter += 1
+
+            writer.add_relations(
+                work,
+                text_element_urn,
+                parent_urn=text_element_dict.get("parent"),
+                previous_urn=text_element_dict.get("previous"),
+                following_urn=text_element_dict.get("following"),
+            )
+    return counter
+
+
+def populate_text_structure(
+    kb: KnowledgeBase,
+    work: Resource,
+    ts: Union[Dict, TextStructureJSONL],
+    batch_size: int = None,
+) -> int:
     """Short summary.
 
     :param KnowledgeBase kb: Description of parameter `kb`.
     :param Resource work: Description of parameter `work`.
-    :param Dict ts: Description of parameter `ts`.
-    :return: Description of returned object.
-    :rtype: None
+    :param ts: The text structure, either as a dictionary or as a
+        :py:class:`TextStructureJSONL` (whose elements are streamed from disk).
+    :type ts: Union[Dict, TextStructureJSONL]
+    :param int batch_size: If specified, text elements are not created one
+        by one but written to the KB in batches of `batch_size` triples.
+    :return: The number of text elements created.
+    :rtype: int
 
     """
 
@@ -188,51 +719,52 @@ def populate_text_structure(kb: KnowledgeBase, work: Resource, ts: Dict) -> None
             f"Canonical text structure of {work_label}", "en"
         )
 
+    writer = BulkWriter(kb, batch_size) if batch_size else None
+
     # for each text level of a given work, iterate through all existing
     # citable text elements.
     counter = 0
-    for text_level_n, element_type in ts["levels"]:
+    element_types = dict(ts["levels"])
+    for text_level_n, level_elements in itertools.groupby(
+        iter_text_elements(ts), key=lambda item: item[0]
+    ):
         print(
             f"Creating text elements for {work_urn}, hierarchical level {text_level_n}"
         )
 
         # retrieve from the KB the corresponding text element type
         # if not there, create one
+        element_type = element_types[text_level_n]
         element_type_obj = kb.get_textelement_type(element_type)
         if element_type_obj is None:
             element_type_obj = kb.add_textelement_type(element_type)
 
-        for text_element_dict in tqdm(ts["valid_reffs"][str(text_level_n)]):
-
-            text_element_urn = text_element_dict["current"]
-            try:
-                element_obj = kb.get_resource_by_urn(text_element_urn)
-                logger.info(
-                    f"Skipping, as an element for {text_element_urn} already exists = {element_obj.subject}"
-                )
-                continue
-            except ResourceNotFound:
-                pass
-
-            text_element = kb.create_text_element(
-                work,
-                text_element_urn,
-                element_type_obj,
-                text_element_dict["link"] if "link" in text_element_dict else None,
+        elements = (element for level_n, element in level_elements)
+        top_level = True if text_level_n == 1 else False
+        if writer is not None:
+            counter += _write_text_elements(
+                writer, work, ts_obj, elements, element_type_obj, top_level
             )
-            ts_obj.add_element(
-                text_element, top_level=True if text_level_n == 1 else False
+        else:
+            counter += _create_text_elements(
+                kb, work, ts_obj, elements, element_type_obj, top_level
             )
-            counter += 1
+
+    # in batch mode relations were added along with the elements
+    if writer is not None:
+        writer.flush()
+        return counter
 
     # do another full pass in order to add hierarchical relations
     # between text elements
-    for text_level_n, element_type in ts["levels"]:
+    for text_level_n, level_elements in itertools.groupby(
+        iter_text_elements(ts), key=lambda item: item[0]
+    ):
         print(
             f"Adding relations between text elements for {work_urn}, hierarchical level {text_level_n}"
         )
 
-        for text_element_dict in tqdm(ts["valid_reffs"][str(text_level_n)]):
+        for level_n, text_element_dict in tqdm(level_elements):
 
             # retrieve relations between elements identified by URNs
             current_urn = text_element_dict["current"]
@@ -264,49 +796,182 @@ def populate_text_structure(kb: KnowledgeBase, work: Resource, ts: Dict) -> None
             current_el.add_relations(
                 parent=parent_el, previous=previous_el, next=following_el
             )
-    return
+    return counter
+
+
+def populate_work(
+    kb: KnowledgeBase,
+    work_urn: str,
+    basedir: str = TEXT_STRUCTURES_BASEDIR,
+    batch_size: int = None,
+    **kwargs,
+) -> int:
+    """Populates the KB with the text structure of a work.
+
+    The text structure is downloaded (see :py:func:`download_text_structure`)
+    unless it is already found in `basedir`. Keyword arguments (e.g.
+    `max_workers`) are passed on to :py:func:`download_text_structure`.
+
+    :param KnowledgeBase kb: The knowledge base to populate.
+    :param str work_urn: CTS URN of the work.
+    :param str basedir: Directory where text structures are stored.
+    :param int batch_size: See :py:func:`populate_text_structure`.
+    :return: The number of text elements created.
+    :rtype: int
+
+    """
+    work_obj = kb.get_resource_by_urn(work_urn)
+
+    structure_json_path = os.path.join(basedir, f"{work_urn.replace(':', '-')}.json")
+    structure_jsonl_path = f"{structure_json_path}l"
+    if os.path.exists(structure_jsonl_path):
+        print(f"Skipping {work_urn} as {structure_jsonl_path} already exists.")
+    elif os.path.exists(structure_json_path):
+        print(f"Skipping {work_urn} as {structure_json_path} already exists.")
+    else:
+        download_text_structure(work_urn, basedir, jsonl=True, **kwargs)
+
+    # large text structures are streamed rather than loaded in memory
+    if os.path.exists(structure_jsonl_path):
+        ts_json = load_text_structure_JSONL(work_urn, basedir)
+    else:
+        ts_json = load_text_structure_JSON(work_urn, basedir)
+    return populate_text_structure(kb, work_obj, ts_json, batch_size=batch_size)
+
+
+# the KB used by the current worker process (see `populate_works`)
+_worker_kb = None
+
+
+def _init_worker(kb_config: str) -> None:
+    """Creates the KB that a worker process reuses for all its works."""
+    global _worker_kb
+    _worker_kb = KnowledgeBase(kb_config)
+    _worker_kb.enable_urn_index(max_size=URN_INDEX_MAX_SIZE)
+
+
+def _populate_work_task(work_urn: str, **kwargs) -> PopulationResult:
+    """Populates a work in a worker process, without letting failures escape."""
+    start = time.monotonic()
+    try:
+        n_elements = populate_work(_worker_kb, work_urn, **kwargs)
+        error = None
+    except Exception as e:
+        logger.exception(f"Failed to populate {work_urn}")
+        n_elements, error = 0, f"{type(e).__name__}: {e}"
+    return PopulationResult(work_urn, n_elements, time.monotonic() - start, error)
+
+
+def read_work_urns(path: str) -> List[str]:
+    """Reads a file with one work CTS URN per line (empty lines and lines
+    starting with ``#`` are ignored)."""
+    with open(path, "r") as ifile:
+        lines = [line.strip() for line in ifile]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def populate_works(
+    work_urns: List[str], kb_config: str = None, processes: int = 1, **kwargs
+) -> List[PopulationResult]:
+    """Populates the KB with the text structures of several works in parallel.
+
+    Works are distributed over a pool of `processes` worker processes, each
+    of which creates one ``KnowledgeBase`` and reuses it for all the works it
+    is given. A failure in one work (or in the worker process populating it,
+    e.g. a crash that breaks the pool) is logged and reported, without losing
+    the results of the others. Keyword arguments are passed on to
+    :py:func:`populate_work`; `max_requests_per_second` (if given) is the
+    overall rate of the worker processes, and is split among them (see
+    :py:func:`split_rate`).
+
+    :param List[str] work_urns: CTS URNs of the works to populate.
+    :param str kb_config: Path to the KB's configuration file.
+    :param int processes: Number of worker processes.
+    :return: One result per work, in the same order as `work_urns`.
+    :rtype: List[PopulationResult]
+
+    """
+    processes = max(1, min(processes, len(work_urns)))
+    if "max_requests_per_second" in kwargs:
+        kwargs["max_requests_per_second"] = split_rate(
+            kwargs["max_requests_per_second"], processes
+        )
+    results = {}
+    with ProcessPoolExecutor(
+        max_workers=processes, initializer=_init_worker, initargs=(kb_config,)
+    ) as executor:
+        futures = {
+            executor.submit(_populate_work_task, work_urn, **kwargs): work_urn
+            for work_urn in work_urns
+        }
+        progress = tqdm(as_completed(futures), total=len(futures), unit="work")
+        for future in progress:
+            work_urn = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # e.g. `BrokenProcessPool`, if a worker process died
+                logger.error(f"Failed to populate {work_urn}: {type(e).__name__}: {e}")
+                result = PopulationResult(work_urn, 0, 0.0, f"{type(e).__name__}: {e}")
+            results[result.work_urn] = result
+            if result.error is None:
+                progress.write(
+                    f"{result.work_urn}: {result.elements} elements created in {result.seconds:.1f}s"
+                )
+            else:
+                progress.write(f"{result.work_urn}: FAILED ({result.error})")
+    return [results[work_urn] for work_urn in work_urns]
+
+
+def print_population_summary(results: List[PopulationResult], seconds: float) -> None:
+    """Prints a summary report of a population run.
+
+    :param List[PopulationResult] results: As returned by :py:func:`populate_works`.
+    :param float seconds: Overall (wall clock) duration of the run.
+    :rtype: None
+
+    """
+    failed = [result for result in results if result.error is not None]
+    n_elements = sum(result.elements for result in results)
+    rate = n_elements / seconds if seconds > 0 else 0.0
+    print(f"Populated {len(results) - len(failed)}/{len(results)} works")
+    print(
+        f"{n_elements} text elements created in {seconds:.1f}s ({rate:.1f} elements/s)"
+    )
+    for result in failed:
+        print(f"Failed: {result.work_urn} ({result.error})")
 
 
 def main():
     arguments = docopt(__doc__)
-    work_id = arguments["--work"]
     log_path = arguments["--log-file"]
     kb_config = arguments["--kb-config-file"]
+    batch_size = int(arguments["--batch-size"]) if arguments["--batch-size"] else None
+    max_workers = int(arguments["--workers"])
+    processes = int(arguments["--processes"])
+    max_rps = float(arguments["--max-rps"]) if arguments["--max-rps"] else None
+    fetch_nodes = True if arguments["--fetch-nodes"] else False
     verbose = True if arguments["--verbose"] else False
 
     # initialise the logger
     root_logger = init_logger(log_path, verbose)
 
-    # TODO allow for an input file path to be passed as parameter
-    # this file will contain a line-separated list of work CTS URNs
-
-    """
-    works = [
-        "urn:cts:greekLit:tlg0011.tlg003",  # Sophocle's Ajax
-        "urn:cts:greekLit:tlg0011.tlg002",  # Soph. Antigone
-        "urn:cts:greekLit:tlg0011.tlg004",  # Oedipus Rex
-        "urn:cts:greekLit:tlg0012.tlg001",  # Homer's Iliad
-        "urn:cts:greekLit:tlg0012.tlg002",  # Homer's Odyssey
-        "urn:cts:latinLit:phi0690.phi003",  # Vergil's Aeneid
-        "urn:cts:greekLit:tlg0001.tlg001",  # Apollonius Rhodius' Argonautica
-        "urn:cts:latinLit:phi0959.phi006",  # Ovid's Metamorphoses
-    ]
-    """
-    works = [work_id]
-    for work_urn in works:
-        kb = KnowledgeBase(kb_config)
-        work_obj = kb.get_resource_by_urn(work_id)
-
-        basedir = TEXT_STRUCTURES_BASEDIR
-        structure_json_path = os.path.join(
-            basedir, f"{work_urn.replace(':', '-')}.json"
-        )
-        if os.path.exists(structure_json_path):
-            print(f"Skipping {work_urn} as {structure_json_path} already exists.")
-        else:
-            download_text_structure(work_urn, basedir)
-        ts_json = load_text_structure_JSON(work_urn, basedir)
-        populate_text_structure(kb, work_obj, ts_json)
+    if arguments["--works-file"]:
+        works = read_work_urns(arguments["--works-file"])
+    else:
+        works = [arguments["--work"]]
+
+    start = time.monotonic()
+    results = populate_works(
+        works,
+        kb_config,
+        processes=processes,
+        batch_size=batch_size,
+        max_workers=max_workers,
+        max_requests_per_second=max_rps,
+        fetch_nodes=fetch_nodes,
+    )
+    print_population_summary(results, time.monotonic() - start)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,255 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# author: Matteo Romanello, matteo.romanello@gmail.com
+
+"""
+Recognition of author names and work titles in running text.
+
+The :py:class:`NameRecognizer` compiles all the names, titles and
+abbreviations in a ``KnowledgeBase`` (see
+:py:meth:`hucitlib.KnowledgeBase.get_name_recognizer`) into a single
+Aho–Corasick automaton, so that each text is scanned only once, however
+many labels there are.
+
+Labels and texts are normalized in the same way as abbreviations (see
+:py:func:`hucitlib.abbreviations.normalize`): matching ignores case,
+diacritics, punctuation and spacing, and only whole words are matched (e.g.
+``Homer`` is found in ``(Homer, Il. 1.1)`` but not in ``Homeric``). Spans
+refer to the original text, and cover the matched words only (the span of
+``Il.`` in ``Il. 1.1`` is ``(0, 2)``).
+
+.. code-block:: python
+
+    >>> recognizer = kb.get_name_recognizer()
+    >>> for match in recognizer.find("As Homer says in the Iliad..."):
+    ...     print(match.span, match.urn)
+    (3, 8) urn:cts:greekLit:tlg0012
+    (21, 26) urn:cts:greekLit:tlg0012.tlg001
+
+"""
+
+import json
+import logging
+from collections import deque, namedtuple
+from typing import Dict, Iterable, Iterator, List, Tuple
+from hucitlib.search import fold, AUTHOR, WORK
+
+logger = logging.getLogger(__name__)
+
+RECOGNIZER_FORMAT_VERSION = 1
+
+NameMatch = namedtuple("NameMatch", ["span", "urn", "label", "type"])
+
+
+def _normalize_with_offsets(text: str) -> Tuple[str, List[int]]:
+    """Normalizes a text, keeping track of where each character comes from.
+
+    :return: The normalized text (folded, with each run of non-word characters
+        replaced by a space), and for each of its characters the offset of the
+        corresponding character in `text`.
+    """
+    chars, offsets = [], []
+    for offset, char in enumerate(text):
+        for folded_char in fold(char):
+            if folded_char.isalnum():
+                chars.append(folded_char)
+                offsets.append(offset)
+            elif chars and chars[-1] != " ":
+                chars.append(" ")
+                offsets.append(offset)
+    return "".join(chars), offsets
+
+
+class NameRecognizer(object):
+    """Finds the names, titles and abbreviations of authors and works in texts.
+
+    :param Iterable[Tuple[str, str, str]] labels: (label, CTS URN, type)
+        tuples, where type is either ``author`` or ``work``.
+    :param str fingerprint: Fingerprint of the KB the labels come from.
+    """
+
+    def __init__(
+        self, labels: Iterable[Tuple[str, str, str]], fingerprint: str = None
+    ) -> None:
+        self.fingerprint = fingerprint
+        self._labels = []
+        # normalized label => [(label, URN, type)]
+        self._patterns = {}
+        for label, urn, label_type in labels:
+            pattern = _normalize_with_offsets(label)[0].strip()
+            if not pattern:
+                continue
+            if any(urn == entry[1] for entry in self._patterns.get(pattern, [])):
+                continue
+            self._labels.append((label, urn, label_type))
+            self._patterns.setdefault(pattern, []).append((label, urn, label_type))
+        self._build_automaton()
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def __repr__(self) -> str:
+        return (
+            f"<NameRecognizer: {len(self._labels)} labels, "
+            f"{len(self._transitions)} states>"
+        )
+
+    def _build_automaton(self) -> None:
+        """Builds the Aho–Corasick automaton of the normalized labels."""
+        # state => {char: next state}; state 0 is the root
+        self._transitions = [{}]
+        # state => patterns recognized when reaching it
+        self._outputs = [[]]
+        for pattern in self._patterns:
+            state = 0
+            for char in pattern:
+                next_state = self._transitions[state].get(char)
+                if next_state is None:
+                    next_state = len(self._transitions)
+                    self._transitions[state][char] = next_state
+                    self._transitions.append({})
+                    self._outputs.append([])
+                state = next_state
+            self._outputs[state].append(pattern)
+
+        # failure links are computed breadth-first, so that the failure state of
+        # each state is known before those of its children
+        self._failures = [0] * len(self._transitions)
+        queue = deque(self._transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._transitions[state].items():
+                queue.append(next_state)
+                failure = self._failures[state]
+                while failure and char not in self._transitions[failure]:
+                    failure = self._failures[failure]
+                self._failures[next_state] = self._transitions[failure].get(char, 0)
+                self._outputs[next_state] += self._outputs[self._failures[next_state]]
+
+    @classmethod
+    def from_dictionaries(
+        cls,
+        authors: Iterable[Dict[str, str]] = (),
+        works: Iterable[Dict[str, str]] = (),
+        **kwargs,
+    ) -> "NameRecognizer":
+        """Builds a recognizer from legacy dictionaries.
+
+        :param authors: Dictionaries like
+            :py:attr:`hucitlib.KnowledgeBase.author_names`, whose keys have the
+            form ``<urn>$$n<i>``.
+        :param works: Dictionaries like
+            :py:attr:`hucitlib.KnowledgeBase.work_titles`.
+        :rtype: NameRecognizer
+
+        """
+        return cls(
+            (
+                (label, key.split("$$")[0], label_type)
+                for dictionaries, label_type in [(authors, AUTHOR), (works, WORK)]
+                for dictionary in dictionaries
+                for key, label in dictionary.items()
+            ),
+            **kwargs,
+        )
+
+    def find(self, text: str, overlapping: bool = False) -> Iterator[NameMatch]:
+        """Finds the labels that occur in a text.
+
+        :param str text: The text to scan.
+        :param bool overlapping: If ``False``, only the longest of overlapping
+            labels is returned (e.g. ``Hom. Il.`` rather than ``Hom.`` and
+            ``Il.``); otherwise all of them are.
+        :return: The matches, in order of appearance. A label found in the
+            text yields one match per URN it belongs to: labels of the same URN
+            that only differ in case or accents are merged when the recognizer
+            is built, while a label shared by several authors or works (e.g.
+            ``Homer``) yields one match for each of them.
+        :rtype: Iterator[NameMatch]
+
+        """
+        normalized, offsets = _normalize_with_offsets(text)
+        # (start, end, pattern) tuples, with offsets in the normalized text
+        found = []
+        state = 0
+        for end, char in enumerate(normalized, 1):
+            while state and char not in self._transitions[state]:
+                state = self._failures[state]
+            state = self._transitions[state].get(char, 0)
+            for pattern in self._outputs[state]:
+                start = end - len(pattern)
+                # only whole words are matched
+                if (start == 0 or normalized[start - 1] == " ") and (
+                    end == len(normalized) or normalized[end] == " "
+                ):
+                    found.append((start, end, pattern))
+
+        found.sort(key=lambda match: (match[0], match[0] - match[1]))
+        last_end = 0
+        for start, end, pattern in found:
+            if not overlapping:
+                if start < last_end:
+                    continue
+                last_end = end
+            span = (offsets[start], offsets[end - 1] + 1)
+            for label, urn, label_type in self._patterns[pattern]:
+                yield NameMatch(span, urn, label, label_type)
+
+    def find_in_lines(
+        self, lines: Iterable[str], overlapping: bool = False
+    ) -> Iterator[Tuple[int, NameMatch]]:
+        """Finds the labels that occur in a stream of lines (e.g. a file).
+
+        Lines are scanned one at a time, so labels spanning several lines are
+        not found.
+
+        :param Iterable[str] lines: The lines to scan.
+        :param bool overlapping: See :py:meth:`find`.
+        :return: (line number, match) tuples, where line numbers start at 1.
+        :rtype: Iterator[Tuple[int, NameMatch]]
+
+        .. code-block:: python
+
+            >>> with open("commentary.txt") as ifile:
+            ...     for line_number, match in recognizer.find_in_lines(ifile):
+            ...         print(line_number, match.urn)
+
+        """
+        for line_number, line in enumerate(lines, 1):
+            for match in self.find(line, overlapping):
+                yield line_number, match
+
+    def save(self, path: str) -> None:
+        """Writes the labels of the recognizer to a (JSON) file.
+
+        :param str path: Path to the output file.
+        :rtype: None
+
+        """
+        with open(path, "w", encoding="utf-8") as ofile:
+            json.dump(
+                {
+                    "format_version": RECOGNIZER_FORMAT_VERSION,
+                    "fingerprint": self.fingerprint,
+                    "labels": self._labels,
+                },
+                ofile,
+            )
+        logger.info(f"Saved {self} to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> "NameRecognizer":
+        """Loads a recognizer from a file written by :py:meth:`save`.
+
+        :param str path: Path to the file.
+        :rtype: NameRecognizer
+        :raises ValueError: If the file was written in a different format.
+
+        """
+        with open(path, "r", encoding="utf-8") as ifile:
+            data = json.load(ifile)
+        if data.get("format_version") != RECOGNIZER_FORMAT_VERSION:
+            raise ValueError(f"Unsupported recognizer format in {path}")
+        recognizer = cls(data["labels"], data["fingerprint"])
+        logger.info(f"Loaded {recognizer} from {path}")
+        return recognizer
@@ -0,0 +1,170 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# author: Matteo Romanello, matteo.romanello@gmail.com
+
+"""
+Local full-text index of the labels of authors and works.
+
+The index contains the names and name abbreviations of authors, and the
+titles and title abbreviations of works. Labels are split into words and
+folded (lower-cased, diacritics removed), so that e.g. ``Homère``,
+``homere`` and ``HOMERE`` all match the same entries, and Greek is matched
+regardless of accents and breathings (``Ὅμηρος`` == ``ομηρος``).
+
+Unlike :py:meth:`hucitlib.KnowledgeBase.search` with Virtuoso's
+``bif:contains``, the index works with any triple store: it is built from the
+KB once (see :py:meth:`hucitlib.KnowledgeBase.get_label_index`) and can be
+saved to a file.
+
+.. code-block:: python
+
+    >>> index = kb.get_label_index()
+    >>> index.search("homer")
+    [LabelMatch(label='Homer', uri='http://purl.org/hucit/kb/authors/927', type='author')]
+    >>> [match.label for match in index.search("odis*")]
+    ['Odissea']
+
+"""
+
+import re
+import json
+import bisect
+import logging
+import unicodedata
+from collections import namedtuple
+from typing import Iterable, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+LABEL_INDEX_FORMAT_VERSION = 1
+
+# types of the resources whose labels are indexed
+AUTHOR = "author"
+WORK = "work"
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+LabelMatch = namedtuple("LabelMatch", ["label", "uri", "type"])
+
+
+def fold(text: str) -> str:
+    """Lower-cases a string and removes its diacritics.
+
+    :param str text: The string to fold.
+    :return: The folded string.
+    :rtype: str
+
+    .. code-block:: python
+
+        >>> fold("Ὅμηρος")
+        'ομηροσ'
+
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return stripped.casefold()
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits a string into (folded) words."""
+    return TOKEN_PATTERN.findall(fold(text))
+
+
+class LabelIndex(object):
+    """Inverted index mapping words to the labels containing them.
+
+    :param List[Tuple[str, str, str]] entries: The indexed labels, as
+        (label, resource URI, resource type) tuples.
+    :param str fingerprint: Fingerprint of the KB the labels come from.
+    """
+
+    def __init__(
+        self, entries: Iterable[Tuple[str, str, str]], fingerprint: str = None
+    ) -> None:
+        self.fingerprint = fingerprint
+        self._entries = [LabelMatch(*entry) for entry in entries]
+        self._postings = {}
+        for entry_id, entry in enumerate(self._entries):
+            for token in set(tokenize(entry.label)):
+                self._postings.setdefault(token, []).append(entry_id)
+        # sorted, so that words starting with a given prefix are contiguous
+        self._vocabulary = sorted(self._postings)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return (
+            f"<LabelIndex: {len(self._entries)} labels, {len(self._vocabulary)} words>"
+        )
+
+    def _match_token(self, token: str, prefix: bool) -> Set[int]:
+        if not prefix:
+            return set(self._postings.get(token, []))
+
+        matches = set()
+        i = bisect.bisect_left(self._vocabulary, token)
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(token):
+            matches.update(self._postings[self._vocabulary[i]])
+            i += 1
+        return matches
+
+    def search(self, query: str, prefix: bool = False) -> List[LabelMatch]:
+        """Returns the labels that contain all the words of a query.
+
+        :param str query: The search string. Words ending with ``*`` are
+            matched as prefixes (e.g. ``Hom*``).
+        :param bool prefix: If ``True``, all words are matched as prefixes.
+        :return: The matching labels, in the order they were indexed.
+        :rtype: List[LabelMatch]
+
+        """
+        matches = None
+        for term in query.split():
+            term_tokens = tokenize(term)
+            for i, token in enumerate(term_tokens):
+                # only the last word of a term like "Hom.*" can be a prefix
+                is_prefix = prefix or (term.endswith("*") and i == len(term_tokens) - 1)
+                token_matches = self._match_token(token, is_prefix)
+                matches = token_matches if matches is None else matches & token_matches
+                if not matches:
+                    return []
+
+        if matches is None:
+            return []
+        return [self._entries[entry_id] for entry_id in sorted(matches)]
+
+    def save(self, path: str) -> None:
+        """Writes the index to a (JSON) file.
+
+        :param str path: Path to the output file.
+        :rtype: None
+
+        """
+        with open(path, "w", encoding="utf-8") as ofile:
+            json.dump(
+                {
+                    "format_version": LABEL_INDEX_FORMAT_VERSION,
+                    "fingerprint": self.fingerprint,
+                    "entries": self._entries,
+                },
+                ofile,
+            )
+        logger.info(f"Saved {self} to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> "LabelIndex":
+        """Loads an index from a file written by :py:meth:`save`.
+
+        :param str path: Path to the index file.
+        :rtype: LabelIndex
+        :raises ValueError: If the file was written in a different format.
+
+        """
+        with open(path, "r", encoding="utf-8") as ifile:
+            data = json.load(ifile)
+        if data.get("format_version") != LABEL_INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported label index format in {path}")
+        index = cls(data["entries"], data["fingerprint"])
+        logger.info(f"Loaded {index} from {path}")
+        return index
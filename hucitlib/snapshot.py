@@ -0,0 +1,109 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# author: Matteo Romanello, matteo.romanello@gmail.com
+
+"""
+On-disk snapshots of the lookup tables of a ``KnowledgeBase``.
+
+A snapshot is a JSON file containing the legacy dictionaries
+(e.g. ``author_names``) and the URN => URI map. Each snapshot is tied to a
+triple store (via its endpoint and default context) and to a fingerprint of
+its content (the number of triples), so that it can be safely discarded as
+soon as the knowledge base changes.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from typing import Dict, Optional
+from hucitlib.__version__ import str_version
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+# the keys of a store's settings that identify the data it exposes
+SNAPSHOT_KEY_SETTINGS = ["endpoint", "default_context", "knowledge_base_sources"]
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "hucitlib")
+
+
+def get_snapshot_path(cache_dir: str, settings: Dict[str, str]) -> str:
+    """Returns the path of the snapshot file for a given triple store.
+
+    :param str cache_dir: Directory where snapshots are stored.
+    :param Dict[str, str] settings: The settings of the triple store (see
+        :py:attr:`hucitlib.KnowledgeBase.settings`).
+    :return: Path to the snapshot file.
+    :rtype: str
+
+    """
+    key = "|".join(str(settings.get(name, "")) for name in SNAPSHOT_KEY_SETTINGS)
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"kb-snapshot-{digest}.json")
+
+
+def load_snapshot(path: str, fingerprint: str) -> Optional[Dict[str, Dict]]:
+    """Loads the lookup tables from a snapshot file, if still valid.
+
+    :param str path: Path to the snapshot file.
+    :param str fingerprint: Fingerprint of the current content of the KB.
+    :return: A dictionary of lookup tables, or ``None`` if the snapshot is
+        missing, unreadable or outdated.
+    :rtype: Optional[Dict[str, Dict]]
+
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "r", encoding="utf-8") as ifile:
+            snapshot = json.load(ifile)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read snapshot {path}: {e}")
+        return None
+
+    if snapshot.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        logger.info(f"Discarding snapshot {path} (format version has changed)")
+        return None
+    elif snapshot.get("fingerprint") != fingerprint:
+        logger.info(f"Discarding snapshot {path} (the KB has changed)")
+        return None
+
+    logger.info(f"Loaded lookup tables from snapshot {path}")
+    return snapshot["tables"]
+
+
+def save_snapshot(path: str, fingerprint: str, tables: Dict[str, Dict]) -> None:
+    """Writes the lookup tables to a snapshot file.
+
+    The file is written atomically, so that concurrent processes never read
+    a partially written snapshot.
+
+    :param str path: Path to the snapshot file.
+    :param str fingerprint: Fingerprint of the current content of the KB.
+    :param Dict[str, Dict] tables: The lookup tables to persist.
+    :rtype: None
+
+    """
+    cache_dir = os.path.dirname(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    snapshot = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "hucitlib_version": str_version,
+        "fingerprint": fingerprint,
+        "tables": tables,
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as ofile:
+        json.dump(snapshot, ofile)
+    os.replace(tmp_path, path)
+    logger.info(f"Saved lookup tables to snapshot {path}")
+
+
+def remove_snapshot(path: str) -> None:
+    """Removes a snapshot file (if it exists)."""
+    if os.path.exists(path):
+        os.remove(path)
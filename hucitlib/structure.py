@@ -0,0 +1,349 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# author: Matteo Romanello, matteo.romanello@gmail.com
+
+"""
+In-memory trees of the text elements of a work's citable text structure.
+
+Navigating a text structure via :py:class:`hucitlib.surfext.HucitTextElement`
+(``next``, ``previous``, ``parent``, ``children``) costs one query per step.
+A :py:class:`TextStructureTree` is fetched once, with a single query (see
+:py:meth:`hucitlib.surfext.HucitWork.load_structure`), and stores the
+elements in arrays: element ``i`` is described by the ``i``-th item of each
+array, and its relations are indexes of other elements, so that moving
+around the tree costs no queries at all.
+
+Elements are sorted by citation level (e.g. books, then lines) and, within
+each level, in document order.
+
+.. code-block:: python
+
+    >>> iliad = kb.get_resource_by_urn("urn:cts:greekLit:tlg0012.tlg001")
+    >>> tree = iliad.load_structure()
+    >>> line = tree.get_element("urn:cts:greekLit:tlg0012.tlg001:1.1")
+    >>> line.next.urn, line.parent.urn
+    ('urn:cts:greekLit:tlg0012.tlg001:1.2', 'urn:cts:greekLit:tlg0012.tlg001:1')
+    >>> [book.urn for book in tree.iter_level(1)][:2]
+    ['urn:cts:greekLit:tlg0012.tlg001:1', 'urn:cts:greekLit:tlg0012.tlg001:2']
+
+"""
+
+import logging
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from pyCTS import CTS_URN
+
+logger = logging.getLogger(__name__)
+
+# reference to a missing element (e.g. the parent of a top-level element)
+NONE = -1
+
+# typecode of the arrays (signed int, 4 bytes)
+ARRAY_TYPECODE = "i"
+
+
+class StructureElement(object):
+    """A text element of a :py:class:`TextStructureTree`.
+
+    Its accessors mirror those of :py:class:`hucitlib.surfext.HucitTextElement`,
+    but read from the tree instead of querying the KB.
+
+    :param TextStructureTree tree: The tree the element belongs to.
+    :param int index: Index of the element in the tree.
+    """
+
+    __slots__ = ["tree", "index"]
+
+    def __init__(self, tree: "TextStructureTree", index: int) -> None:
+        self.tree = tree
+        self.index = index
+
+    def __repr__(self) -> str:
+        return f"<StructureElement: {self.urn or self.uri}>"
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, StructureElement)
+            and self.tree is other.tree
+            and self.index == other.index
+        )
+
+    def __hash__(self) -> int:
+        return hash((id(self.tree), self.index))
+
+    @property
+    def uri(self) -> str:
+        """The URI of the text element."""
+        return self.tree._uris[self.index]
+
+    @property
+    def urn(self) -> Optional[str]:
+        """The CTS URN of the text element (as a string)."""
+        return self.tree._urns[self.index]
+
+    @property
+    def level(self) -> int:
+        """The citation level of the element (1 for top-level elements)."""
+        return self.tree._levels[self.index]
+
+    @property
+    def next(self) -> Optional["StructureElement"]:
+        """Returns the following text element (if any)."""
+        return self.tree._get(self.tree._next[self.index])
+
+    @property
+    def previous(self) -> Optional["StructureElement"]:
+        """Returns the preceding text element (if any)."""
+        return self.tree._get(self.tree._previous[self.index])
+
+    @property
+    def parent(self) -> Optional["StructureElement"]:
+        """Returns the parent (if any)."""
+        return self.tree._get(self.tree._parents[self.index])
+
+    @property
+    def children(self) -> List["StructureElement"]:
+        """Returns the children text element(s), in document order."""
+        offsets = self.tree._child_offsets
+        return [
+            StructureElement(self.tree, child)
+            for child in self.tree._children[
+                offsets[self.index] : offsets[self.index + 1]
+            ]
+        ]
+
+    def get_type(self) -> Optional[str]:
+        """Returns the label of the element's type (e.g. ``line``)."""
+        type_id = self.tree._types[self.index]
+        return None if type_id == NONE else self.tree._type_labels[type_id]
+
+    def get_urn(self) -> Optional[CTS_URN]:
+        """Returns the element's CTS URN."""
+        return None if self.urn is None else CTS_URN(self.urn)
+
+    def is_first(self) -> bool:
+        return self.tree._previous[self.index] == NONE
+
+    def is_last(self) -> bool:
+        return self.tree._next[self.index] == NONE
+
+
+class TextStructureTree(object):
+    """Array-backed tree of the text elements of a text structure.
+
+    Instances are not meant to be created directly, but built from the
+    records fetched from the KB (:py:meth:`from_records`, via
+    :py:meth:`hucitlib.surfext.HucitWork.load_structure`).
+
+    :param List[str] uris: The URIs of the elements, sorted by level and
+        document order.
+    :param List[str] urns: The CTS URNs of the elements (or ``None``).
+    :param array types: The types of the elements, as indexes of `type_labels`.
+    :param List[str] type_labels: The labels of the element types.
+    :param array parents: The parent of each element, as an index.
+    :param array nexts: The following element of each element, as an index.
+    """
+
+    def __init__(
+        self,
+        uris: List[str],
+        urns: List[Optional[str]],
+        types: array,
+        type_labels: List[str],
+        parents: array,
+        nexts: array,
+    ) -> None:
+        self._uris = uris
+        self._urns = urns
+        self._types = types
+        self._type_labels = type_labels
+        self._parents = parents
+        self._next = nexts
+        self._rows = {uri: row for row, uri in enumerate(uris)}
+        self._urn_rows = {urn: row for row, urn in enumerate(urns) if urn is not None}
+
+        self._previous = array(ARRAY_TYPECODE, [NONE]) * len(uris)
+        for row, next_row in enumerate(nexts):
+            if next_row != NONE:
+                self._previous[next_row] = row
+
+        # elements are sorted by level, so each level is a range of rows
+        self._levels = array(ARRAY_TYPECODE)
+        self._level_offsets = array(ARRAY_TYPECODE, [0])
+        for parent in parents:
+            level = 1 if parent == NONE else self._levels[parent] + 1
+            if level > len(self._level_offsets):
+                self._level_offsets.append(len(self._levels))
+            self._levels.append(level)
+        if uris:
+            self._level_offsets.append(len(uris))
+
+        # the children of element i are
+        # self._children[self._child_offsets[i] : self._child_offsets[i + 1]]
+        child_lists = [[] for _ in uris]
+        for row, parent in enumerate(parents):
+            if parent != NONE:
+                child_lists[parent].append(row)
+        self._children = array(ARRAY_TYPECODE)
+        self._child_offsets = array(ARRAY_TYPECODE, [0])
+        for child_list in child_lists:
+            self._children.extend(child_list)
+            self._child_offsets.append(len(self._children))
+
+    def __len__(self) -> int:
+        return len(self._uris)
+
+    def __repr__(self) -> str:
+        return (
+            f"<TextStructureTree: {len(self._uris)} elements, "
+            f"{self.count_levels()} levels>"
+        )
+
+    def __iter__(self) -> Iterator[StructureElement]:
+        """Iterates over all the elements, level by level."""
+        return (StructureElement(self, row) for row in range(len(self._uris)))
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Iterable[
+            Tuple[str, Optional[str], Optional[str], Optional[str], Optional[str]]
+        ],
+    ) -> "TextStructureTree":
+        """Builds a tree from the records describing its elements.
+
+        :param records: (URI, CTS URN, type label, parent URI, following
+            element URI) tuples, in any order. The parent and following
+            element are ignored if they are not among the records.
+        :rtype: TextStructureTree
+
+        """
+        elements = {}
+        for uri, urn, type_label, parent, following in records:
+            elements[uri] = (urn, type_label, parent, following)
+
+        def get_parent(uri: str) -> Optional[str]:
+            parent = elements[uri][2]
+            return parent if parent in elements else None
+
+        # citation levels, from the top-level elements down
+        levels = {}
+        for uri in elements:
+            ancestors = [uri]
+            while ancestors[-1] not in levels:
+                parent = get_parent(ancestors[-1])
+                if parent is None or parent in ancestors:
+                    levels[ancestors.pop()] = 1
+                    break
+                ancestors.append(parent)
+            for ancestor in reversed(ancestors):
+                if ancestor not in levels:
+                    levels[ancestor] = levels[get_parent(ancestor)] + 1
+        # elements on a cycle of parents are treated as top-level elements
+        parents_of = {
+            uri: get_parent(uri) if levels[uri] > 1 else None for uri in elements
+        }
+
+        ordered, positions = [], {}
+        for level in range(1, max(levels.values(), default=0) + 1):
+            members = {uri for uri in elements if levels[uri] == level}
+            for uri in cls._order_level(members, elements, positions, parents_of):
+                positions[uri] = len(ordered)
+                ordered.append(uri)
+
+        type_labels, type_ids = [], {}
+        types = array(ARRAY_TYPECODE)
+        for uri in ordered:
+            type_label = elements[uri][1]
+            if type_label is None:
+                types.append(NONE)
+                continue
+            if type_label not in type_ids:
+                type_ids[type_label] = len(type_labels)
+                type_labels.append(type_label)
+            types.append(type_ids[type_label])
+
+        parents = array(ARRAY_TYPECODE)
+        nexts = array(ARRAY_TYPECODE)
+        for uri in ordered:
+            parent = parents_of[uri]
+            parents.append(NONE if parent is None else positions[parent])
+            following = elements[uri][3]
+            nexts.append(positions.get(following, NONE))
+
+        return cls(
+            ordered,
+            [elements[uri][0] for uri in ordered],
+            types,
+            type_labels,
+            parents,
+            nexts,
+        )
+
+    @staticmethod
+    def _order_level(
+        members: set,
+        elements: Dict,
+        positions: Dict[str, int],
+        parents_of: Dict[str, Optional[str]],
+    ) -> List[str]:
+        """Sorts the elements of a citation level in document order.
+
+        Elements are chained by their following element; chains (e.g. one per
+        parent, if the following elements do not cross parents) are sorted
+        by the position of their first element's parent.
+        """
+        followed = {elements[uri][3] for uri in members if elements[uri][3] in members}
+        chains, seen = [], set()
+        # elements on a cycle have no head, and start a chain of their own
+        for head in sorted(members - followed) + sorted(members):
+            chain, uri = [], head
+            while uri in members and uri not in seen:
+                seen.add(uri)
+                chain.append(uri)
+                uri = elements[uri][3]
+            if chain:
+                chains.append(chain)
+
+        def chain_key(chain: List[str]) -> Tuple[int, str]:
+            parent = parents_of[chain[0]]
+            return (NONE if parent is None else positions[parent], chain[0])
+
+        return [uri for chain in sorted(chains, key=chain_key) for uri in chain]
+
+    def _get(self, row: int) -> Optional[StructureElement]:
+        return None if row == NONE else StructureElement(self, row)
+
+    def count_levels(self) -> int:
+        """Returns the number of citation levels of the structure."""
+        return len(self._level_offsets) - 1
+
+    def get_element(self, urn: str) -> Optional[StructureElement]:
+        """Returns the element with a given CTS URN (``None`` if not found).
+
+        :param str urn: The element's CTS URN (e.g.
+            ``urn:cts:greekLit:tlg0012.tlg001:1.1``).
+        :rtype: Optional[StructureElement]
+
+        """
+        return self._get(self._urn_rows.get(str(urn), NONE))
+
+    def get_element_by_uri(self, uri: str) -> Optional[StructureElement]:
+        """Returns the element with a given URI (``None`` if not found)."""
+        return self._get(self._rows.get(str(uri), NONE))
+
+    def get_top_elements(self) -> List[StructureElement]:
+        """Returns the top-level elements (e.g. the books of the Iliad)."""
+        return list(self.iter_level(1))
+
+    def iter_level(self, level: int) -> Iterator[StructureElement]:
+        """Iterates over the elements of a citation level, in document order.
+
+        :param int level: The citation level (1 for top-level elements).
+        :rtype: Iterator[StructureElement]
+
+        """
+        if level < 1 or level > self.count_levels():
+            return iter([])
+        start, end = self._level_offsets[level - 1], self._level_offsets[level]
+        return (StructureElement(self, row) for row in range(start, end))
@@ -12,6 +12,7 @@ import json
 import surf
 import logging
 import itertools
+import functools
 from collections import namedtuple
 from typing import List, Dict, Optional, Union, NamedTuple
 from surf import *
@@ -19,7 +20,9 @@ from surf.resource import Resource
 from surf.exceptions import NoResultFound
 from retrying import retry
 from pyCTS import CTS_URN
-from rdflib import Literal
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.namespace import RDF, RDFS
+from hucitlib.structure import TextStructureTree
 
 logger = logging.getLogger("__name__")
 
@@ -33,6 +36,366 @@ BASE_URI_TYPES = surf.ns.KB["types/%s"]
 BASE_URI_AUTHORS = surf.ns.KB["authors/%s"]
 BASE_URI_WORKS = surf.ns.KB["works/%s"]
 
+# max number of rows fetched by a single paginated SPARQL query
+SPARQL_PAGE_SIZE = 10000
+
+
+def get_text_element_uri(work_uri: str, urn: CTS_URN) -> str:
+    """Mints the URI of a work's text element, given its CTS URN."""
+    return os.path.join(str(work_uri), urn.passage_component)
+
+
+def _update_urn_index(resource: Resource, urn: str) -> None:
+    """Keeps the session's URN index (if any) in sync after a URN change, and
+    notifies the KB (see ``KnowledgeBase._on_urn_change``)."""
+    urn_index = getattr(resource.session, "urn_index", None)
+    if urn_index is not None:
+        urn_index.replace(str(urn), str(resource.subject))
+    on_urn_change = getattr(resource.session, "on_urn_change", None)
+    if on_urn_change is not None:
+        on_urn_change(str(urn), str(resource.subject))
+
+
+class TypeRegistry(object):
+    """Session-level cache of the ``crm:E55_Type`` resources of the KB.
+
+    Types (e.g. ``kb:types/CTS_URN``, ``kb:types/abbreviation``) are
+    instantiated once per ``KnowledgeBase``, and their existence in the KB is
+    checked at most once, instead of every time a getter needs them.
+
+    :param surf.Session session: The session of a ``KnowledgeBase``.
+    """
+
+    def __init__(self, session: surf.Session) -> None:
+        self._session = session
+        self._type_class = None
+        self._types = {}
+        self._present = set()
+
+    def get(self, name: str) -> Resource:
+        """Returns the type with URI ``kb:types/<name>``.
+
+        :param str name: Name of the type (e.g. ``CTS_URN``).
+        :return: The type, which is not guaranteed to exist in the KB (see
+            :py:meth:`get_if_present`).
+        :rtype: Resource
+
+        """
+        if name not in self._types:
+            if self._type_class is None:
+                self._type_class = self._session.get_class(surf.ns.ECRM["E55_Type"])
+            self._types[name] = self._session.get_resource(
+                BASE_URI_TYPES % name, self._type_class
+            )
+        return self._types[name]
+
+    def get_if_present(self, name: str) -> Optional[Resource]:
+        """Returns the type with URI ``kb:types/<name>``, if it exists in the KB.
+
+        Only types found in the KB are remembered, so that types added later
+        (e.g. by another process) are found as well.
+
+        :param str name: Name of the type (e.g. ``opmax``).
+        :rtype: Optional[Resource]
+
+        """
+        type_resource = self.get(name)
+        if name not in self._present:
+            if not type_resource.is_present():
+                return None
+            self._present.add(name)
+        return type_resource
+
+    def mark_present(self, name: str) -> None:
+        """Records that the type ``kb:types/<name>`` was added to the KB."""
+        self._present.add(name)
+
+
+def get_type_registry(session: surf.Session) -> TypeRegistry:
+    """Returns the type registry of a session (created on first use)."""
+    registry = getattr(session, "type_registry", None)
+    if registry is None:
+        registry = session.type_registry = TypeRegistry(session)
+    return registry
+
+
+# fetches the triples describing a resource (its "neighbourhood"): those
+# whose subject is the resource or is within two hops from it (not following
+# rdf:type), and those pointing at the resource directly or via one hop
+NEIGHBOURHOOD_QUERY = """
+    SELECT ?s ?p ?o
+    WHERE {
+        {
+            <%(subject)s> ?p ?o .
+            BIND (<%(subject)s> AS ?s)
+        } UNION {
+            <%(subject)s> ?p1 ?s .
+            ?s ?p ?o .
+            FILTER (?p1 != <%(type)s>)
+        } UNION {
+            <%(subject)s> ?p1 ?x .
+            ?x ?p2 ?s .
+            ?s ?p ?o .
+            FILTER (?p1 != <%(type)s> && ?p2 != <%(type)s>)
+        } UNION {
+            ?s ?p <%(subject)s> .
+            BIND (<%(subject)s> AS ?o)
+        } UNION {
+            ?s ?p ?o .
+            ?o ?p1 <%(subject)s> .
+        }
+    }
+"""
+
+
+def _binding_to_term(binding: Dict[str, str]):
+    """Converts a SPARQL JSON result binding to an ``rdflib`` term."""
+    if binding["type"] == "uri":
+        return URIRef(binding["value"])
+    if binding["type"] == "bnode":
+        return BNode(binding["value"])
+    return Literal(
+        binding["value"],
+        lang=binding.get("xml:lang"),
+        datatype=binding.get("datatype"),
+    )
+
+
+def fetch_neighbourhood(resource: Resource) -> Graph:
+    """Fetches the triples describing a resource with a single query.
+
+    :param Resource resource: The resource.
+    :return: A graph containing the resource's outgoing triples and those of
+        the resources within two hops from it (e.g. an author's names and their
+        abbreviations), as well as the incoming triples of the resource and of
+        the resources pointing at it (e.g. the creation event and the author of
+        a work).
+    :rtype: rdflib.Graph
+
+    """
+    query = NEIGHBOURHOOD_QUERY % {"subject": resource.subject, "type": RDF.type}
+    response = resource.session.default_store.execute_sparql(query)
+    graph = Graph()
+    for binding in response["results"]["bindings"]:
+        graph.add(tuple(_binding_to_term(binding[var]) for var in ["s", "p", "o"]))
+    logger.debug(f"Fetched {len(graph)} triples describing {resource.subject}")
+    return graph
+
+
+def _clearing_cache(method):
+    """Wraps a method of ``surf.Resource`` so that it clears the resource's cache."""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.clear_cache()
+        return method(self, *args, **kwargs)
+
+    wrapper._clears_cache = True
+    return wrapper
+
+
+class MemoizeMixin(object):
+    """Per-resource memoization of derived relations (e.g. the author of a work).
+
+    Memoized values are discarded by :py:meth:`clear_cache`, which is called by
+    the methods modifying the resource, as well as by ``update()``, ``save()``,
+    ``load()`` and ``remove()``.
+    """
+
+    # methods of `surf.Resource` after which memoized values may be stale
+    CLEARING_METHODS = ["update", "save", "load", "remove"]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # SuRF maps a class by creating a subclass of both `surf.Resource` and
+        # the mapped class, with `Resource` first: its methods can't be
+        # overridden here, and are wrapped instead
+        for name in cls.CLEARING_METHODS:
+            method = getattr(cls, name, None)
+            if method is not None and not getattr(method, "_clears_cache", False):
+                setattr(cls, name, _clearing_cache(method))
+
+    def _memoize(self, key: str, compute):
+        """Returns the memoized value of `key`, calling `compute()` if missing."""
+        memo = getattr(self, "_memo", None)
+        if memo is None:
+            memo = self._memo = {}
+        if key not in memo:
+            memo[key] = compute()
+        return memo[key]
+
+    def _set_memo(self, key: str, value) -> None:
+        memo = getattr(self, "_memo", None)
+        if memo is None:
+            memo = self._memo = {}
+        memo[key] = value
+
+    def clear_cache(self) -> None:
+        """Discards the memoized values (if any), e.g. after modifying the resource."""
+        self._memo = None
+
+
+# one row per element, even if it has several URNs, types or parents
+TEXT_STRUCTURE_QUERY = """
+    SELECT ?element
+        (SAMPLE(?element_urn) AS ?urn)
+        (SAMPLE(?element_type) AS ?type_label)
+        (SAMPLE(?element_parent) AS ?parent)
+        (SAMPLE(?element_next) AS ?next)
+    WHERE {
+        <%(structure)s> <%(has_element)s>/<%(has_part)s>* ?element .
+        OPTIONAL {
+            ?element <%(identified_by)s> ?id .
+            ?id <%(has_type)s> <%(cts_urn)s> ;
+                <%(label)s> ?element_urn .
+        }
+        OPTIONAL {
+            ?element <%(has_type)s> ?type .
+            ?type <%(label)s> ?element_type .
+        }
+        OPTIONAL { ?element <%(is_part_of)s> ?element_parent . }
+        OPTIONAL { ?element <%(precedes)s> ?element_next . }
+    }
+    GROUP BY ?element
+    ORDER BY ?element
+"""
+
+
+def fetch_text_structure_tree(
+    text_structure: Resource, page_size: int = SPARQL_PAGE_SIZE
+) -> TextStructureTree:
+    """Fetches all the text elements of a text structure (with a paged query).
+
+    The query is sent in pages of `page_size` elements, as some triple stores
+    (e.g. Virtuoso) silently truncate large result sets.
+
+    :param Resource text_structure: An instance of ``hucit:TextStructure``.
+    :param int page_size: Number of elements fetched by each request.
+    :return: The elements reachable from the structure's top-level elements
+        (via ``hucit:has_part``), with their CTS URNs, types, parents and
+        following elements.
+    :rtype: hucitlib.structure.TextStructureTree
+
+    """
+    query = TEXT_STRUCTURE_QUERY % {
+        "structure": text_structure.subject,
+        "has_element": surf.ns.HUCIT["has_element"],
+        "has_part": surf.ns.HUCIT["has_part"],
+        "is_part_of": surf.ns.HUCIT["is_part_of"],
+        "precedes": surf.ns.HUCIT["precedes"],
+        "identified_by": surf.ns.ECRM["P1_is_identified_by"],
+        "has_type": surf.ns.ECRM["P2_has_type"],
+        "cts_urn": BASE_URI_TYPES % "CTS_URN",
+        "label": RDFS.label,
+    }
+    store = text_structure.session.default_store
+    # element URI => (URN, type, parent, next)
+    records = {}
+    offset = 0
+    while True:
+        response = store.execute_sparql(
+            "%s LIMIT %i OFFSET %i" % (query, page_size, offset)
+        )
+        bindings = response["results"]["bindings"]
+        for binding in bindings:
+            records[binding["element"]["value"]] = tuple(
+                binding[var]["value"] if var in binding else None
+                for var in ["urn", "type_label", "parent", "next"]
+            )
+        if len(bindings) < page_size:
+            break
+        offset += page_size
+    tree = TextStructureTree.from_records(
+        (uri, *record) for uri, record in records.items()
+    )
+    logger.debug(f"Fetched {tree} of {text_structure.subject}")
+    return tree
+
+
+class PrefetchMixin(MemoizeMixin):
+    """Eager loading of the data needed by the getters of a mapped class.
+
+    Once :py:meth:`load_deep` has been called, getters like ``get_names()``,
+    ``get_titles()``, ``get_abbreviations()`` and ``get_urn()`` read from the
+    prefetched triples instead of querying the KB attribute by attribute.
+    """
+
+    def load_deep(self) -> Resource:
+        """Fetches the resource's neighbourhood with a single query.
+
+        :return: The resource itself.
+        :rtype: Resource
+
+        .. code-block:: python
+
+            >>> homer = kb.get_resource_by_urn("urn:cts:greekLit:tlg0012")
+            >>> homer.load_deep()
+            >>> repr(homer)  # no further queries
+            'HucitAuthor (names=[Homer (@en),...],urn=urn:cts:greekLit:tlg0012)'
+
+        """
+        self._prefetched_graph = fetch_neighbourhood(self)
+        return self
+
+    def clear_prefetched(self) -> None:
+        """Discards the prefetched data (if any), e.g. after modifying the resource."""
+        self._prefetched_graph = None
+
+    def clear_cache(self) -> None:
+        """Discards the memoized values and the prefetched data (if any)."""
+        super().clear_cache()
+        self.clear_prefetched()
+
+    @property
+    def prefetched(self) -> Optional[Graph]:
+        """The triples fetched by :py:meth:`load_deep` (``None`` if not loaded)."""
+        return getattr(self, "_prefetched_graph", None)
+
+    def _get_prefetched_nodes(
+        self, subject, predicate: URIRef, rdf_type: URIRef = None
+    ) -> List:
+        """Returns the objects of `predicate` (optionally of a given rdf:type)."""
+        return [
+            node
+            for node in self.prefetched.objects(subject, predicate)
+            if rdf_type is None or (node, RDF.type, rdf_type) in self.prefetched
+        ]
+
+    def _get_prefetched_labels(self, nodes: List, type_uri: str = None) -> List:
+        """Returns the labels of `nodes` (optionally, only those of type `type_uri`)."""
+        return [
+            label
+            for node in nodes
+            if type_uri is None
+            or (node, surf.ns.ECRM["P2_has_type"], URIRef(type_uri)) in self.prefetched
+            for label in self.prefetched.objects(node, RDFS.label)
+        ]
+
+    def _get_prefetched_urn(self) -> Optional[CTS_URN]:
+        identifiers = self._get_prefetched_nodes(
+            self.subject,
+            surf.ns.ECRM["P1_is_identified_by"],
+            surf.ns.ECRM["E42_Identifier"],
+        )
+        urns = self._get_prefetched_labels(identifiers, BASE_URI_TYPES % "CTS_URN")
+        return CTS_URN(str(urns[0])) if urns else None
+
+    def _get_prefetched_abbreviations(self, predicate: URIRef, rdf_type: URIRef):
+        appellations = self._get_prefetched_nodes(self.subject, predicate, rdf_type)
+        alternative_forms = [
+            form
+            for appellation in appellations
+            for form in self.prefetched.objects(
+                appellation, surf.ns.ECRM["P139_has_alternative_form"]
+            )
+        ]
+        return [
+            str(label)
+            for label in self._get_prefetched_labels(
+                alternative_forms, BASE_URI_TYPES % "abbreviation"
+            )
+        ]
+
 
 class CitationLevel(NamedTuple):
     level: int
@@ -41,7 +404,7 @@ class CitationLevel(NamedTuple):
     count: int
 
 
-class HucitAuthor(object):
+class HucitAuthor(PrefetchMixin):
     """
     Object mapping for class `frbroo:F10_Person <http://erlangen-crm.org/efrbroo/>`_.
     """
@@ -84,6 +447,18 @@ class HucitAuthor(object):
             ('fr', 'Homère'),
             ('it', 'Omero')]
         """
+        if self.prefetched is not None:
+            names = self._get_prefetched_nodes(
+                self.subject,
+                surf.ns.ECRM["P1_is_identified_by"],
+                surf.ns.EFRBROO["F12_Name"],
+            )
+            self.names = [
+                (label.language, label.title())
+                for label in self._get_prefetched_labels(names)
+            ]
+            return self.names
+
         names = [
             id
             for id in self.ecrm_P1_is_identified_by
@@ -104,6 +479,7 @@ class HucitAuthor(object):
         :rtype: bool
 
         """
+        self.clear_cache()
         try:
             assert (lang, name) not in self.get_names()
         except Exception as e:
@@ -126,6 +502,7 @@ class HucitAuthor(object):
             raise e
 
     def remove_name(self, name_to_remove):  # TODO implement
+        self.clear_cache()
         name = [
             id
             for id in self.ecrm_P1_is_identified_by
@@ -148,6 +525,7 @@ class HucitAuthor(object):
         :param new_abbreviation: the abbreviation to be added
         :return: `True` if the abbreviation is added, `False` otherwise (the abbreviation is a duplicate)
         """
+        self.clear_cache()
         try:
             assert new_abbreviation not in self.get_abbreviations()
         except Exception as e:
@@ -158,10 +536,7 @@ class HucitAuthor(object):
             return False
 
         try:
-            type_abbreviation = self.session.get_resource(
-                BASE_URI_TYPES % "abbreviation",
-                self.session.get_class(surf.ns.ECRM["E55_Type"]),
-            )
+            type_abbreviation = get_type_registry(self.session).get("abbreviation")
             abbreviation = [
                 abbreviation
                 for name in self.ecrm_P1_is_identified_by
@@ -174,10 +549,7 @@ class HucitAuthor(object):
             return True
         except IndexError as e:
             # means there is no abbreviation instance yet
-            type_abbreviation = self.session.get_resource(
-                BASE_URI_TYPES % "abbreviation",
-                self.session.get_class(surf.ns.ECRM["E55_Type"]),
-            )
+            type_abbreviation = get_type_registry(self.session).get("abbreviation")
             Appellation = self.session.get_class(surf.ns.ECRM["E41_Appellation"])
             abbreviation_uri = "%s/abbr" % str(self.subject)
             abbreviation = Appellation(abbreviation_uri)
@@ -211,12 +583,17 @@ class HucitAuthor(object):
             >>> homer.get_abbreviations()
             ['Hom.']
         """
+        return list(self._memoize("abbreviations", self._get_abbreviations))
+
+    def _get_abbreviations(self) -> List[str]:
+        if self.prefetched is not None:
+            return self._get_prefetched_abbreviations(
+                surf.ns.ECRM["P1_is_identified_by"], surf.ns.EFRBROO["F12_Name"]
+            )
+
         abbreviations = []
         try:
-            type_abbreviation = self.session.get_resource(
-                BASE_URI_TYPES % "abbreviation",
-                self.session.get_class(surf.ns.ECRM["E55_Type"]),
-            )
+            type_abbreviation = get_type_registry(self.session).get("abbreviation")
             abbreviations = [
                 str(label)
                 for name in self.ecrm_P1_is_identified_by
@@ -241,12 +618,12 @@ class HucitAuthor(object):
         :rtype: Optional[CTS_URN]
 
         """
+        if self.prefetched is not None:
+            return self._get_prefetched_urn()
+
         # TODO: check type
         try:
-            type_ctsurn = self.session.get_resource(
-                BASE_URI_TYPES % "CTS_URN",
-                self.session.get_class(surf.ns.ECRM["E55_Type"]),
-            )
+            type_ctsurn = get_type_registry(self.session).get("CTS_URN")
             urn = [
                 CTS_URN(identifier.rdfs_label.one)
                 for identifier in self.ecrm_P1_is_identified_by
@@ -265,7 +642,7 @@ class HucitAuthor(object):
         :rtype: Optional[CTS_URN]
 
         """
-        Type = self.session.get_class(surf.ns.ECRM["E55_Type"])
+        self.clear_cache()
         Identifier = self.session.get_class(surf.ns.ECRM["E42_Identifier"])
         id_uri = f"{self.subject}/cts_urn"
         id = Identifier(id_uri)
@@ -275,8 +652,9 @@ class HucitAuthor(object):
         else:
             id.save()
             id.rdfs_label = Literal(urn)
-            id.ecrm_P2_has_type = Type(BASE_URI_TYPES % "CTS_URN")
+            id.ecrm_P2_has_type = get_type_registry(self.session).get("CTS_URN")
             id.update()
+        _update_urn_index(self, urn)
         self.load()
         return self.get_urn()
 
@@ -284,14 +662,46 @@ class HucitAuthor(object):
         """
         Returns a list of the works (intances of `surf.Resource` and `HucitWork`)
         attributed to a given author.
+
+        If the KB's author → works map is enabled (see
+        :py:meth:`hucitlib.KnowledgeBase.enable_author_work_map`) and contains
+        the author, the works are read from there.
         """
-        works = []
-        for creation in self.efrbroo_P14i_performed:
-            try:
-                for work in creation.efrbroo_R16_initiated:
-                    works.append(work)
-            except Exception:
-                pass
+        return list(self._memoize("works", self._get_works))
+
+    def _get_works(self) -> List["HucitWork"]:
+        # see `hucitlib.KnowledgeBase.enable_author_work_map`
+        work_map = getattr(self.session, "author_work_map", None)
+        if work_map is not None and str(self.subject) in work_map:
+            Work = self.session.get_class(surf.ns.EFRBROO["F1_Work"])
+            works = [
+                self.session.get_resource(URIRef(work), Work)
+                for work, urn in work_map[str(self.subject)]
+            ]
+        elif self.prefetched is not None:
+            Work = self.session.get_class(surf.ns.EFRBROO["F1_Work"])
+            works = [
+                self.session.get_resource(work, Work)
+                for creation in self.prefetched.objects(
+                    self.subject, surf.ns.EFRBROO["P14i_performed"]
+                )
+                for work in self.prefetched.objects(
+                    creation, surf.ns.EFRBROO["R16_initiated"]
+                )
+            ]
+        else:
+            works = []
+            for creation in self.efrbroo_P14i_performed:
+                try:
+                    for work in creation.efrbroo_R16_initiated:
+                        works.append(work)
+                except Exception:
+                    pass
+
+        # the works' author is known already: no need to query it again
+        for work in works:
+            if isinstance(work, MemoizeMixin):
+                work._set_memo("author", self)
         return works
 
     def to_json(self) -> None:
@@ -407,7 +817,7 @@ class HucitTextStructure(object):
         return Work.get_by(hucit_has_structure=self).first()
 
 
-class HucitWork(object):
+class HucitWork(PrefetchMixin):
     """
     Object mapping for instances of `http://erlangen-crm.org/efrbroo/F1_Work`.
     """
@@ -438,6 +848,15 @@ class HucitWork(object):
 
     def get_titles(self):
         """TODO"""
+        if self.prefetched is not None:
+            titles = self._get_prefetched_nodes(
+                self.subject, surf.ns.EFRBROO["P102_has_title"]
+            )
+            return [
+                (label.language, str(label))
+                for label in self._get_prefetched_labels(titles[:1])
+            ]
+
         return [
             (label.language, str(label))
             for label in self.efrbroo_P102_has_title.first.rdfs_label
@@ -452,6 +871,7 @@ class HucitWork(object):
         :return: `True` if the title is added, `False` otherwise (the title is
             a duplicate)
         """
+        self.clear_cache()
         try:
             assert (lang, title) not in self.get_titles()
         except Exception as e:
@@ -482,30 +902,32 @@ class HucitWork(object):
         """
         abbreviations = []
         try:
-            type_abbreviation = self.session.get_resource(
-                BASE_URI_TYPES % "abbreviation",
-                self.session.get_class(surf.ns.ECRM["E55_Type"]),
-            )
-            abbreviations = [
-                str(label)
-                for title in self.efrbroo_P102_has_title
-                for abbreviation in title.ecrm_P139_has_alternative_form
-                for label in abbreviation.rdfs_label
-                if title.uri == surf.ns.EFRBROO["E35_Title"]
-                and abbreviation.ecrm_P2_has_type.first == type_abbreviation
-            ]
-
-            if (
-                combine
-                and len(abbreviations) > 0
-                and len(self.author.get_abbreviations()) >= 1
-            ):
+            if self.prefetched is not None:
+                abbreviations = self._get_prefetched_abbreviations(
+                    surf.ns.EFRBROO["P102_has_title"], surf.ns.EFRBROO["E35_Title"]
+                )
+            else:
+                type_abbreviation = get_type_registry(self.session).get(
+                    "abbreviation"
+                )
                 abbreviations = [
-                    "%s %s" % (author_abbrev, work_abbrev)
-                    for author_abbrev, work_abbrev in itertools.product(
-                        self.author.get_abbreviations(), self.get_abbreviations()
-                    )
+                    str(label)
+                    for title in self.efrbroo_P102_has_title
+                    for abbreviation in title.ecrm_P139_has_alternative_form
+                    for label in abbreviation.rdfs_label
+                    if title.uri == surf.ns.EFRBROO["E35_Title"]
+                    and abbreviation.ecrm_P2_has_type.first == type_abbreviation
                 ]
+
+            if combine and len(abbreviations) > 0:
+                author_abbreviations = self.author.get_abbreviations()
+                if len(author_abbreviations) >= 1:
+                    abbreviations = [
+                        "%s %s" % (author_abbrev, work_abbrev)
+                        for author_abbrev, work_abbrev in itertools.product(
+                            author_abbreviations, abbreviations
+                        )
+                    ]
         except Exception as e:
             logger.debug("Exception raised when getting abbreviations for %a" % self)
         finally:
@@ -518,6 +940,7 @@ class HucitWork(object):
         :param new_abbreviation: the abbreviation to be added
         :return: `True` if the abbreviation is added, `False` otherwise (the abbreviation is a duplicate)
         """
+        self.clear_cache()
         try:
             assert new_abbreviation not in self.get_abbreviations()
         except Exception as e:
@@ -527,10 +950,7 @@ class HucitWork(object):
             )
             return False
         try:
-            type_abbreviation = self.session.get_resource(
-                BASE_URI_TYPES % "abbreviation",
-                self.session.get_class(surf.ns.ECRM["E55_Type"]),
-            )
+            type_abbreviation = get_type_registry(self.session).get("abbreviation")
             abbreviation = [
                 abbreviation
                 for title in self.efrbroo_P102_has_title
@@ -543,10 +963,7 @@ class HucitWork(object):
             return True
         except IndexError as e:
             # means there is no name instance yet
-            type_abbreviation = self.session.get_resource(
-                BASE_URI_TYPES % "abbreviation",
-                self.session.get_class(surf.ns.ECRM["E55_Type"]),
-            )
+            type_abbreviation = get_type_registry(self.session).get("abbreviation")
             Appellation = self.session.get_class(surf.ns.ECRM["E41_Appellation"])
             abbreviation_uri = "%s/abbr" % str(self.subject)
             abbreviation = Appellation(abbreviation_uri)
@@ -566,11 +983,11 @@ class HucitWork(object):
 
         :return: an instance of `pyCTS.CTS_URN` or None
         """
+        if self.prefetched is not None:
+            return self._get_prefetched_urn()
+
         try:
-            type_ctsurn = self.session.get_resource(
-                BASE_URI_TYPES % "CTS_URN",
-                self.session.get_class(surf.ns.ECRM["E55_Type"]),
-            )
+            type_ctsurn = get_type_registry(self.session).get("CTS_URN")
             urn = [
                 CTS_URN(identifier.rdfs_label.one)
                 for identifier in self.ecrm_P1_is_identified_by
@@ -585,14 +1002,15 @@ class HucitWork(object):
         """
         Change the CTS URN of the author or adds a new one (if no URN is assigned).
         """
-        Type = self.session.get_class(surf.ns.ECRM["E55_Type"])
+        self.clear_cache()
         Identifier = self.session.get_class(surf.ns.ECRM["E42_Identifier"])
         id_uri = "%s/cts_urn" % str(self.subject)
         try:
             id = Identifier(id_uri)
             id.rdfs_label = Literal(urn)
-            id.ecrm_P2_has_type = Type(BASE_URI_TYPES % "CTS_URN")
+            id.ecrm_P2_has_type = get_type_registry(self.session).get("CTS_URN")
             id.save()
+            _update_urn_index(self, urn)
             return True
         except Exception as e:
             raise e
@@ -609,6 +1027,7 @@ class HucitWork(object):
         """
         Adds a citable text structure to the work.
         """
+        self.clear_cache()
 
         ts = self.session.get_resource(
             "%s/text_structure" % self.subject,
@@ -625,6 +1044,7 @@ class HucitWork(object):
         """
         Remove any citable text structure to the work.
         """
+        self.clear_cache()
         idx = self.hucit_has_structure.index(text_structure)
         ts = self.hucit_has_structure.pop(idx)
         ts.remove()
@@ -650,25 +1070,59 @@ class HucitWork(object):
     def structure(self):
         return self.hucit_has_structure.first
 
+    def load_structure(self, refresh: bool = False) -> Optional[TextStructureTree]:
+        """Fetches the work's text structure into an in-memory tree.
+
+        All the text elements are fetched with a single query, after which
+        moving to the next, previous, parent or children elements, or
+        iterating over a citation level, requires no further queries (see
+        :py:mod:`hucitlib.structure`). The tree is memoized (see
+        :py:meth:`clear_cache`).
+
+        :param bool refresh: If ``True``, the tree is fetched again (e.g. after
+            text elements have been added to the structure).
+        :return: The tree (``None`` if the work has no text structure).
+        :rtype: Optional[hucitlib.structure.TextStructureTree]
+
+        .. code-block:: python
+
+            >>> iliad = kb.get_resource_by_urn("urn:cts:greekLit:tlg0012.tlg001")
+            >>> tree = iliad.load_structure()
+            >>> for line in tree.iter_level(2):
+            ...     print(line.urn, line.get_type())
+
+        """
+        if refresh:
+            self.clear_cache()
+        return self._memoize("structure_tree", self._load_structure)
+
+    def _load_structure(self) -> Optional[TextStructureTree]:
+        structure = self.structure
+        if structure is None:
+            return None
+        return fetch_text_structure_tree(structure)
+
     def _get_opus_maximum(self):
         """Instantiate an opus maximum type."""
         label = """The opux maximum of a given author
                     that is, the only preserved work by that
                     author or the most known one."""
 
-        opmax = self.session.get_resource(
-            BASE_URI_TYPES % "opmax", self.session.get_class(surf.ns.ECRM["E55_Type"])
-        )
-        if opmax.is_present():
+        registry = get_type_registry(self.session)
+        opmax = registry.get_if_present("opmax")
+        if opmax is not None:
             return opmax
         else:
+            opmax = registry.get("opmax")
             opmax.rdfs_label.append(Literal(label, "en"))
             logger.debug("Created a new opus maximum type instance")
             opmax.save()
+            registry.mark_present("opmax")
             return opmax
 
     def set_as_opus_maximum(self):  # TODO: test
         """Mark explicitly the work as the author's opus maximum."""
+        self.clear_cache()
         if self.is_opus_maximum():
             return False
         else:
@@ -686,7 +1140,11 @@ class HucitWork(object):
 
         :return: boolean
         """
-        opmax = self._get_opus_maximum()
+        return self._memoize("is_opus_maximum", self._is_opus_maximum)
+
+    def _is_opus_maximum(self) -> bool:
+        # no need to check whether the type exists (or to create it) here
+        opmax = get_type_registry(self.session).get("opmax")
         types = self.ecrm_P2_has_type
 
         if opmax in types:
@@ -702,8 +1160,24 @@ class HucitWork(object):
         """
         Returns the author to whom the work is attributed.
 
+        The author is memoized (see :py:meth:`clear_cache`).
+
         :return: an instance of `HucitWork` # TODO: check that's the case
         """
+        return self._memoize("author", self._get_author)
+
+    def _get_author(self) -> HucitAuthor:
+        if self.prefetched is not None:
+            Person = self.session.get_class(surf.ns.EFRBROO["F10_Person"])
+            for creation in self.prefetched.subjects(
+                surf.ns.EFRBROO["R16_initiated"], self.subject
+            ):
+                for author in self.prefetched.subjects(
+                    surf.ns.EFRBROO["P14i_performed"], creation
+                ):
+                    return self.session.get_resource(author, Person)
+            return None
+
         CreationEvent = self.session.get_class(surf.ns.EFRBROO["F27_Work_Conception"])
         Person = self.session.get_class(surf.ns.EFRBROO["F10_Person"])
         creation_event = CreationEvent.get_by(efrbroo_R16_initiated=self).first()
@@ -32,9 +32,11 @@ setup(
         "tqdm",
         "retrying",
         "rdflib>=4.2.1",
+        "SPARQLWrapper",
         "MyCapytain",
         "surf @ git+https://github.com/franzlst/surfrdf@master#egg=surf"
     ],
+    extras_require={"compiled": ["berkeleydb"]},
     long_description=read("README.md"),
     long_description_content_type='text/markdown'
 )
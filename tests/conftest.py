@@ -5,10 +5,13 @@ import logging
 import pathlib
 import sys
 import pytest
+import threading
+from http.server import ThreadingHTTPServer
 from pytest import fixture
 import pkg_resources
 import hucitlib
 from hucitlib import *
+from cts_stub import CtsStubHandler
 
 OUTPUT_DIR = pkg_resources.resource_filename(
     "hucitlib", f"data/tests/"
@@ -54,3 +57,22 @@ def kb_virtuoso(filename="virtuoso_pc6.ini"):
     )
     logger.info("Using config file: %s" % configuration_file)
     return KnowledgeBase(configuration_file)
+
+
+@fixture(scope="session")
+def kb_virtuoso_bulk(filename="virtuoso_pc6.ini"):
+    configuration_file = pkg_resources.resource_filename(
+        "hucitlib", "config/%s" % filename
+    )
+    logger.info("Using config file: %s (bulk fetch mode)" % configuration_file)
+    return KnowledgeBase(configuration_file, bulk_fetch=True)
+
+
+@fixture(scope="session")
+def cts_stub_endpoint():
+    """Runs a local stub of a CTS API and returns its endpoint."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CtsStubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/api/cts"
+    server.shutdown()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# author: Matteo Romanello, matteo.romanello@gmail.com
+"""A minimal CTS API server, used to test harvesting without network access."""
+
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+STUB_WORK_URN = "urn:cts:greekLit:tlg0011.tlg003"
+STUB_EDITION_URN = f"{STUB_WORK_URN}.perseus-grc2"
+# two books of three lines each
+STUB_REFFS = {
+    1: ["1", "2"],
+    2: [f"{b}.{l}" for b in ["1", "2"] for l in ["1", "2", "3"]],
+}
+
+CTS_NS = 'xmlns="http://chs.harvard.edu/xmlns/cts" xmlns:ti="http://chs.harvard.edu/xmlns/cts"'
+
+CAPABILITIES = f"""<GetCapabilities {CTS_NS}><request><requestName>GetCapabilities</requestName></request><reply>
+<TextInventory tiid="stub">
+<textgroup urn="urn:cts:greekLit:tlg0011"><groupname xml:lang="eng">Sophocles</groupname>
+<work urn="{STUB_WORK_URN}" groupUrn="urn:cts:greekLit:tlg0011" xml:lang="grc"><title xml:lang="eng">Ajax</title>
+<edition urn="{STUB_EDITION_URN}" workUrn="{STUB_WORK_URN}"><label xml:lang="eng">Ajax</label>
+<online><citationMapping>
+<citation label="book" xpath="/tei:div[@n='?']" scope="/tei:TEI/tei:text/tei:body/tei:div">
+<citation label="line" xpath="/tei:l[@n='?']" scope="/tei:TEI/tei:text/tei:body/tei:div/tei:div[@n='?']"/>
+</citation></citationMapping></online>
+</edition></work></textgroup></TextInventory></reply></GetCapabilities>"""
+
+
+class CtsStubHandler(BaseHTTPRequestHandler):
+    # names of the CTS requests received so far (e.g. "GetPassagePlus")
+    received_requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        request = params.get("request")
+        CtsStubHandler.received_requests.append(request)
+        if request == "GetCapabilities":
+            body = CAPABILITIES
+        elif request == "GetValidReff":
+            urns = "".join(
+                f"<urn>{params['urn']}:{r}</urn>"
+                for r in STUB_REFFS[int(params["level"])]
+            )
+            body = f"<GetValidReff {CTS_NS}><request><requestName>GetValidReff</requestName></request><reply><reff>{urns}</reff></reply></GetValidReff>"
+        elif request == "GetPassagePlus":
+            work_urn, ref = params["urn"].rsplit(":", 1)
+            level = ref.count(".") + 1
+            reffs = STUB_REFFS[level]
+            i = reffs.index(ref)
+            prev = f"<urn>{work_urn}:{reffs[i-1]}</urn>" if i > 0 else ""
+            nxt = f"<urn>{work_urn}:{reffs[i+1]}</urn>" if i < len(reffs) - 1 else ""
+            body = (
+                f"<GetPassagePlus {CTS_NS}><request><requestName>GetPassagePlus</requestName></request><reply>"
+                f"<urn>{params['urn']}</urn><label><title xml:lang=\"eng\">Ajax</title></label>"
+                f'<passage><TEI xmlns="http://www.tei-c.org/ns/1.0"><text><body><div><l n="{ref}">x</l></div></body></text></TEI></passage>'
+                f"<prevnext><prev>{prev}</prev><next>{nxt}</next></prevnext></reply></GetPassagePlus>"
+            )
+        else:
+            self.send_response(400)
+            self.end_headers()
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
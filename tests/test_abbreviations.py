@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+# author: Matteo Romanello, matteo.romanello@gmail.com
+import logging
+import pytest
+from hucitlib.abbreviations import AbbreviationMatcher, edit_distance, normalize
+
+logger = logging.getLogger(__name__)
+
+AUTHOR_ABBREVIATIONS = {"urn:cts:greekLit:tlg0012$$n0": "Hom."}
+WORK_ABBREVIATIONS = {
+    "urn:cts:greekLit:tlg0012.tlg001$$n0": "Il.",
+    "urn:cts:greekLit:tlg0012.tlg001$$n1": "Hom. Il.",
+    "urn:cts:greekLit:tlg0012.tlg002$$n0": "Od.",
+    "urn:cts:greekLit:tlg0012.tlg002$$n1": "Odyss.",
+    "urn:cts:greekLit:tlg0012.tlg002$$n2": "Hom. Od.",
+}
+
+
+@pytest.fixture
+def matcher():
+    return AbbreviationMatcher.from_dictionaries(
+        AUTHOR_ABBREVIATIONS, WORK_ABBREVIATIONS, fingerprint="42"
+    )
+
+
+def test_normalize():
+    assert normalize("Hom. Il.") == normalize("hom.il") == "hom il"
+
+
+def test_edit_distance():
+    assert edit_distance("kitten", "sitting") == 3
+    assert edit_distance("odyss", "odsys") == 1
+    assert edit_distance("kitten", "sitting", max_distance=2) is None
+
+
+def test_abbreviation_matcher(matcher):
+    exact_match = matcher.match("Hom.Il.")[0]
+    assert exact_match.urn == "urn:cts:greekLit:tlg0012.tlg001"
+    assert exact_match.distance == 0 and not exact_match.prefix
+
+    prefix_match = matcher.match("Hom. Od. 2.3")[0]
+    assert prefix_match.urn == "urn:cts:greekLit:tlg0012.tlg002"
+    assert prefix_match.prefix
+
+    assert matcher.match("Odys.")[0].urn == "urn:cts:greekLit:tlg0012.tlg002"
+    assert matcher.match("Verg. Aen.") == []
+
+
+def test_abbreviation_matcher_save_load(matcher, tmp_path):
+    path = str(tmp_path / "abbreviations.json")
+    matcher.save(path)
+    loaded_matcher = AbbreviationMatcher.load(path)
+    assert loaded_matcher.fingerprint == "42"
+    assert loaded_matcher.match("Hom. Il.") == matcher.match("Hom. Il.")
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# author: Matteo Romanello, matteo.romanello@gmail.com
+import logging
+from types import SimpleNamespace
+from rdflib import URIRef
+from hucitlib.bulk import BulkWriter
+from hucitlib.index import UrnIndex
+
+logger = logging.getLogger(__name__)
+
+WORK_URI = "http://purl.org/hucit/kb/works/1"
+WORK_URN = "urn:cts:greekLit:tlg0012.tlg001"
+HUCIT = "http://purl.org/net/hucit#%s"
+
+
+class FakeKnowledgeBase(object):
+    """Resolves CTS URNs from a dictionary, like ``KnowledgeBase``."""
+
+    def __init__(self, uris, urn_index=None):
+        self.uris = uris
+        self.urn_index = urn_index
+
+    def get_resources_by_urns(self, urns):
+        return {
+            urn: (
+                SimpleNamespace(subject=URIRef(self.uris[urn]))
+                if urn in self.uris
+                else None
+            )
+            for urn in urns
+        }
+
+
+def test_add_relations_resolves_existing_elements():
+    """Relations point to the URIs of existing elements, instead of minted ones."""
+    book_uri = f"{WORK_URI}/legacy-book-1"
+    line_uri = f"{WORK_URI}/legacy-line-1"
+    kb = FakeKnowledgeBase(
+        {f"{WORK_URN}:1": book_uri},
+        urn_index=UrnIndex(max_size=10),
+    )
+    kb.urn_index.add(f"{WORK_URN}:1.1", line_uri)
+    work = SimpleNamespace(subject=URIRef(WORK_URI))
+    writer = BulkWriter(kb)
+
+    resources = writer.resolve_elements([f"{WORK_URN}:1", f"{WORK_URN}:1.2"])
+    assert resources[f"{WORK_URN}:1.2"] is None
+    writer.add_relations(
+        work,
+        f"{WORK_URN}:1.2",
+        parent_urn=f"{WORK_URN}:1",
+        previous_urn=f"{WORK_URN}:1.1",
+    )
+
+    element_uri = URIRef(f"{WORK_URI}/1.2")
+    assert set(writer._graph) == {
+        (element_uri, URIRef(HUCIT % "is_part_of"), URIRef(book_uri)),
+        (URIRef(book_uri), URIRef(HUCIT % "has_part"), element_uri),
+        (element_uri, URIRef(HUCIT % "follows"), URIRef(line_uri)),
+    }
@@ -42,3 +42,14 @@ def test_find_work_by_urn():
         ["hucit", f"--config-file={DEFAULT_CONFIG_FILE}", "find", iliad_urn]
     )
     assert "Iliad" in str(cli_output)
+
+
+@pytest.mark.run(order=18)
+def test_export(tmp_path):
+    """Export the KB as JSON Lines."""
+    output_file = str(tmp_path / "hucit.jsonl")
+    subprocess.check_output(
+        ["hucit", f"--config-file={DEFAULT_CONFIG_FILE}", "export", output_file]
+    )
+    with open(output_file, "r", encoding="utf-8") as ifile:
+        assert any('"urn:cts:greekLit:tlg0012"' in line for line in ifile)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# author: Matteo Romanello, matteo.romanello@gmail.com
+import logging
+import pytest
+from rdflib import ConjunctiveGraph, Literal, URIRef, plugin
+from rdflib.namespace import RDFS
+from rdflib.store import Store
+from hucitlib.compiled import (
+    ReadOnlyStore,
+    compile_store,
+    get_compiled_store_path,
+    open_compiled_store,
+)
+
+logger = logging.getLogger(__name__)
+
+SOURCE = """
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+<http://purl.org/hucit/kb/authors/1> rdfs:label "Homerus"@la .
+<http://purl.org/hucit/kb/works/1> rdfs:label "Ilias"@la .
+"""
+
+HOMER = URIRef("http://purl.org/hucit/kb/authors/1")
+
+
+@pytest.fixture
+def source(tmp_path):
+    source_path = tmp_path / "kb.ttl"
+    source_path.write_text(SOURCE, encoding="utf-8")
+    return str(source_path)
+
+
+def test_compiled_store_path(tmp_path, source):
+    compiled_store_dir = str(tmp_path / "compiled")
+    path = get_compiled_store_path(compiled_store_dir, [source], "turtle")
+    assert path.startswith(compiled_store_dir)
+    assert path == get_compiled_store_path(compiled_store_dir, [source], "turtle")
+    with open(source, "a", encoding="utf-8") as f:
+        f.write('<http://purl.org/hucit/kb/works/2> rdfs:label "Odyssea"@la .\n')
+    assert path != get_compiled_store_path(compiled_store_dir, [source], "turtle")
+
+
+def test_compiled_store(tmp_path, source):
+    pytest.importorskip("berkeleydb")
+    path = get_compiled_store_path(str(tmp_path / "compiled"), [source], "turtle")
+
+    # the store is compiled the first time it is opened
+    store = open_compiled_store(path, [source], "turtle")
+    graph = ConjunctiveGraph(store=store)
+    assert len(graph) == 2
+    assert graph.value(HOMER, RDFS.label) == Literal("Homerus", lang="la")
+    with pytest.raises(IOError):
+        graph.add((HOMER, RDFS.label, Literal("Homer", lang="en")))
+    store.close()
+
+    # later on, it is simply opened
+    store = open_compiled_store(path)
+    assert len(ConjunctiveGraph(store=store)) == 2
+    store.close()
+
+    compile_store(path, [source], "turtle")
+    store = open_compiled_store(path)
+    assert len(ConjunctiveGraph(store=store)) == 2
+    store.close()
+
+
+def test_read_only_store(source):
+    store = plugin.get("Memory", Store)()
+    ConjunctiveGraph(store=store).parse(source, format="turtle")
+    graph = ConjunctiveGraph(store=ReadOnlyStore(store))
+    graph.bind("hucit", "http://purl.org/net/hucit#")
+    results = graph.query("SELECT ?label WHERE { ?s rdfs:label ?label }")
+    assert len(results) == 2
+    with pytest.raises(IOError):
+        graph.add((HOMER, RDFS.label, Literal("Homer", lang="en")))
+    with pytest.raises(IOError):
+        graph.remove((HOMER, None, None))
+    with pytest.raises(IOError):
+        graph.update("DELETE WHERE { ?s ?p ?o }")
+    assert len(store) == 2
+    assert ("hucit", URIRef("http://purl.org/net/hucit#")) in graph.namespaces()
+    assert store.namespace("hucit") is None
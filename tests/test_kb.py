@@ -1,8 +1,18 @@
 # -*- coding: utf-8 -*-
 # author: Matteo Romanello, matteo.romanello@gmail.com
+import json
 import logging
 import pytest
 import pickle
+import surf
+import pkg_resources
+from rdflib import Literal
+from rdflib.namespace import RDFS
+from conftest import DEFAULT_CONFIG_FILE
+from hucitlib import KnowledgeBase
+from hucitlib.catalog import Catalog
+from hucitlib.compiled import ReadOnlyStore
+from hucitlib.exceptions import ResourceNotFound
 from knowledge_base.surfext import HucitAuthor, HucitWork
 
 logger = logging.getLogger(__name__)
@@ -27,6 +37,75 @@ def test_pickle_kb_inmemory(kb_inmemory):
     assert len(unpickled_kb.get_authors()) == pre_pickling_author_number
 
 
+def test_pickle_kb_inmemory_shared(tmp_path):
+    source_path = tmp_path / "kb.ttl"
+    source_path.write_text(
+        "@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .\n"
+        '<http://purl.org/hucit/kb/authors/1> rdfs:label "Homerus"@la .\n',
+        encoding="utf-8",
+    )
+    configuration_file = tmp_path / "inmemory.ini"
+    configuration_file.write_text(
+        "[surf]\nreader=rdflib\nwriter=rdflib\nrdflib_store=IOMemory\n"
+        "default_graph=http://purl.org/hucit/kb\n"
+        f"knowledge_base_sources={source_path}\nsources_format=turtle\n",
+        encoding="utf-8",
+    )
+    kb = KnowledgeBase(str(configuration_file), share_store=True)
+    store = kb._store.writer._graph.store
+    assert kb._store.size() == 1
+
+    # KBs with the same sources share the triples parsed by the first one
+    other_kb = KnowledgeBase(str(configuration_file), share_store=True)
+    assert other_kb._store.writer._graph.store is store
+    not_shared_kb = KnowledgeBase(str(configuration_file))
+    assert not_shared_kb._store.writer._graph.store is not store
+
+    # so does the unpickled copy (in this process, or in a forked one)
+    unpickled_kb = pickle.loads(pickle.dumps(kb))
+    assert unpickled_kb._store.writer._graph.store is store
+    assert unpickled_kb._store.size() == 1
+
+
+def test_pickle_kb_inmemory_compiled(tmp_path):
+    pytest.importorskip("berkeleydb")
+    compiled_store_dir = tmp_path / "compiled"
+    # the shipped configuration, with the compiled store in a temporary directory
+    with open(
+        pkg_resources.resource_filename("hucitlib", "config/inmemory_compiled.ini")
+    ) as ifile:
+        configuration = ifile.read().replace(
+            "compiled_store_dir=~/.cache/hucitlib",
+            f"compiled_store_dir={compiled_store_dir}",
+        )
+    configuration_file = tmp_path / "inmemory_compiled.ini"
+    configuration_file.write_text(configuration, encoding="utf-8")
+
+    kb = KnowledgeBase(str(configuration_file))
+    assert len(kb.get_authors()) == 2
+    assert len(list(compiled_store_dir.iterdir())) == 1
+
+    # unpickling re-opens the compiled store instead of parsing the sources
+    unpickled_kb = pickle.loads(pickle.dumps(kb))
+    assert isinstance(unpickled_kb._store.writer._graph.store, ReadOnlyStore)
+    assert len(list(compiled_store_dir.iterdir())) == 1
+    homer = unpickled_kb.get_resource_by_urn("urn:cts:greekLit:tlg0012")
+    assert len(homer.get_works()) == 2
+    with pytest.raises(IOError):
+        unpickled_kb.insert_triples([(homer.subject, RDFS.label, Literal("Homer"))])
+
+
+def test_kb_inmemory_missing_source(tmp_path):
+    configuration_file = tmp_path / "inmemory.ini"
+    configuration_file.write_text(
+        "[surf]\nreader=rdflib\nwriter=rdflib\nrdflib_store=IOMemory\n"
+        f"knowledge_base_sources={tmp_path / 'missing.ttl'}\nsources_format=turtle\n",
+        encoding="utf-8",
+    )
+    with pytest.raises(IOError):
+        KnowledgeBase(str(configuration_file))
+
+
 @pytest.mark.skip
 # @pytest.mark.run(order=3)
 def test_kb_inmemory(kb_inmemory):
@@ -75,12 +154,187 @@ def test_kb_work_abbreviations(kb_virtuoso):
     logger.info("%i abbreviations of work titles found in the KB" % len(abbreviations))
 
 
+@pytest.mark.run(order=6)
+def test_kb_bulk_dictionaries(kb_virtuoso, kb_virtuoso_bulk):
+    """The bulk-fetched dictionaries cover the same URNs as the legacy ones."""
+
+    def urns(dictionary):
+        return {key.split("$$")[0] for key in dictionary}
+
+    assert urns(kb_virtuoso_bulk.author_names) == urns(kb_virtuoso.author_names)
+    assert urns(kb_virtuoso_bulk.work_titles) == urns(kb_virtuoso.work_titles)
+    assert len(kb_virtuoso_bulk.author_abbreviations) == len(
+        kb_virtuoso.author_abbreviations
+    )
+    assert len(kb_virtuoso_bulk.work_abbreviations) > 0
+
+
+@pytest.mark.run(order=6)
+def test_kb_snapshot(tmp_path):
+    """Lookup tables are persisted and reloaded from the snapshot."""
+    kb = KnowledgeBase(DEFAULT_CONFIG_FILE, bulk_fetch=True, cache_dir=str(tmp_path))
+    author_names = kb.author_names
+    assert len(list(tmp_path.iterdir())) == 1
+
+    reloaded_kb = KnowledgeBase(DEFAULT_CONFIG_FILE, cache_dir=str(tmp_path))
+    assert reloaded_kb._author_names == author_names
+    assert reloaded_kb.get_resource_by_urn("urn:cts:greekLit:tlg0012") is not None
+
+    reloaded_kb.invalidate_snapshot()
+    assert len(list(tmp_path.iterdir())) == 0
+
+
+@pytest.mark.run(order=6)
+def test_kb_snapshot_set_urn(tmp_path):
+    """Changing a CTS URN drops the snapshot, which would be stale otherwise."""
+    kb = KnowledgeBase(DEFAULT_CONFIG_FILE, bulk_fetch=True, cache_dir=str(tmp_path))
+    kb.author_names
+    work = kb.get_resource_by_urn("urn:cts:greekLit:tlg0012.tlg001")
+    try:
+        work.set_urn("urn:cts:greekLit:tlg0012.tlg999")
+        # the fingerprint is unchanged, but another KB does not load the tables
+        other_kb = KnowledgeBase(DEFAULT_CONFIG_FILE, cache_dir=str(tmp_path))
+        assert other_kb.get_resource_by_urn("urn:cts:greekLit:tlg0012.tlg999") == work
+        with pytest.raises(ResourceNotFound):
+            other_kb.get_resource_by_urn("urn:cts:greekLit:tlg0012.tlg001")
+        assert kb._author_names is None
+    finally:
+        work.set_urn("urn:cts:greekLit:tlg0012.tlg001")
+
+
+@pytest.mark.run(order=6)
+def test_kb_urn_index():
+    """Lookups by CTS URN are answered by the in-process index."""
+    kb = KnowledgeBase(DEFAULT_CONFIG_FILE)
+    index = kb.enable_urn_index()
+    assert "urn:cts:greekLit:tlg0012" in index
+    homer = kb.get_resource_by_urn("urn:cts:greekLit:tlg0012")
+    assert isinstance(homer, HucitAuthor)
+    with pytest.raises(ResourceNotFound):
+        kb.get_resource_by_urn("urn:cts:greekLit:tlg9999")
+
+    lru_index = kb.enable_urn_index(max_size=1)
+    kb.get_resource_by_urn("urn:cts:greekLit:tlg0012")
+    kb.get_resource_by_urn("urn:cts:greekLit:tlg0012.tlg001")
+    assert len(lru_index) == 1 and "urn:cts:greekLit:tlg0012.tlg001" in lru_index
+
+
+@pytest.mark.run(order=6)
+def test_kb_get_resources_by_urns(kb_virtuoso):
+    urns = [
+        "urn:cts:greekLit:tlg0012",
+        "urn:cts:greekLit:tlg0012.tlg001",
+        "urn:cts:greekLit:tlg9999",
+    ]
+    resources = kb_virtuoso.get_resources_by_urns(urns, chunk_size=2)
+    assert list(resources.keys()) == urns
+    assert isinstance(resources["urn:cts:greekLit:tlg0012"], HucitAuthor)
+    assert isinstance(resources["urn:cts:greekLit:tlg0012.tlg001"], HucitWork)
+    assert resources["urn:cts:greekLit:tlg9999"] is None
+
+
+def test_kb_search_resources(kb_virtuoso):
+    results = kb_virtuoso.search_resources("Omero", local=False)
+    assert len(results) > 0
+    for label, resource, resource_type in results:
+        assert resource_type in [
+            surf.ns.EFRBROO["F10_Person"],
+            surf.ns.EFRBROO["F1_Work"],
+        ]
+    assert "urn:cts:greekLit:tlg0012" in [
+        resource.get_urn() for label, resource, resource_type in results
+    ]
+
+
+def test_kb_search_local(kb_virtuoso, tmp_path):
+    kb_virtuoso.get_label_index(str(tmp_path / "labels.json"), refresh=True)
+    results = kb_virtuoso.search("Omero", local=True)
+    assert "urn:cts:greekLit:tlg0012" in [
+        resource.get_urn() for label, resource in results
+    ]
+
+
+def test_kb_get_abbreviation_matcher(kb_virtuoso_bulk):
+    matcher = kb_virtuoso_bulk.get_abbreviation_matcher()
+    assert matcher.match("Hom. Il.")[0].urn == "urn:cts:greekLit:tlg0012.tlg001"
+
+
+def test_kb_get_name_recognizer(kb_virtuoso_bulk):
+    recognizer = kb_virtuoso_bulk.get_name_recognizer()
+    urns = [match.urn for match in recognizer.find("Homer, Iliad 1.1")]
+    assert urns == ["urn:cts:greekLit:tlg0012", "urn:cts:greekLit:tlg0012.tlg001"]
+
+
+def test_kb_export_json(kb_virtuoso, tmp_path):
+    jsonl_path = str(tmp_path / "hucit.jsonl")
+    count = kb_virtuoso.export_json(jsonl_path)
+    with open(jsonl_path, "r", encoding="utf-8") as ifile:
+        records = [json.loads(line) for line in ifile]
+    assert count == len(records) == len(kb_virtuoso.get_authors())
+    homer = next(
+        record for record in records if record["urn"] == "urn:cts:greekLit:tlg0012"
+    )
+    assert {"language": "en", "label": "Homer"} in homer["names"]
+    assert "urn:cts:greekLit:tlg0012.tlg001" in [work["urn"] for work in homer["works"]]
+
+    json_path = str(tmp_path / "hucit.json")
+    kb_virtuoso.export_json(json_path, lines=False)
+    with open(json_path, "r", encoding="utf-8") as ifile:
+        export = json.load(ifile)
+    assert export["authors"] == records
+    assert export["statistics"]["number_authors"] == count
+
+
+def test_kb_get_author_work_map(kb_virtuoso):
+    homer = kb_virtuoso.get_resource_by_urn("urn:cts:greekLit:tlg0012")
+    works = sorted(str(work.subject) for work in homer.get_works())
+
+    work_map = kb_virtuoso.get_author_work_map(refresh=True)
+    homer_works = work_map[str(homer.subject)]
+    assert [work for work, urn in homer_works] == works
+    assert "urn:cts:greekLit:tlg0012.tlg001" in [urn for work, urn in homer_works]
+
+    # building the map (e.g. for the legacy dictionaries) doesn't enable it
+    kb_virtuoso.work_titles
+    assert homer.session.author_work_map is None
+
+    # once enabled, the map is used by `HucitAuthor.get_works`
+    kb_virtuoso.enable_author_work_map()
+    assert homer.session.author_work_map is work_map
+    homer = kb_virtuoso.get_resource_by_urn("urn:cts:greekLit:tlg0012")
+    assert [str(work.subject) for work in homer.get_works()] == works
+
+    kb_virtuoso.invalidate_snapshot()
+    assert homer.session.author_work_map is None
+    assert kb_virtuoso._author_work_map is None
+
+
+def test_kb_get_catalog(kb_virtuoso, tmp_path):
+    catalog_path = str(tmp_path / "catalog.bin")
+    catalog = kb_virtuoso.get_catalog(catalog_path, refresh=True)
+    assert catalog.count_authors() == len(kb_virtuoso.get_authors())
+
+    homer = catalog.get_author("urn:cts:greekLit:tlg0012")
+    assert homer.uri == kb_virtuoso.get_resource_by_urn(homer.urn).subject
+    assert "urn:cts:greekLit:tlg0012.tlg001" in [
+        work.urn for work in catalog.get_works(author_urn=homer.urn)
+    ]
+
+    loaded_catalog = Catalog.load(catalog_path)
+    assert loaded_catalog.get_authors() == catalog.get_authors()
+    assert loaded_catalog.get_works() == catalog.get_works()
+
+
 @pytest.mark.run(order=7)
 # @pytest.mark.skip
 def test_kb_get_statistics(kb_virtuoso):
+    fingerprint = kb_virtuoso.get_fingerprint()
     stats = kb_virtuoso.get_statistics()
     logger.info(stats)
     assert stats is not None and 0 not in stats.values()
+    assert stats["number_opus_maximum"] <= stats["number_authors"]
+    # computing the statistics does not modify the KB
+    assert kb_virtuoso.get_fingerprint() == fingerprint
 
 
 def test_next_ids(kb_virtuoso):
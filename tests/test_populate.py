@@ -1,11 +1,20 @@
 # -*- coding: utf-8 -*-
 # author: Matteo Romanello, matteo.romanello@gmail.com
+import os
+import time
 import logging
+import multiprocessing
 import pytest
 import pkg_resources
+from concurrent.futures import ProcessPoolExecutor
 from conftest import OUTPUT_DIR
-from hucitlib.populate import populate_text_structure
+from cts_stub import STUB_WORK_URN, STUB_REFFS, CtsStubHandler
+from hucitlib.populate import populate_text_structure, fetch_text_structure
+from hucitlib.populate import TextStructureCheckpoint, iter_text_elements
+from hucitlib.populate import write_text_structure_JSONL, load_text_structure_JSONL
+from hucitlib.populate import populate_works, get_rate_limiter, split_rate
 from hucitlib.populate import download_text_structure, load_text_structure_JSON
+import hucitlib.populate
 
 
 logger = logging.getLogger(__name__)
@@ -23,8 +32,208 @@ def test_download_text_structure():
 
     assert retrieved_element_n == max_n_text_elements
 
+def test_fetch_text_structure_concurrent(cts_stub_endpoint):
+    sequential = fetch_text_structure(
+        STUB_WORK_URN, endpoint=cts_stub_endpoint, fetch_nodes=True
+    )
+    concurrent = fetch_text_structure(
+        STUB_WORK_URN,
+        endpoint=cts_stub_endpoint,
+        max_workers=4,
+        max_requests_per_second=200,
+        fetch_nodes=True,
+    )
+    assert concurrent == sequential
+
+    lines = concurrent["valid_reffs"][2]
+    assert [line["current"].split(":")[-1] for line in lines] == STUB_REFFS[2]
+    assert lines[1]["previous"] == lines[0]["current"]
+    assert lines[1]["parent"] == f"{STUB_WORK_URN}:1"
+
+
+def test_fetch_text_structure_from_reffs(cts_stub_endpoint):
+    """Relations derived from the ordered reffs match those fetched node by node."""
+    per_node = fetch_text_structure(
+        STUB_WORK_URN, endpoint=cts_stub_endpoint, fetch_nodes=True
+    )
+    CtsStubHandler.received_requests.clear()
+    from_reffs = fetch_text_structure(STUB_WORK_URN, endpoint=cts_stub_endpoint)
+    assert from_reffs == per_node
+    assert "GetPassagePlus" not in CtsStubHandler.received_requests
+
+    sample = fetch_text_structure(STUB_WORK_URN, endpoint=cts_stub_endpoint, stop_at=3)
+    assert len(sample["valid_reffs"][1]) + len(sample["valid_reffs"][2]) == 3
+
+
+def test_fetch_text_structure_resume(cts_stub_endpoint, tmp_path):
+    """A download interrupted midway is resumed from its checkpoint."""
+    full = fetch_text_structure(
+        STUB_WORK_URN, endpoint=cts_stub_endpoint, fetch_nodes=True
+    )
+
+    # simulate an interrupted harvest: level 1 done, level 2 partially
+    checkpoint = TextStructureCheckpoint(str(tmp_path / "checkpoint"))
+    checkpoint.save(1, full["valid_reffs"][1])
+    for element in full["valid_reffs"][2][:2]:
+        checkpoint.append(2, element)
+    with open(os.path.join(checkpoint.path, "level-2.jsonl"), "a") as ofile:
+        ofile.write('{"current": "urn:cts:gr')
+
+    CtsStubHandler.received_requests.clear()
+    resumed = fetch_text_structure(
+        STUB_WORK_URN,
+        endpoint=cts_stub_endpoint,
+        fetch_nodes=True,
+        checkpoint=checkpoint,
+    )
+    assert resumed == full
+    expected_requests = len(full["valid_reffs"][2]) - 2
+    assert CtsStubHandler.received_requests.count("GetPassagePlus") == expected_requests
+    assert checkpoint.is_complete(2)
+
+
+def test_download_text_structure_no_edition(monkeypatch, tmp_path):
+    """Works without a Greek or Latin edition are reported, and nothing is written."""
+    work_urn = "urn:cts:latinLit:phi9999.phi001"
+    monkeypatch.setattr(
+        hucitlib.populate, "fetch_text_structure", lambda *args, **kwargs: None
+    )
+    with pytest.raises(ValueError):
+        download_text_structure(work_urn, basedir=str(tmp_path), jsonl=True)
+    assert [path.name for path in tmp_path.iterdir()] == [
+        "urn-cts-latinLit-phi9999.phi001.checkpoint"
+    ]
+
+
+def test_text_structure_JSONL(cts_stub_endpoint, tmp_path):
+    """Text elements streamed from JSON Lines are the same as those fetched."""
+    ts = fetch_text_structure(STUB_WORK_URN, endpoint=cts_stub_endpoint)
+    path = str(tmp_path / "{}.jsonl".format(STUB_WORK_URN.replace(":", "-")))
+    write_text_structure_JSONL(ts, path)
+
+    streamed_ts = load_text_structure_JSONL(STUB_WORK_URN, str(tmp_path))
+    assert streamed_ts["urn"] == ts["urn"]
+    assert streamed_ts["levels"] == [list(level) for level in ts["levels"]]
+
+    streamed_elements = list(iter_text_elements(streamed_ts))
+    assert [level_n for level_n, element in streamed_elements] == [
+        level_n for level_n, element in iter_text_elements(ts)
+    ]
+    assert [element["current"] for level_n, element in streamed_elements] == [
+        element["current"] for level_n, element in iter_text_elements(ts)
+    ]
+    # the file can be iterated over more than once
+    assert len(list(streamed_ts)) == len(streamed_elements)
+
+
 def test_populate_text_structure(kb_virtuoso):
     work_urn = "urn:cts:greekLit:tlg0011.tlg003"
     work_obj = kb_virtuoso.get_resource_by_urn(work_urn)
     text_structure_json = load_text_structure_JSON(work_urn, OUTPUT_DIR)
     populate_text_structure(kb_virtuoso, work_obj, text_structure_json)
+
+
+def test_populate_text_structure_bulk(kb_virtuoso):
+    work_urn = "urn:cts:greekLit:tlg0011.tlg003"
+    work_obj = kb_virtuoso.get_resource_by_urn(work_urn)
+    text_structure_json = load_text_structure_JSON(work_urn, OUTPUT_DIR)
+    populate_text_structure(kb_virtuoso, work_obj, text_structure_json, batch_size=100)
+
+    first_element = text_structure_json["valid_reffs"]["1"][0]["current"]
+    element_obj = kb_virtuoso.get_resource_by_urn(first_element)
+    assert element_obj is not None
+    assert element_obj.is_first()
+
+
+def test_load_structure(kb_virtuoso):
+    work_urn = "urn:cts:greekLit:tlg0011.tlg003"
+    work_obj = kb_virtuoso.get_resource_by_urn(work_urn)
+    text_structure_json = load_text_structure_JSON(work_urn, OUTPUT_DIR)
+    tree = work_obj.load_structure(refresh=True)
+    assert tree is work_obj.load_structure()
+
+    for level_n, level_label in text_structure_json["levels"]:
+        urns = [
+            element["current"]
+            for element in text_structure_json["valid_reffs"][str(level_n)]
+        ]
+        assert [element.urn for element in tree.iter_level(level_n)] == urns
+
+    first_urn = text_structure_json["valid_reffs"]["1"][0]["current"]
+    first_element = tree.get_element(first_urn)
+    element_obj = kb_virtuoso.get_resource_by_urn(first_element.urn)
+    assert first_element.is_first() and element_obj.is_first()
+    assert first_element.next.uri == str(element_obj.next.subject)
+
+
+def test_populate_text_structure_streamed(kb_virtuoso, tmp_path):
+    work_urn = "urn:cts:greekLit:tlg0011.tlg003"
+    work_obj = kb_virtuoso.get_resource_by_urn(work_urn)
+    text_structure_json = load_text_structure_JSON(work_urn, OUTPUT_DIR)
+    path = str(tmp_path / "{}.jsonl".format(work_urn.replace(":", "-")))
+    write_text_structure_JSONL(text_structure_json, path)
+
+    text_structure = load_text_structure_JSONL(work_urn, str(tmp_path))
+    populate_text_structure(kb_virtuoso, work_obj, text_structure, batch_size=100)
+
+
+def test_populate_works():
+    configuration_file = pkg_resources.resource_filename(
+        "hucitlib", "config/virtuoso_pc6.ini"
+    )
+    work_urns = ["urn:cts:greekLit:tlg0011.tlg003", "urn:cts:greekLit:tlg9999.tlg999"]
+    results = populate_works(
+        work_urns, configuration_file, processes=2, basedir=OUTPUT_DIR, batch_size=100
+    )
+    assert [result.work_urn for result in results] == work_urns
+    assert results[0].error is None
+    # a failing work does not stop the others
+    assert results[1].error is not None
+
+
+def test_populate_works_broken_pool(tmp_path):
+    """Works are reported as failed when their worker process dies."""
+    work_urns = ["urn:cts:greekLit:tlg0011.tlg003", "urn:cts:greekLit:tlg0012.tlg001"]
+    # the workers cannot be initialised, which breaks the pool
+    results = populate_works(
+        work_urns, str(tmp_path / "missing.ini"), processes=1, basedir=OUTPUT_DIR
+    )
+    assert [result.work_urn for result in results] == work_urns
+    assert all(result.error.startswith("BrokenProcessPool") for result in results)
+    assert sum(result.elements for result in results) == 0
+
+
+def test_get_rate_limiter():
+    limiter = get_rate_limiter("http://cts.example.org/api/cts", 5)
+    assert get_rate_limiter("http://cts.example.org/other", 5) is limiter
+    # a different rate is not silently replaced by the first caller's one
+    other_limiter = get_rate_limiter("http://cts.example.org/api/cts", 20)
+    assert other_limiter is not limiter
+    assert (limiter.interval, other_limiter.interval) == (0.2, 0.05)
+
+
+def _send_requests(max_requests_per_second, n_requests):
+    """Waits for `n_requests` requests, and returns the time each was sent."""
+    limiter = get_rate_limiter("http://cts.example.org/api/cts", max_requests_per_second)
+    timestamps = []
+    for _ in range(n_requests):
+        limiter.wait()
+        timestamps.append(time.time())
+    return timestamps
+
+
+def test_split_rate_across_processes():
+    """Processes with their own rate limiter respect the overall rate."""
+    max_requests_per_second, processes, n_requests = 20, 4, 6
+    assert split_rate(None, processes) is None
+    rate = split_rate(max_requests_per_second, processes)
+    with ProcessPoolExecutor(
+        max_workers=processes, mp_context=multiprocessing.get_context("fork")
+    ) as executor:
+        futures = [
+            executor.submit(_send_requests, rate, n_requests) for _ in range(processes)
+        ]
+        timestamps = sorted(t for future in futures for t in future.result())
+    # the first request of each process is sent right away
+    n_spaced = len(timestamps) - processes
+    assert n_spaced / (timestamps[-1] - timestamps[0]) <= max_requests_per_second * 1.1
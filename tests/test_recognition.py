@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# author: Matteo Romanello, matteo.romanello@gmail.com
+import logging
+import pytest
+from hucitlib.recognition import NameRecognizer
+
+logger = logging.getLogger(__name__)
+
+AUTHOR_NAMES = {
+    "urn:cts:greekLit:tlg0012$$n0": "Homer",
+    "urn:cts:greekLit:tlg0012$$n1": "Homère",
+}
+AUTHOR_ABBREVIATIONS = {"urn:cts:greekLit:tlg0012$$n0": "Hom."}
+WORK_TITLES = {"urn:cts:greekLit:tlg0012.tlg001$$n0": "Iliad"}
+WORK_ABBREVIATIONS = {
+    "urn:cts:greekLit:tlg0012.tlg001$$n0": "Il.",
+    "urn:cts:greekLit:tlg0012.tlg001$$n1": "Hom. Il.",
+}
+
+
+@pytest.fixture
+def recognizer():
+    return NameRecognizer.from_dictionaries(
+        authors=[AUTHOR_NAMES, AUTHOR_ABBREVIATIONS],
+        works=[WORK_TITLES, WORK_ABBREVIATIONS],
+        fingerprint="42",
+    )
+
+
+def test_name_recognizer_find(recognizer):
+    text = "As HOMERE says (Hom.  Il. 1.1), but not in the Homeric hymns."
+    matches = list(recognizer.find(text))
+    assert [(text[slice(*match.span)], match.urn) for match in matches] == [
+        ("HOMERE", "urn:cts:greekLit:tlg0012"),
+        ("Hom.  Il", "urn:cts:greekLit:tlg0012.tlg001"),
+    ]
+    assert matches[0].type == "author"
+
+    overlapping_matches = list(recognizer.find(text, overlapping=True))
+    assert [match.label for match in overlapping_matches] == [
+        "Homère",
+        "Hom. Il.",
+        "Hom.",
+        "Il.",
+    ]
+
+
+def test_name_recognizer_find_one_match_per_urn():
+    """Labels of a URN that normalize to the same pattern give a single match."""
+    recognizer = NameRecognizer.from_dictionaries(
+        authors=[AUTHOR_NAMES, {"urn:cts:greekLit:tlg0012$$n0": "HOMER"}],
+        works=[{"urn:cts:greekLit:tlg9999.tlg001$$n0": "Homer"}],
+    )
+    matches = list(recognizer.find("Homer"))
+    assert sorted(match.urn for match in matches) == [
+        "urn:cts:greekLit:tlg0012",
+        "urn:cts:greekLit:tlg9999.tlg001",
+    ]
+
+
+def test_name_recognizer_find_in_lines(recognizer):
+    lines = ["The Iliad\n", "\n", "is by Homer.\n"]
+    matches = list(recognizer.find_in_lines(lines))
+    assert [(line_number, match.label) for line_number, match in matches] == [
+        (1, "Iliad"),
+        (3, "Homer"),
+    ]
+
+
+def test_name_recognizer_save_load(recognizer, tmp_path):
+    path = str(tmp_path / "recognizer.json")
+    recognizer.save(path)
+    loaded_recognizer = NameRecognizer.load(path)
+    assert loaded_recognizer.fingerprint == "42"
+    text = "Homer, Iliad 1.1"
+    assert list(loaded_recognizer.find(text)) == list(recognizer.find(text))
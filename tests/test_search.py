@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# author: Matteo Romanello, matteo.romanello@gmail.com
+import logging
+import pytest
+from hucitlib.search import LabelIndex, AUTHOR, WORK, fold
+
+logger = logging.getLogger(__name__)
+
+LABELS = [
+    ("Homer", "http://purl.org/hucit/kb/authors/927", AUTHOR),
+    ("Ὅμηρος", "http://purl.org/hucit/kb/authors/927", AUTHOR),
+    ("Hom.", "http://purl.org/hucit/kb/authors/927", AUTHOR),
+    ("Odissea", "http://purl.org/hucit/kb/works/2", WORK),
+    ("Homeric Hymns", "http://purl.org/hucit/kb/works/3", WORK),
+]
+
+
+@pytest.fixture
+def label_index():
+    return LabelIndex(LABELS, fingerprint="42")
+
+
+def test_fold():
+    assert fold("Homère") == "homere"
+    assert fold("Ὅμηρος") == fold("ομηρος")
+
+
+def test_label_index_search(label_index):
+    assert [match.label for match in label_index.search("homer")] == ["Homer"]
+    assert [match.label for match in label_index.search("ομηρος")] == ["Ὅμηρος"]
+    assert [match.label for match in label_index.search("Hom*")] == [
+        "Homer",
+        "Hom.",
+        "Homeric Hymns",
+    ]
+    assert [match.type for match in label_index.search("homeric hymn*")] == [WORK]
+    assert label_index.search("Iliad") == []
+    assert label_index.search("") == []
+
+
+def test_label_index_save_load(label_index, tmp_path):
+    path = str(tmp_path / "labels.json")
+    label_index.save(path)
+    loaded_index = LabelIndex.load(path)
+    assert loaded_index.fingerprint == "42"
+    assert loaded_index.search("odis*") == label_index.search("odis*")
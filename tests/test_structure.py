@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# author: Matteo Romanello, matteo.romanello@gmail.com
+import json
+import logging
+import random
+import pytest
+from types import SimpleNamespace
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import RDF, RDFS
+from hucitlib.structure import TextStructureTree
+from hucitlib.surfext import BASE_URI_TYPES, fetch_text_structure_tree
+
+logger = logging.getLogger(__name__)
+
+WORK_URI = "http://purl.org/hucit/kb/works/1"
+WORK_URN = "urn:cts:greekLit:tlg0012.tlg001"
+REFS = ["1", "2", "1.1", "1.2", "1.3", "2.1", "2.2"]
+
+
+def make_records(chained_levels=True):
+    """Returns the records of a work with two books (of three and two lines)."""
+    records = []
+    for level in [1, 2]:
+        refs = [ref for ref in REFS if ref.count(".") == level - 1]
+        for i, ref in enumerate(refs):
+            following = refs[i + 1] if i + 1 < len(refs) else None
+            parent = ref.split(".")[0] if level > 1 else None
+            if not chained_levels and following is not None and level > 1:
+                following = following if following.split(".")[0] == parent else None
+            records.append(
+                (
+                    f"{WORK_URI}/{ref}",
+                    f"{WORK_URN}:{ref}",
+                    "book" if level == 1 else "line",
+                    None if parent is None else f"{WORK_URI}/{parent}",
+                    None if following is None else f"{WORK_URI}/{following}",
+                )
+            )
+    random.Random(42).shuffle(records)
+    return records
+
+
+@pytest.fixture
+def tree():
+    return TextStructureTree.from_records(make_records())
+
+
+def test_structure_tree_levels(tree):
+    assert len(tree) == len(REFS)
+    assert tree.count_levels() == 2
+    assert [element.urn for element in tree] == [f"{WORK_URN}:{ref}" for ref in REFS]
+    assert [element.get_type() for element in tree.iter_level(1)] == ["book", "book"]
+    assert [element.urn for element in tree.iter_level(2)][-1] == f"{WORK_URN}:2.2"
+    assert list(tree.iter_level(3)) == []
+
+
+def test_structure_tree_navigation(tree):
+    line = tree.get_element(f"{WORK_URN}:1.3")
+    assert line.level == 2
+    assert line.previous.urn == f"{WORK_URN}:1.2"
+    assert line.next.urn == f"{WORK_URN}:2.1"
+    assert line.parent == tree.get_element(f"{WORK_URN}:1")
+    assert line in line.parent.children
+    assert [child.urn for child in tree.get_top_elements()[1].children] == [
+        f"{WORK_URN}:2.1",
+        f"{WORK_URN}:2.2",
+    ]
+    assert tree.get_element(f"{WORK_URN}:1.1").is_first()
+    assert tree.get_element(f"{WORK_URN}:2.2").is_last()
+    assert tree.get_element_by_uri(f"{WORK_URI}/2").parent is None
+    assert tree.get_element(f"{WORK_URN}:3.1") is None
+
+
+def test_structure_tree_chains_by_parent():
+    """Levels are in document order also when each parent has its own chain."""
+    tree = TextStructureTree.from_records(make_records(chained_levels=False))
+    assert [element.urn for element in tree] == [f"{WORK_URN}:{ref}" for ref in REFS]
+    assert tree.get_element(f"{WORK_URN}:1.3").next is None
+
+
+class GraphStore(object):
+    """Executes SPARQL queries on an ``rdflib`` graph, like ``surf.Store``."""
+
+    def __init__(self, graph: Graph) -> None:
+        self.graph = graph
+        self.queries = 0
+
+    def execute_sparql(self, query: str):
+        self.queries += 1
+        return json.loads(self.graph.query(query).serialize(format="json"))
+
+
+def make_text_structure(records):
+    """Returns a text structure (stored in an ``rdflib`` graph) from records."""
+    hucit = "http://purl.org/net/hucit#%s"
+    ecrm = "http://erlangen-crm.org/current/%s"
+    structure = URIRef(f"{WORK_URI}/text_structure")
+    graph = Graph()
+    for uri, urn, type_label, parent, following in records:
+        element = URIRef(uri)
+        element_type = URIRef(BASE_URI_TYPES % type_label)
+        identifier = URIRef(f"{uri}/cts_urn")
+        graph.add((element, RDF.type, URIRef(hucit % "TextElement")))
+        graph.add((element, URIRef(ecrm % "P2_has_type"), element_type))
+        graph.add((element_type, RDFS.label, Literal(type_label)))
+        graph.add((element, URIRef(ecrm % "P1_is_identified_by"), identifier))
+        graph.add(
+            (
+                identifier,
+                URIRef(ecrm % "P2_has_type"),
+                URIRef(BASE_URI_TYPES % "CTS_URN"),
+            )
+        )
+        graph.add((identifier, RDFS.label, Literal(urn)))
+        if parent is None:
+            graph.add((structure, URIRef(hucit % "has_element"), element))
+        else:
+            graph.add((element, URIRef(hucit % "is_part_of"), URIRef(parent)))
+            graph.add((URIRef(parent), URIRef(hucit % "has_part"), element))
+        if following is not None:
+            graph.add((element, URIRef(hucit % "precedes"), URIRef(following)))
+    # a type with several labels does not multiply the element's rows
+    graph.add((URIRef(BASE_URI_TYPES % "line"), RDFS.label, Literal("verse")))
+    return SimpleNamespace(
+        subject=structure, session=SimpleNamespace(default_store=GraphStore(graph))
+    )
+
+
+def test_fetch_text_structure_tree_paged():
+    """Structures larger than one page of results are fetched completely."""
+    text_structure = make_text_structure(make_records())
+    tree = fetch_text_structure_tree(text_structure, page_size=3)
+    assert text_structure.session.default_store.queries == 3
+    assert len(tree) == len(REFS)
+    assert [len(list(tree.iter_level(level))) for level in [1, 2]] == [2, 5]
+    assert [element.urn for element in tree] == [f"{WORK_URN}:{ref}" for ref in REFS]
+    assert tree.get_element(f"{WORK_URN}:1.3").next.urn == f"{WORK_URN}:2.1"
@@ -4,6 +4,7 @@ import logging
 import pytest
 import pdb
 import json
+from hucitlib.surfext import get_type_registry
 
 logger = logging.getLogger(__name__)
 
@@ -63,6 +64,20 @@ def test_hucitauthor_set_urn(kb_virtuoso):
     assert str(homer.get_urn()).value == urn
 
 
+def test_hucitauthor_load_deep(kb_virtuoso):
+    """The getters return the same values with and without prefetching."""
+    urn = "urn:cts:greekLit:tlg0012"
+    homer = kb_virtuoso.get_resource_by_urn(urn)
+    prefetched_homer = kb_virtuoso.get_resource_by_urn(urn, prefetch=True)
+    assert prefetched_homer.prefetched is not None
+    assert sorted(prefetched_homer.get_names()) == sorted(homer.get_names())
+    assert sorted(prefetched_homer.get_abbreviations()) == sorted(
+        homer.get_abbreviations()
+    )
+    assert str(prefetched_homer.get_urn()) == str(homer.get_urn())
+    assert set(prefetched_homer.get_works()) == set(homer.get_works())
+
+
 # TESTS FOR HUCITWORK
 @pytest.mark.run(order=12)
 def test_hucitwork_set_urn(kb_virtuoso):
@@ -79,6 +94,22 @@ def test_hucitwork_set_urn(kb_virtuoso):
     assert str(iliad.get_urn()).value == urn
 
 
+def test_hucitwork_load_deep(kb_virtuoso):
+    """The getters return the same values with and without prefetching."""
+    urn = "urn:cts:greekLit:tlg0012.tlg002"
+    odyssey = kb_virtuoso.get_resource_by_urn(urn)
+    prefetched_odyssey = kb_virtuoso.get_resource_by_urn(urn).load_deep()
+    assert sorted(prefetched_odyssey.get_titles()) == sorted(odyssey.get_titles())
+    assert sorted(prefetched_odyssey.get_abbreviations()) == sorted(
+        odyssey.get_abbreviations()
+    )
+    assert str(prefetched_odyssey.get_urn()) == str(odyssey.get_urn())
+    assert prefetched_odyssey.author == odyssey.author
+
+    prefetched_odyssey.clear_prefetched()
+    assert prefetched_odyssey.prefetched is None
+
+
 @pytest.mark.run(order=13)
 def test_hucitwork_to_json(kb_virtuoso):
     """
@@ -120,6 +151,34 @@ def test_hucitwork_opmax(kb_virtuoso):
     assert Prop_elegies.is_opus_maximum() is True
 
 
+def test_hucitwork_memoization(kb_virtuoso):
+    """Derived relations are memoized until the resource is modified."""
+    homer = kb_virtuoso.get_resource_by_urn("urn:cts:greekLit:tlg0012")
+    works = homer.get_works()
+    assert all(work.author is homer for work in works)
+
+    odyssey = kb_virtuoso.get_resource_by_urn("urn:cts:greekLit:tlg0012.tlg002")
+    author = odyssey.author
+    assert odyssey.author is author
+    assert odyssey.is_opus_maximum() == odyssey.is_opus_maximum()
+    odyssey.load()
+    assert odyssey.author is not author
+    assert odyssey.author == author
+
+
+def test_type_registry(kb_virtuoso):
+    """Types are instantiated once per KB, and reading them does not write."""
+    fingerprint = kb_virtuoso.get_fingerprint()
+    homer = kb_virtuoso.get_resource_by_urn("urn:cts:greekLit:tlg0012")
+    works = homer.get_works()
+    registry = get_type_registry(homer.session)
+    assert registry is get_type_registry(works[0].session)
+    assert registry.get("CTS_URN") is registry.get("CTS_URN")
+    assert [work.is_opus_maximum() for work in works].count(True) <= 1
+    assert registry.get_if_present("no_such_type") is None
+    assert kb_virtuoso.get_fingerprint() == fingerprint
+
+
 def test_hucitwork_add_title(kb_virtuoso):
     in_gildonem = kb_virtuoso.get_resource_by_urn('urn:cts:cwkb:1362.4399')
     in_gildonem.add_title('Bellum Gildonicum', lang='la')